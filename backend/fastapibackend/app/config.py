@@ -2,6 +2,7 @@
 
 import os
 from functools import lru_cache
+from typing import Tuple
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -17,7 +18,88 @@ class Settings(BaseSettings):
     weather_url: str = "https://api.openweathermap.org/data/2.5/weather"
     air_pollution_url: str = "https://api.openweathermap.org/data/2.5/air_pollution"
     gemini_api_url: str = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-    waqi_api_url: str = "http://api.waqi.info/feed/geo"
+    waqi_api_url: str = "http://api.waqi.info"  # base URL of the WAQI API (or a local stand-in)
+
+    # Shared upstream HTTP client pools (one per upstream, owned by the app lifespan)
+    waqi_timeout: float = 10.0
+    openweather_timeout: float = 20.0
+    openweather_max_retries: int = 1
+    openweather_retry_delay: float = 0.25
+    weather_cache_ttl: float = 300.0  # seconds a city's weather is served without revalidating
+    weather_cache_max_stale: float = 3600.0  # stale weather is served (and refreshed in the background) up to this age
+    http_max_connections: int = 50
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_http2: bool = False  # requires the optional 'h2' package
+
+    # Upstream call layer (adaptive concurrency, circuit breaker, hedging, retry budget)
+    upstream_adaptive_concurrency: bool = True
+    upstream_initial_concurrency: int = 15
+    upstream_min_concurrency: int = 2
+    upstream_max_concurrency: int = 50
+    upstream_latency_tolerance: float = 2.0  # shrink the limit when a call takes this many times the smoothed latency
+    upstream_breaker_failure_ratio: float = 0.5  # open the circuit at this failure ratio...
+    upstream_breaker_min_calls: int = 20  # ...once this many of the last upstream_breaker_window calls are known
+    upstream_breaker_window: int = 50
+    upstream_breaker_reset_timeout: float = 30.0  # seconds open before a half-open probe
+    upstream_hedge_enabled: bool = True
+    upstream_hedge_quantile: float = 0.95  # send a second request once the first passes this latency quantile
+    upstream_hedge_min_samples: int = 50
+    upstream_retry_budget_ratio: float = 0.2  # retries earned per request
+    upstream_retry_budget_min: float = 10.0  # retries available before any traffic
+    upstream_last_good_max_age: float = 3600.0  # seconds a last-known-good value may be served after failures
+
+    # Background AQI snapshot refresher
+    aqi_refresh_enabled: bool = True
+    aqi_refresh_interval: float = 300.0  # seconds between WAQI refreshes
+    aqi_refresh_max_backoff: float = 3600.0  # longest wait between refreshes while WAQI keeps failing
+    aqi_snapshot_wait_timeout: float = 30.0  # max wait for the first snapshot after startup
+    aqi_max_concurrent: int = 15
+    aqi_retry_delay: float = 0.5
+    aqi_max_retries: int = 2
+    aqi_station_cache_ttl: float = 60.0  # single-station lookups outside the snapshot
+    aqi_history_slots: int = 288  # snapshots kept per station (24 h at the default refresh interval)
+    aqi_history_windows: Tuple[int, ...] = (12, 288)  # rolling statistic windows, in snapshots
+    aqi_median_window: int = 288  # window behind the model's aqi_median feature
+    snapshot_store_path: str = "data/snapshot.sqlite3"  # latest AQI/weather, restored on startup; empty disables
+    ready_max_aqi_snapshot_age: float = 900.0  # /ready fails once the snapshot is older
+    aqi_source: str = "feed"  # "feed" (one WAQI feed per station/monitor) or "bounds" (one map/bounds call + IDW)
+    aqi_bounds: Tuple[float, float, float, float] = (28.40, 76.84, 28.88, 77.35)  # lat1, lng1, lat2, lng2 for "bounds"
+    aqi_idw_power: float = 2.0  # inverse distance weighting exponent
+    aqi_idw_neighbors: int = 6  # nearest monitors interpolated per station; 0 = all
+    waqi_dedupe_monitors: bool = True  # fetch each distinct WAQI monitor once per refresh
+    waqi_monitor_map_path: str = "data/waqi_monitor_map.json"  # persisted station -> monitor uid mapping
+    waqi_monitor_map_max_age: float = 604800.0  # seconds before a station's monitor is re-resolved
+
+    # /predict-all result cache, keyed by request fields and input versions
+    predict_all_cache_size: int = 64  # 0 disables the cache
+    predict_all_cache_serialized: bool = False  # store pre-serialized JSON bytes
+    predict_all_stream_batch_size: int = 32  # stations scored per NDJSON chunk when streaming from the snapshot
+
+    # /predict-nearest
+    nearest_max_points: int = 5000  # GPS fixes accepted per request
+
+    # Inference
+    fast_feature_encoder: bool = True  # pandas-free encoder compiled from the preprocessor
+    inference_workers: int = 0  # threads in the model-scoring pool; 0 = min(2, available CPUs)
+    inference_nthread: int = 0  # booster threads per call; 0 = available CPUs // inference_workers
+    inference_batching_enabled: bool = True  # micro-batch concurrent /predict-single rows
+    inference_batch_max_size: int = 64
+    inference_batch_max_wait_ms: float = 2.0
+    inference_engine: str = "auto"  # "xgboost", "arrays" (NumPy tree evaluator) or "auto" (arrays for small batches)
+    array_engine_max_batch: int = 0  # largest batch scored by the arrays engine in auto mode; 0 = benchmark once per model version
+    array_engine_cutoff_path: str = "data/array_engine_cutoffs.json"  # benchmarked auto-mode cutoffs by model version
+
+    # Observability
+    metrics_enabled: bool = True  # /metrics endpoint and per-request timing
+    event_loop_lag_interval: float = 0.5  # seconds between event loop lag samples; 0 disables
+    server_timing_enabled: bool = True  # per-request stage timings in a Server-Timing header
+    trace_log_enabled: bool = False  # also log one JSON trace line per request (app.trace logger)
+    trace_log_min_ms: float = 0.0  # only log traces of requests at least this slow
+
+    # Model hot reload
+    model_watch_interval: float = 0.0  # seconds between artifact change checks; 0 disables
+    admin_token: str = ""  # required in X-Admin-Token for /admin endpoints; empty disables them
     
     class Config:
         env_file = ".env"
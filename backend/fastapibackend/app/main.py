@@ -1,21 +1,85 @@
 ﻿from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .models import load_model_artifacts
-from .routes import health_router, aqi_router, prediction_router
+from .config import get_settings
+from .models import (
+    load_model_artifacts,
+    start_artifact_watcher,
+    stop_artifact_watcher,
+    warm_up_model_artifacts,
+)
+from .metrics import MetricsMiddleware, start_loop_lag_monitor, stop_loop_lag_monitor
+from .routes import health_router, aqi_router, prediction_router, admin_router, metrics_router
+from .services.aqi_snapshot import start_aqi_refresher, stop_aqi_refresher
+from .services.batcher import start_inference_batcher, stop_inference_batcher
+from .services.http_client import close_http_clients, init_http_clients
+from .services.inference_executor import run_inference, start_inference_executor, stop_inference_executor
+from .services.station_index import build_station_index
+from .services.weather_service import restore_weather_cache
+from .tracing import TracingMiddleware
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
 
-# Load model artifacts on startup
-load_model_artifacts()
 
-app = FastAPI(title="Sentry Safety Predictor", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own process-wide resources: HTTP clients, AQI refresher, model, inference pool and batcher.
+    
+    Model artifacts are loaded and warmed here (off the import path) while the
+    first AQI snapshot is fetched in the background; /ready reports progress.
+    Each component's shutdown is registered as soon as it has started, so a
+    failure part-way through startup still stops everything started before
+    it, in reverse order.
+    """
+    settings = get_settings()
+    started = time.perf_counter()
+    phase_started = started
+
+    def log_phase(name: str) -> None:
+        nonlocal phase_started
+        now = time.perf_counter()
+        LOGGER.info("Startup phase '%s' took %.1f ms", name, (now - phase_started) * 1000)
+        phase_started = now
+
+    async with AsyncExitStack() as stack:
+        init_http_clients(settings)
+        stack.push_async_callback(close_http_clients)
+        start_aqi_refresher(settings)
+        stack.push_async_callback(stop_aqi_refresher)
+        restore_weather_cache()
+        log_phase("upstream clients")
+
+        build_station_index()
+
+        await asyncio.to_thread(load_model_artifacts)
+        log_phase("model load")
+
+        start_inference_executor(settings)
+        stack.callback(stop_inference_executor)
+        await run_inference(warm_up_model_artifacts)
+        log_phase("model warm-up")
+
+        start_inference_batcher(settings)
+        stack.push_async_callback(stop_inference_batcher)
+        start_artifact_watcher(settings.model_watch_interval)
+        stack.push_async_callback(stop_artifact_watcher)
+        if settings.metrics_enabled:
+            start_loop_lag_monitor(settings.event_loop_lag_interval)
+            stack.push_async_callback(stop_loop_lag_monitor)
+        LOGGER.info("Startup complete in %.1f ms", (time.perf_counter() - started) * 1000)
+        yield
+
+
+app = FastAPI(title="Sentry Safety Predictor", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -25,7 +89,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if get_settings().server_timing_enabled or get_settings().trace_log_enabled:
+    app.add_middleware(
+        TracingMiddleware,
+        server_timing=get_settings().server_timing_enabled,
+        log_traces=get_settings().trace_log_enabled,
+        log_min_ms=get_settings().trace_log_min_ms,
+    )
+
+if get_settings().metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(health_router)
 app.include_router(aqi_router)
 app.include_router(prediction_router)
+app.include_router(admin_router)
+app.include_router(metrics_router)
@@ -0,0 +1,330 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms keep one small child object per label set,
+created on first use. Recording is an attribute update under a per-child
+lock that is practically never contended (the event loop plus a couple of
+inference threads), so it is cheap enough for per-request and per-station
+hot paths. ``render_metrics()`` produces the ``/metrics`` payload.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds; covers sub-millisecond scoring up to upstream timeouts
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 170, 256, 512, 1024)
+
+_REGISTRY: List["_Metric"] = []
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def labels(self, *values) -> object:
+        """Return the child for one label set (created on first use)."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.extend(self._sample_lines(key, child))
+        return lines
+
+    def _sample_lines(self, key: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _SingleValueMetric(_Metric):
+    """Counter or gauge whose values are recorded, or computed at scrape time."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set_function(self, *labelvalues, fn: Callable[[], float]) -> None:
+        """Read the value from ``fn`` whenever metrics are rendered."""
+        self._functions[tuple(str(value) for value in labelvalues)] = fn
+
+    def collect(self) -> List[str]:
+        lines = super().collect()
+        for key, fn in list(self._functions.items()):
+            try:
+                value = float(fn())
+            except Exception as exc:
+                LOGGER.debug(f"Metric {self.name}{key} callback failed: {exc}")
+                continue
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_SingleValueMetric):
+    """Monotonically increasing count; a ``set_function`` source must only grow."""
+
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1.0) -> None:
+        self.labels(*labelvalues).inc(amount)
+
+
+class Gauge(_SingleValueMetric):
+    """Value that can go up and down, optionally computed at scrape time."""
+
+    kind = "gauge"
+
+    def set(self, *labelvalues, value: float) -> None:
+        self.labels(*labelvalues).set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One slot per bucket plus the +Inf overflow; made cumulative on render
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, *labelvalues, value: float) -> None:
+        self.labels(*labelvalues).observe(value)
+
+    def _sample_lines(self, key: Tuple[str, ...], child: _HistogramValue) -> List[str]:
+        counts, total = list(child.counts), child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+# HTTP server
+HTTP_REQUEST_SECONDS = Histogram(
+    "sentry_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+
+# Upstream APIs
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "sentry_upstream_request_duration_seconds", "Upstream API call latency", ("upstream", "endpoint", "attempt")
+)
+UPSTREAM_RESPONSES = Counter(
+    "sentry_upstream_responses_total",
+    "Upstream API call outcomes by station (WAQI) or endpoint (OpenWeather) and attempt",
+    ("upstream", "station", "attempt", "status"),
+)
+UPSTREAM_RETRIES = Counter("sentry_upstream_retries_total", "Upstream API calls retried", ("upstream",))
+UPSTREAM_HEDGES = Counter(
+    "sentry_upstream_hedges_total", "Hedged upstream requests: sent, won (answered first), cancelled (lost the race)", ("upstream", "outcome")
+)
+UPSTREAM_CONCURRENCY_LIMIT = Gauge(
+    "sentry_upstream_concurrency_limit", "Current adaptive concurrency limit", ("upstream",)
+)
+UPSTREAM_CIRCUIT_STATE = Gauge(
+    "sentry_upstream_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("upstream",)
+)
+UPSTREAM_LAST_GOOD = Counter(
+    "sentry_upstream_last_good_total", "Results served from last-known-good data after an upstream failure", ("upstream",)
+)
+AQI_FALLBACKS = Counter(
+    "sentry_aqi_fallback_total", "Stations reported with the fallback AQI of 150", ("reason",)
+)
+
+# Inference
+INFERENCE_BATCH_ROWS = Histogram(
+    "sentry_inference_batch_rows", "Rows per model scoring call", buckets=BATCH_SIZE_BUCKETS
+)
+INFERENCE_STAGE_SECONDS = Histogram(
+    "sentry_inference_stage_duration_seconds", "Time per scoring stage (encode, predict, decode)", ("stage",)
+)
+INFERENCE_MICROBATCH_ROWS = Histogram(
+    "sentry_inference_microbatch_rows", "Single-row predictions per micro-batch", buckets=BATCH_SIZE_BUCKETS
+)
+INFERENCE_QUEUE_WAIT_SECONDS = Histogram(
+    "sentry_inference_queue_wait_seconds", "Time a single-row prediction waited in the micro-batcher queue"
+)
+
+# Caches
+CACHE_LOOKUPS = Counter("sentry_cache_lookups_total", "Cache lookups by result", ("cache", "result"))
+CACHE_HIT_RATIO = Gauge("sentry_cache_hit_ratio", "Cache hits / lookups since start", ("cache",))
+
+# Event loop
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "sentry_event_loop_lag_seconds", "Delay between a scheduled wake-up and the loop running it"
+)
+EVENT_LOOP_LAG_LAST = Gauge("sentry_event_loop_lag_last_seconds", "Most recent event loop lag sample")
+
+
+def register_cache(name: str, cache) -> None:
+    """Expose a cache's ``hits``/``misses`` (and ``stale_hits``, if any) counters under ``name``.
+
+    Stale hits count as hits in the hit ratio: they were answered without waiting on upstream.
+    """
+    stale = (lambda: cache.stale_hits) if hasattr(cache, "stale_hits") else (lambda: 0)
+    CACHE_LOOKUPS.set_function(name, "hit", fn=lambda: cache.hits)
+    CACHE_LOOKUPS.set_function(name, "miss", fn=lambda: cache.misses)
+    if hasattr(cache, "stale_hits"):
+        CACHE_LOOKUPS.set_function(name, "stale", fn=stale)
+    CACHE_HIT_RATIO.set_function(
+        name, fn=lambda: (cache.hits + stale()) / max(1, cache.hits + stale() + cache.misses)
+    )
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text format (0.0.4)."""
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Route templates keep the label set bounded (/aqi/station/{station_name})
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(scope["method"], path, status, value=time.perf_counter() - started)
+
+
+_LAG_TASK: Optional[asyncio.Task] = None
+
+
+async def _monitor_loop_lag(interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - scheduled)
+        EVENT_LOOP_LAG_SECONDS.observe(value=lag)
+        EVENT_LOOP_LAG_LAST.set(value=lag)
+
+
+def start_loop_lag_monitor(interval: float) -> None:
+    """Sample event loop lag every ``interval`` seconds. Called from the app lifespan."""
+    global _LAG_TASK
+    if interval <= 0 or _LAG_TASK is not None:
+        return
+    _LAG_TASK = asyncio.create_task(_monitor_loop_lag(interval), name="event-loop-lag-monitor")
+
+
+async def stop_loop_lag_monitor() -> None:
+    """Stop sampling event loop lag. Called from the app lifespan."""
+    global _LAG_TASK
+    task, _LAG_TASK = _LAG_TASK, None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
@@ -1,10 +1,11 @@
 """XGBoost wrapper class for the safety prediction model."""
 
+from typing import Tuple
+
 import numpy as np
 import xgboost as xgb
 from sklearn.base import BaseEstimator, ClassifierMixin
 
-
 class XGBWrapper(BaseEstimator, ClassifierMixin):
     """Wrapper for XGBoost Booster to provide sklearn-like interface."""
 
@@ -23,6 +24,43 @@ class XGBWrapper(BaseEstimator, ClassifierMixin):
         d = xgb.DMatrix(X)
         return self.booster.predict(d)
 
+    def predict_with_proba(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """Predict class labels and probabilities with a single booster pass.
+        
+        Uses XGBoost in-place prediction, so NumPy input is scored without
+        building a DMatrix. Batches of up to ``array_engine_max_batch`` rows
+        go to the attached array engine instead, when there is one.
+        
+        Args:
+            X: Feature matrix (float32 C-contiguous input avoids any copy)
+            
+        Returns:
+            Tuple of (label indices, probabilities)
+        """
+        engine = getattr(self, "array_engine", None)
+        if engine is not None and len(X) <= getattr(self, "array_engine_max_batch", 0):
+            probs = engine.predict_proba(X)
+        else:
+            probs = self.booster.inplace_predict(X)
+        if probs.ndim == 1:
+            # Binary objectives return P(class 1) only
+            probs = np.column_stack([1.0 - probs, probs])
+        return np.argmax(probs, axis=1), probs
+
+    def set_nthread(self, nthread: int) -> None:
+        """Set the number of threads the booster predicts with.
+
+        This changes booster parameters, which XGBoost does not guard against
+        concurrent predictions, so call it only while the model is being
+        loaded and before it is shared.
+        """
+        self.booster.set_param({"nthread": nthread})
+
+    def set_array_engine(self, engine, max_batch: int) -> None:
+        """Score batches of up to ``max_batch`` rows with ``engine`` (None detaches it)."""
+        self.array_engine = engine
+        self.array_engine_max_batch = max_batch if engine is not None else 0
+
     def get_params(self, deep=True):
         """Get parameters for this estimator."""
         return {"booster": self.booster, "classes": self.classes_}
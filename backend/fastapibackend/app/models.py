@@ -1,18 +1,50 @@
-"""Model artifact loading."""
+"""Model artifact loading and hot reload."""
 
+import asyncio
+import hashlib
+import json
 import logging
+import os
 import sys
+import threading
+import time
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Tuple
-
-import joblib
+from typing import Dict, Optional, Tuple
 
 LOGGER = logging.getLogger(__name__)
 
-# Global model artifacts
-_MODEL = None
-_PREPROCESSOR = None
-_LABEL_ENCODER = None
+ARTIFACT_FILES = ("model.pkl", "preprocessor.pkl", "label_encoder.pkl")
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """One consistent, versioned set of model artifacts.
+
+    Requests read the published bundle once and use it throughout, so a reload
+    never mixes artifacts from two versions within a request.
+    """
+
+    model: object = field(repr=False)
+    preprocessor: object = field(repr=False)
+    label_encoder: object = field(repr=False)
+    version: str
+    fingerprint: Tuple = field(repr=False)
+    loaded_at: float
+
+    @property
+    def artifacts(self) -> Tuple:
+        return self.model, self.preprocessor, self.label_encoder
+
+
+# Published bundle; replaced by a single reference assignment on reload
+_BUNDLE: Optional[ModelBundle] = None
+_MODEL_WARM = False
+_LOAD_LOCK = threading.Lock()
+_FAILED_FINGERPRINT: Optional[Tuple] = None
+_WATCH_TASK: Optional[asyncio.Task] = None
+# Benchmarked array-engine cutoffs by model version, mirrored to disk
+_ENGINE_CUTOFFS: Optional[Dict[str, int]] = None
 
 
 def _resolve_artifact_dir() -> Path:
@@ -24,31 +56,287 @@ def _resolve_artifact_dir() -> Path:
     return artifact_dir
 
 
-def load_model_artifacts() -> Tuple:
-    global _MODEL, _PREPROCESSOR, _LABEL_ENCODER
-    
-    if _MODEL is not None:
-        return _MODEL, _PREPROCESSOR, _LABEL_ENCODER
-    
+def _artifact_fingerprint(artifact_dir: Path) -> Tuple:
+    """Cheap change detector: name, size and mtime of every artifact file."""
+    entries = []
+    for name in ARTIFACT_FILES:
+        path = artifact_dir / name
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            entries.append((name, None, None))
+            continue
+        entries.append((name, stat.st_size, stat.st_mtime_ns))
+    return tuple(entries)
+
+
+def _load_bundle(artifact_dir: Path) -> ModelBundle:
+    """Load, version and prepare a bundle without publishing it."""
+    # Heavy ML imports are deferred until the artifacts are actually loaded
+    import joblib
+
     # Import XGBWrapper from model_wrapper module
     from .model_wrapper import XGBWrapper
-    
+    from .services.prediction_service import get_feature_encoder
+
     # Register XGBWrapper in __main__ module for unpickling
     sys.modules.setdefault("__main__", sys.modules[__name__])
     setattr(sys.modules["__main__"], "XGBWrapper", XGBWrapper)
-    
-    artifact_dir = _resolve_artifact_dir()
+
     LOGGER.info("Loading artifacts from %s", artifact_dir)
-    
-    _MODEL = joblib.load(artifact_dir / "model.pkl")
-    _PREPROCESSOR = joblib.load(artifact_dir / "preprocessor.pkl")
-    _LABEL_ENCODER = joblib.load(artifact_dir / "label_encoder.pkl")
-    
-    return _MODEL, _PREPROCESSOR, _LABEL_ENCODER
+    fingerprint = _artifact_fingerprint(artifact_dir)
+    digest = hashlib.sha256()
+    for name in ARTIFACT_FILES:
+        digest.update((artifact_dir / name).read_bytes())
+    version = digest.hexdigest()[:12]
+
+    model = joblib.load(artifact_dir / "model.pkl")
+    preprocessor = joblib.load(artifact_dir / "preprocessor.pkl")
+    label_encoder = joblib.load(artifact_dir / "label_encoder.pkl")
+
+    # Compile and verify the pandas-free feature encoder up front
+    get_feature_encoder(preprocessor)
+    _attach_array_engine(model, version)
+    _set_booster_threads(model)
+
+    return ModelBundle(
+        model=model,
+        preprocessor=preprocessor,
+        label_encoder=label_encoder,
+        version=version,
+        fingerprint=fingerprint,
+        loaded_at=time.time(),
+    )
+
+
+def _set_booster_threads(model) -> None:
+    """Fix the booster's thread count to the inference pool's per-call share.
+
+    Done once here, before the bundle is published, because changing booster
+    parameters while the pool's workers predict with it is not thread-safe.
+    """
+    from .config import get_settings
+    from .services.inference_executor import inference_pool_size
+
+    if hasattr(model, "set_nthread"):
+        _, nthread = inference_pool_size(get_settings())
+        model.set_nthread(nthread)
+
+
+def _engine_cutoffs(path: Optional[str]) -> Dict[str, int]:
+    """Return the cached array-engine cutoffs, reading ``path`` on first use."""
+    global _ENGINE_CUTOFFS
+    if _ENGINE_CUTOFFS is None:
+        _ENGINE_CUTOFFS = {}
+        if path and Path(path).exists():
+            try:
+                payload = json.loads(Path(path).read_text())
+                _ENGINE_CUTOFFS = {str(version): int(cutoff) for version, cutoff in payload.items()}
+            except Exception as exc:
+                LOGGER.warning(f"Ignoring unreadable array engine cutoffs {path}: {exc}")
+    return _ENGINE_CUTOFFS
+
+
+def _save_engine_cutoff(path: Optional[str], version: str, cutoff: int) -> None:
+    """Remember the benchmarked cutoff for ``version`` and write it to ``path`` atomically."""
+    cutoffs = _engine_cutoffs(path)
+    cutoffs[version] = cutoff
+    if not path:
+        return
+    try:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_suffix(target.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(cutoffs, indent=1, sort_keys=True))
+        os.replace(tmp_path, target)
+    except OSError as exc:
+        LOGGER.warning(f"Could not persist array engine cutoffs to {path}: {exc}")
+
+
+def _attach_array_engine(model, version: Optional[str] = None) -> None:
+    """Export the booster into the array tree engine when configured to use it.
+
+    In ``auto`` mode the engine is benchmarked against XGBoost and only used
+    for the batch sizes where it is faster. The measured cutoff is stored per
+    model ``version`` (and persisted to ``array_engine_cutoff_path``), so
+    reloading the same artifacts reuses it instead of re-timing under
+    whatever load the process is carrying; ``array_engine_max_batch`` pins it
+    outright. Any failure keeps native scoring.
+
+    Args:
+        model: Loaded model wrapper
+        version: Artifact version the cutoff is cached under; None benchmarks
+            without caching
+    """
+    import numpy as np
+
+    from .config import get_settings
+    from .tree_engine import array_engine_cutoff, benchmark_engines, build_array_engine, verification_grid
+
+    settings = get_settings()
+    mode = settings.inference_engine.lower()
+    if mode == "xgboost" or not hasattr(model, "set_array_engine"):
+        return
+    if mode not in ("arrays", "auto"):
+        LOGGER.warning(f"Unknown inference_engine '{settings.inference_engine}', using xgboost")
+        return
+
+    try:
+        engine = build_array_engine(model.booster)
+    except Exception as exc:
+        LOGGER.warning(f"Array tree engine unavailable, using xgboost: {exc}")
+        return
+
+    cutoff_path = settings.array_engine_cutoff_path
+    if mode == "arrays":
+        max_batch = sys.maxsize
+    elif settings.array_engine_max_batch > 0:
+        max_batch = settings.array_engine_max_batch
+    elif version is not None and version in _engine_cutoffs(cutoff_path):
+        max_batch = _engine_cutoffs(cutoff_path)[version]
+        LOGGER.info("Using cached array engine cutoff for model version %s", version)
+    else:
+        X = np.nan_to_num(verification_grid(engine, 256), nan=0.0)
+        results = benchmark_engines(engine, model.booster, X, (1, 4, 16, 32, 64, 170), min_seconds=0.02)
+        max_batch = array_engine_cutoff(results)
+        LOGGER.info(
+            "Engine timings (us, xgboost/arrays): %s",
+            {size: (round(t["xgboost_us"]), round(t["arrays_us"])) for size, t in results.items()},
+        )
+        if version is not None:
+            _save_engine_cutoff(cutoff_path, version, max_batch)
+    if max_batch <= 0:
+        LOGGER.info("Array tree engine is slower at every batch size; using xgboost")
+        return
+    model.set_array_engine(engine, max_batch)
+    LOGGER.info("Array tree engine scores batches of up to %s rows", "any" if mode == "arrays" else max_batch)
+
+
+def load_model_artifacts() -> Tuple:
+    global _BUNDLE
+
+    if _BUNDLE is not None:
+        return _BUNDLE.artifacts
+
+    with _LOAD_LOCK:
+        if _BUNDLE is None:
+            _BUNDLE = _load_bundle(_resolve_artifact_dir())
+            LOGGER.info("Model version %s loaded", _BUNDLE.version)
+    return _BUNDLE.artifacts
+
+
+def get_model_bundle() -> ModelBundle:
+    """Return the published bundle, loading it on first use."""
+    if _BUNDLE is None:
+        load_model_artifacts()
+    return _BUNDLE
 
 
 def get_model_artifacts() -> Tuple:
+    return get_model_bundle().artifacts
+
+
+def warm_up_model_artifacts() -> None:
+    """Run a synthetic prediction so the first real request pays no first-call costs."""
+    global _MODEL_WARM
+    from .services.prediction_service import warm_up_model
+
+    warm_up_model(*get_model_artifacts())
+    _MODEL_WARM = True
+
+
+def reload_model_artifacts(force: bool = False) -> Tuple[ModelBundle, bool]:
+    """Load, warm and atomically publish the artifacts currently on disk.
+
+    Runs off the request path (call it from a worker thread). In-flight
+    requests keep the bundle they already hold; new requests see the new one
+    as soon as the reference is swapped. If loading or warm-up fails, the
+    current bundle stays published.
+
+    Args:
+        force: Reload even if the artifact files look unchanged
+
+    Returns:
+        Tuple of (published bundle, whether a new bundle was published)
+    """
+    global _BUNDLE, _FAILED_FINGERPRINT
+    from .services.prediction_service import warm_up_model
+
+    with _LOAD_LOCK:
+        artifact_dir = _resolve_artifact_dir()
+        current = _BUNDLE
+        if not force and current is not None and _artifact_fingerprint(artifact_dir) == current.fingerprint:
+            return current, False
+
+        started = time.perf_counter()
+        try:
+            bundle = _load_bundle(artifact_dir)
+            warm_up_model(*bundle.artifacts)
+        except Exception:
+            _FAILED_FINGERPRINT = _artifact_fingerprint(artifact_dir)
+            raise
+        _FAILED_FINGERPRINT = None
+
+        if not force and current is not None and bundle.version == current.version:
+            # Files were touched but their contents did not change
+            _BUNDLE = replace(current, fingerprint=bundle.fingerprint)
+            return _BUNDLE, False
+
+        _BUNDLE = bundle
+
+    LOGGER.info(
+        "Model version %s published (previous %s) in %.1f ms",
+        bundle.version,
+        current.version if current is not None else None,
+        (time.perf_counter() - started) * 1000,
+    )
+    return bundle, True
+
+
+async def _watch_artifacts(interval: float) -> None:
+    artifact_dir = _resolve_artifact_dir()
+    last_seen = None
+    while True:
+        await asyncio.sleep(interval)
+        bundle = _BUNDLE
+        fingerprint = _artifact_fingerprint(artifact_dir)
+        changed = bundle is not None and fingerprint != bundle.fingerprint and fingerprint != _FAILED_FINGERPRINT
+        # Wait until the files have stopped changing for one interval so a
+        # half-copied set of artifacts is never loaded
+        settled = fingerprint == last_seen
+        last_seen = fingerprint
+        if not (changed and settled):
+            continue
+        try:
+            await asyncio.to_thread(reload_model_artifacts)
+        except Exception as exc:
+            LOGGER.error(f"Model reload failed, keeping version {bundle.version}: {exc}")
+
+
+def start_artifact_watcher(interval: float) -> None:
+    """Reload the model when artifact files change. Called from the app lifespan."""
+    global _WATCH_TASK
+    if interval <= 0 or _WATCH_TASK is not None:
+        return
+    _WATCH_TASK = asyncio.create_task(_watch_artifacts(interval), name="model-artifact-watcher")
+
+
+async def stop_artifact_watcher() -> None:
+    """Stop watching artifact files. Called from the app lifespan."""
+    global _WATCH_TASK
+    task, _WATCH_TASK = _WATCH_TASK, None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def is_model_loaded() -> bool:
+    return _BUNDLE is not None
+
 
-    if _MODEL is None:
-        return load_model_artifacts()
-    return _MODEL, _PREPROCESSOR, _LABEL_ENCODER
+def is_model_warm() -> bool:
+    return _MODEL_WARM
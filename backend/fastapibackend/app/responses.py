@@ -0,0 +1,40 @@
+"""Fast JSON responses for the bulk endpoints.
+
+``FastJSONResponse`` renders plain dicts and lists directly, without building
+and re-validating a pydantic model per row. It uses orjson when the optional
+``orjson`` package is installed and falls back to compact standard-library
+JSON otherwise. NumPy arrays and scalars are serialized natively either way.
+"""
+
+import json
+from typing import Any
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize ``content`` to compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with ``dumps``; returned content skips response-model validation."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,5 +1,7 @@
 from .health import router as health_router
 from .aqi import router as aqi_router
 from .prediction import router as prediction_router
+from .admin import router as admin_router
+from .metrics import router as metrics_router
 
-__all__ = ["health_router", "aqi_router", "prediction_router"]
+__all__ = ["health_router", "aqi_router", "prediction_router", "admin_router", "metrics_router"]
@@ -0,0 +1,45 @@
+"""Operational endpoints."""
+
+import asyncio
+import hmac
+import logging
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+
+from ..config import get_settings
+from ..models import get_model_bundle, reload_model_artifacts
+
+LOGGER = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _check_admin_token(token: Optional[str]) -> None:
+    expected = get_settings().admin_token
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post("/reload-model")
+async def reload_model(force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """Load, warm and publish the model artifacts currently on disk."""
+    _check_admin_token(x_admin_token)
+    previous = get_model_bundle().version
+    started = time.perf_counter()
+    
+    try:
+        bundle, reloaded = await asyncio.to_thread(reload_model_artifacts, force)
+    except Exception as e:
+        LOGGER.error(f"Model reload failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Model reload failed, still serving {previous}: {str(e)}")
+    
+    return {
+        "reloaded": reloaded,
+        "previous_version": previous,
+        "model_version": bundle.version,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
@@ -2,56 +2,74 @@
 
 import logging
 from datetime import datetime
+from typing import Literal, Union
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
 from ..config import get_settings
 from ..constants import DELHI_POLICE_STATIONS
-from ..schemas.aqi import AQIData, AQIResponse
-from ..services.waqi_service import fetch_aqi_from_waqi, categorize_aqi, get_all_station_names
+from ..responses import FastJSONResponse
+from ..schemas.aqi import AQIColumnarResponse, AQIResponse
+from ..services.aqi_history import get_aqi_history
+from ..services.aqi_snapshot import get_aqi_snapshot, get_current_aqi_snapshot
+from ..services.http_client import get_waqi_client
+from ..services.station_index import get_station_index
+from ..services.waqi_service import (
+    categorize_aqi,
+    fetch_single_station_aqi,
+    get_all_station_names,
+    get_last_interpolation,
+    get_station_coordinates,
+)
 
 LOGGER = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/aqi", tags=["aqi"])
 
 
-@router.get("", response_model=AQIResponse)
-async def get_aqi_for_all_stations():
-    """Get AQI data for all Delhi police stations using WAQI API."""
+@router.get("", response_model=Union[AQIResponse, AQIColumnarResponse], response_class=FastJSONResponse)
+async def get_aqi_for_all_stations(
+    response_format: Literal["rows", "columnar"] = Query("rows", alias="format")
+):
+    """Get AQI data for all Delhi police stations from the background WAQI snapshot.
+    
+    ``?format=columnar`` returns parallel ``stations``/``aqi``/``aqi_category``
+    lists instead of one object per station.
+    """
     settings = get_settings()
     
     try:
-        aqi_dict = await fetch_aqi_from_waqi(
-            waqi_token=settings.waqi_api_token,
-            max_concurrent=15,  # Reasonable concurrency for WAQI API
-            retry_delay=0.5,
-            max_retries=2
-        )
+        snapshot = await get_current_aqi_snapshot(settings)
         
         # Build response using all available stations
-        aqi_data_list = []
         available_stations = get_all_station_names()
-        
+        aqi_values = []
+        aqi_categories = []
         for station in available_stations:
-            station_data = aqi_dict.get(station, {})
-            aqi_value = station_data.get("aqi", 150.0)
-            aqi_category = station_data.get("status", categorize_aqi(aqi_value))
-            
-            aqi_data_list.append(
-                AQIData(
-                    police_station=station,
-                    aqi=aqi_value,
-                    aqi_category=aqi_category
-                )
-            )
-        
-        LOGGER.info(f"Successfully fetched AQI data for {len(aqi_data_list)} police stations")
+            station_data = snapshot.stations.get(station, {})
+            aqi_value = float(station_data.get("aqi", 150.0))
+            aqi_values.append(aqi_value)
+            aqi_categories.append(station_data.get("status", categorize_aqi(aqi_value)))
         
-        return AQIResponse(
-            timestamp=datetime.utcnow().isoformat() + "Z",
-            data=aqi_data_list
-        )
+        payload = {"timestamp": datetime.utcnow().isoformat() + "Z"}
+        if response_format == "columnar":
+            payload.update({
+                "format": "columnar",
+                "stations": available_stations,
+                "aqi": aqi_values,
+                "aqi_category": aqi_categories,
+            })
+        else:
+            payload["data"] = [
+                {"police_station": station, "aqi": aqi_value, "aqi_category": aqi_category}
+                for station, aqi_value, aqi_category in zip(available_stations, aqi_values, aqi_categories)
+            ]
+        payload["snapshot_version"] = snapshot.version
+        payload["snapshot_age_seconds"] = round(snapshot.age_seconds, 3)
+        return FastJSONResponse(payload)
     
+    except HTTPException:
+        raise
     except Exception as e:
         LOGGER.error(f"Failed to fetch AQI data: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch AQI data: {str(e)}")
@@ -62,19 +80,36 @@ async def get_aqi_for_station(station_name: str):
     settings = get_settings()
     
     try:
-        # Fetch data for all stations (cached/optimized in production)
-        aqi_dict = await fetch_aqi_from_waqi(
-            waqi_token=settings.waqi_api_token,
-            max_concurrent=15
-        )
-        
-        station_data = aqi_dict.get(station_name.lower())
-        if not station_data:
+        if get_station_coordinates(station_name) is None:
             raise HTTPException(
                 status_code=404, 
                 detail=f"Police station '{station_name}' not found"
             )
         
+        # Serve from the background snapshot when it is fresh; otherwise fetch
+        # just this station (coalesced and briefly cached) instead of all of them
+        snapshot = get_aqi_snapshot()
+        if snapshot is not None and snapshot.age_seconds <= settings.aqi_refresh_interval:
+            station_data = snapshot.get(station_name)
+            if station_data is not None:
+                return {
+                    "station": station_name,
+                    "timestamp": datetime.utcnow().isoformat() + "Z",
+                    "snapshot_version": snapshot.version,
+                    "snapshot_age_seconds": round(snapshot.age_seconds, 3),
+                    **station_data
+                }
+        
+        station_data = await fetch_single_station_aqi(
+            settings.waqi_api_token,
+            station_name,
+            client=get_waqi_client(),
+            cache_ttl=settings.aqi_station_cache_ttl,
+            retry_delay=settings.aqi_retry_delay,
+            max_retries=settings.aqi_max_retries,
+            api_url=settings.waqi_api_url
+        )
+        
         return {
             "station": station_name,
             "timestamp": datetime.utcnow().isoformat() + "Z",
@@ -105,4 +140,52 @@ async def get_available_stations():
     return {
         "total_stations": len(stations),
         "stations": sorted(stations, key=lambda x: x["name"])
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/stations/nearest")
+async def get_nearest_stations(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    k: int = Query(1, ge=1, le=20)
+):
+    """Get the police stations nearest to a coordinate, closest first."""
+    index = get_station_index()
+    indices, distances = index.query([lat], [lng], k=k)
+    return {
+        "latitude": lat,
+        "longitude": lng,
+        "stations": [
+            {
+                "name": index.names[position],
+                "latitude": float(index.latitudes[position]),
+                "longitude": float(index.longitudes[position]),
+                "distance_km": round(float(distance), 3),
+            }
+            for position, distance in zip(indices[0].tolist(), distances[0].tolist())
+        ],
+    }
+
+
+@router.get("/history/{station_name}")
+async def get_station_history(station_name: str, limit: int = Query(None, ge=1)):
+    """Get a station's recent snapshot readings (oldest first) and rolling AQI statistics."""
+    history = get_aqi_history()
+    if history is None:
+        raise HTTPException(status_code=503, detail="AQI history is not being recorded")
+    series = history.series(station_name, limit=limit)
+    if series is None:
+        raise HTTPException(status_code=404, detail=f"Police station '{station_name}' not found")
+    return series
+
+
+@router.get("/interpolation/{station_name}")
+async def get_station_interpolation(station_name: str):
+    """Show the monitors and IDW weights behind a station's AQI (AQI_SOURCE=bounds)."""
+    interpolation = get_last_interpolation()
+    if interpolation is None:
+        raise HTTPException(status_code=404, detail="No map-bounds interpolation has run; set AQI_SOURCE=bounds")
+    station_key = station_name.lower()
+    if station_key not in interpolation.stations:
+        raise HTTPException(status_code=404, detail=f"Police station '{station_name}' not found")
+    return interpolation.explain(station_key)
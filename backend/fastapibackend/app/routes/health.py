@@ -1,4 +1,10 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from ..config import get_settings
+from ..models import is_model_loaded, is_model_warm
+from ..services.aqi_snapshot import get_aqi_snapshot
+from ..services.inference_executor import get_inference_executor_stats
 
 router = APIRouter(tags=["health"])
 
@@ -6,3 +12,33 @@ router = APIRouter(tags=["health"])
 @router.get("/health")
 async def healthcheck():
     return {"status": "ok"}
+
+
+@router.get("/ready")
+async def readiness():
+    """Report whether this worker can serve predictions (for load balancer checks)."""
+    settings = get_settings()
+    snapshot = get_aqi_snapshot()
+    snapshot_age = snapshot.age_seconds if snapshot is not None else None
+    snapshot_fresh = snapshot_age is not None and snapshot_age <= settings.ready_max_aqi_snapshot_age
+
+    checks = {
+        "model_loaded": is_model_loaded(),
+        "model_warm": is_model_warm(),
+        "aqi_snapshot_fresh": snapshot_fresh,
+    }
+    ready = checks["model_loaded"] and checks["model_warm"]
+    if settings.aqi_refresh_enabled:
+        ready = ready and snapshot_fresh
+
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "checks": checks,
+            "aqi_snapshot_version": snapshot.version if snapshot is not None else None,
+            "aqi_snapshot_age_seconds": round(snapshot_age, 3) if snapshot_age is not None else None,
+            "aqi_snapshot_restored": snapshot.restored if snapshot is not None else None,
+            "inference": get_inference_executor_stats(),
+        },
+    )
@@ -1,42 +1,75 @@
 import asyncio
+import json
 import logging
-from typing import Dict, List
+from typing import AsyncIterator, Dict, Hashable, List, Literal, Optional, Sequence, Tuple, Union
 
-import httpx
-from fastapi import APIRouter, HTTPException
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
+from ..cache import LRUCache
 from ..config import get_settings
 from ..constants import DELHI_POLICE_STATIONS
+from ..metrics import register_cache
 from ..schemas.prediction import (
     BatchPredictRequest,
     BatchPredictResponse,
     LocationRequest,
+    NearestPredictRequest,
+    NearestPredictResponse,
+    NearestStationPrediction,
     PredictionResult,
     SingleLocationRequest,
     SinglePredictionResponse,
+    PredictAllColumnarResponse,
     PredictAllRequest,
     PredictAllResponse,
 )
+from ..services.aqi_history import rolling_aqi_median
+from ..services.aqi_snapshot import get_aqi_snapshot, get_current_aqi_snapshot, get_servable_aqi_snapshot
+from ..services.batcher import predict_one
+from ..services.http_client import get_openweather_client, get_waqi_client
+from ..services.inference_executor import run_inference
 from ..services.prediction_service import predict_safety, extract_weather_features
-from ..services.weather_service import fetch_weather_and_aqi
-from ..services.waqi_service import fetch_aqi_from_waqi
-from ..models import get_model_artifacts
+from ..services.station_index import get_model_station_index
+from ..services.weather_service import fetch_weather_and_aqi, normalize_city
+from ..services.waqi_service import fetch_aqi_from_waqi, fetch_single_station_aqi, get_station_coordinates
+from ..models import get_model_bundle
+from ..responses import FastJSONResponse, dumps
+from ..tracing import TracedRoute, span
 
 LOGGER = logging.getLogger(__name__)
 
-router = APIRouter(tags=["prediction"])
+router = APIRouter(tags=["prediction"], route_class=TracedRoute)
 
+# Finished /predict-all payloads; a new AQI snapshot or weather reading changes the key
+_PREDICT_ALL_CACHE = LRUCache(maxsize=get_settings().predict_all_cache_size)
+register_cache("predict_all", _PREDICT_ALL_CACHE)
 
-def _extract_feature_row(location: LocationRequest, bundle: Dict) -> Dict[str, float | str]:
-    """Extract feature row from location and weather bundle."""
-    weather_features = extract_weather_features(bundle["weather"], bundle["aqi"])
+
+def _station_feature_row(
+    request: Union[LocationRequest, SingleLocationRequest, NearestPredictRequest, PredictAllRequest],
+    station: str,
+    station_aqi: float,
+    weather_features: Dict[str, float],
+    median_window: Optional[int]
+) -> Dict[str, float | str]:
+    """Build the model's feature row for ``station``.
     
+    ``aqi_median`` is the station's rolling median over ``median_window``
+    refreshes; with ``median_window=None`` (``station_aqi`` is not on the
+    WAQI scale) it is ``station_aqi`` itself.
+    """
+    if median_window is None:
+        aqi_median = station_aqi
+    else:
+        aqi_median = rolling_aqi_median(station.lower(), median_window, station_aqi)
     return {
-        "month": location.month,
-        "day": location.day,
-        "police_station": location.police_station,
-        "gender": location.gender,
-        "family": location.family,
+        "month": request.month,
+        "day": request.day,
+        "police_station": station,
+        "gender": request.gender,
+        "family": request.family,
         "Max Temperature": weather_features["temp_max"],
         "Avg Temperature": weather_features["temp_avg"],
         "Min Temperature": weather_features["temp_min"],
@@ -47,69 +80,177 @@ def _extract_feature_row(location: LocationRequest, bundle: Dict) -> Dict[str, f
         "Avg Wind Speed": weather_features["wind_speed"],
         "Min Wind Speed": weather_features["wind_speed"],
         "Total Precipitation": weather_features["precipitation"],
-        "aqi": bundle["aqi"],
-        "aqi_median": bundle["aqi"],
+        "aqi": station_aqi,
+        "aqi_median": aqi_median,
     }
 
 
+def _extract_feature_row(location: LocationRequest, bundle: Dict) -> Dict[str, float | str]:
+    """Extract feature row from location and weather bundle.
+    
+    Both ``aqi`` and ``aqi_median`` are the bundle's OpenWeather air
+    pollution index (1-5); the WAQI-scale station history is not mixed in.
+    """
+    weather_features = extract_weather_features(bundle["weather"], bundle["aqi"])
+    return _station_feature_row(location, location.police_station, bundle["aqi"], weather_features, None)
+
+
+def _predict_all_cache_key(
+    request: PredictAllRequest,
+    model_version: str,
+    snapshot_version: int,
+    weather_features: Dict[str, float],
+    response_format: str = "rows"
+) -> Tuple[Hashable, ...]:
+    """Key a /predict-all result by its request fields, the versions of its inputs and the format."""
+    return (
+        response_format,
+        request.gender,
+        request.family,
+        request.month,
+        request.day,
+        model_version,
+        snapshot_version,
+        tuple(sorted(weather_features.items())),
+    )
+
+
+def _predict_all_payload(
+    request: PredictAllRequest,
+    stations: Sequence[str],
+    station_aqi: Sequence[float],
+    labels: Sequence[str],
+    probabilities: np.ndarray,
+    classes: Sequence[str],
+    weather_features: Dict[str, float],
+    model_version: str | None,
+    response_format: str
+) -> Dict:
+    """Build the /predict-all body (without the snapshot age) as plain data.
+    
+    ``rows`` matches ``PredictAllResponse``. ``columnar`` lists the stations
+    once, with parallel ``predicted_label`` and ``aqi`` lists, a probability
+    matrix whose columns follow ``classes``, and the shared weather once.
+    """
+    payload = {
+        "city": "Delhi",
+        "gender": request.gender,
+        "family": request.family,
+        "month": request.month,
+        "day": request.day,
+    }
+    weather = {
+        "temp": float(weather_features["temp_avg"]),
+        "humidity": float(weather_features["humidity"]),
+        "wind_speed": float(weather_features["wind_speed"]),
+    }
+    classes = [str(cls) for cls in classes]
+    labels = [str(label) for label in labels]
+    if response_format == "columnar":
+        payload.update({
+            "format": "columnar",
+            "classes": classes,
+            "stations": list(stations),
+            "predicted_label": labels,
+            "aqi": [float(aqi) for aqi in station_aqi],
+            "probabilities": np.ascontiguousarray(probabilities),
+            "weather": weather,
+        })
+    else:
+        payload["predictions"] = [
+            {
+                "police_station": station,
+                "predicted_label": label,
+                "probabilities": dict(zip(classes, probs.tolist())),
+                "weather_snapshot": {**weather, "aqi": float(aqi)},
+            }
+            for station, aqi, label, probs in zip(stations, station_aqi, labels, probabilities)
+        ]
+    if model_version is not None:
+        payload["model_version"] = model_version
+    return payload
+
+
+def _cached_predict_all_response(entry: Dict | bytes, snapshot_age: float) -> Response:
+    """Rebuild a response from a cache entry with the current snapshot age."""
+    if isinstance(entry, bytes):
+        # Entries are serialized without the age field, so append it to the object
+        content = entry[:-1] + f',"aqi_snapshot_age_seconds":{snapshot_age}}}'.encode()
+        return Response(content=content, media_type="application/json")
+    return FastJSONResponse({**entry, "aqi_snapshot_age_seconds": snapshot_age})
+
+
 @router.post("/predict", response_model=BatchPredictResponse)
 async def predict(request: BatchPredictRequest):
     if not request.locations:
         raise HTTPException(status_code=400, detail="At least one location is required")
 
     settings = get_settings()
-    model, preprocessor, label_encoder = get_model_artifacts()
+    bundle = get_model_bundle()
+    model, preprocessor, label_encoder = bundle.artifacts
+
+    # Fetch each distinct city once, however many rows name it
+    cities: Dict[str, str] = {}
+    for loc in request.locations:
+        cities.setdefault(normalize_city(loc.city), loc.city)
 
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        bundles = await asyncio.gather(
+    client = get_openweather_client()
+    with span("weather"):
+        city_bundles = await asyncio.gather(
             *[
                 fetch_weather_and_aqi(
                     client,
-                    loc.city,
+                    city,
                     settings.openweather_api_key,
                     settings.weather_url,
                     settings.air_pollution_url
                 )
-                for loc in request.locations
+                for city in cities.values()
             ]
         )
+    bundle_by_city = dict(zip(cities, city_bundles))
+    bundles = [bundle_by_city[normalize_city(loc.city)] for loc in request.locations]
 
-    feature_rows = [_extract_feature_row(loc, bundle) for loc, bundle in zip(request.locations, bundles)]
-    labels, probabilities = predict_safety(feature_rows, model, preprocessor, label_encoder)
+    with span("features"):
+        feature_rows = [_extract_feature_row(loc, bundle) for loc, bundle in zip(request.locations, bundles)]
+    with span("inference"):
+        labels, probabilities = await run_inference(predict_safety, feature_rows, model, preprocessor, label_encoder)
 
     results: List[PredictionResult] = []
-    for loc, label, probs, bundle in zip(request.locations, labels, probabilities, bundles):
-        prob_map = {cls: float(prob) for cls, prob in zip(label_encoder.classes_, probs)}
-        weather_main = bundle["weather"].get("main", {})
-        weather_snapshot = {
-            "temp": float(weather_main.get("temp", 0.0)),
-            "humidity": float(weather_main.get("humidity", 0.0)),
-            "wind_speed": float(bundle["weather"].get("wind", {}).get("speed", 0.0)),
-            "aqi": float(bundle.get("aqi", 0.0)),
-        }
-        results.append(
-            PredictionResult(
-                city=loc.city,
-                police_station=loc.police_station,
-                predicted_label=label,
-                probabilities=prob_map,
-                weather_snapshot=weather_snapshot,
+    with span("build_response"):
+        for loc, label, probs, city_bundle in zip(request.locations, labels, probabilities, bundles):
+            prob_map = {cls: float(prob) for cls, prob in zip(label_encoder.classes_, probs)}
+            weather_main = city_bundle["weather"].get("main", {})
+            weather_snapshot = {
+                "temp": float(weather_main.get("temp", 0.0)),
+                "humidity": float(weather_main.get("humidity", 0.0)),
+                "wind_speed": float(city_bundle["weather"].get("wind", {}).get("speed", 0.0)),
+                "aqi": float(city_bundle.get("aqi", 0.0)),
+            }
+            results.append(
+                PredictionResult(
+                    city=loc.city,
+                    police_station=loc.police_station,
+                    predicted_label=label,
+                    probabilities=prob_map,
+                    weather_snapshot=weather_snapshot,
+                )
             )
-        )
 
-    return BatchPredictResponse(predictions=results)
+    return BatchPredictResponse(predictions=results, model_version=bundle.version)
 
 
 @router.post("/predict-single", response_model=SinglePredictionResponse)
 async def predict_single(request: SingleLocationRequest):
     settings = get_settings()
-    model, preprocessor, label_encoder = get_model_artifacts()
+    bundle = get_model_bundle()
+    model, preprocessor, label_encoder = bundle.artifacts
     
     try:
         # Fetch weather data for Delhi
-        async with httpx.AsyncClient(timeout=20.0) as client:
+        with span("weather"):
             weather_bundle = await fetch_weather_and_aqi(
-                client,
+                get_openweather_client(),
                 "Delhi",
                 settings.openweather_api_key,
                 settings.weather_url,
@@ -117,44 +258,33 @@ async def predict_single(request: SingleLocationRequest):
             )
         
         # Get AQI from WAQI for this specific station
-        aqi_response = await fetch_aqi_from_waqi(
-            settings.waqi_api_token,
-            stations=[request.police_station]
-        )
+        with span("waqi"):
+            aqi_response = await fetch_aqi_from_waqi(
+                settings.waqi_api_token,
+                stations=[request.police_station],
+                client=get_waqi_client(),
+                api_url=settings.waqi_api_url
+            )
         station_key = request.police_station.lower()
         station_entry = aqi_response.get(station_key)
+        if station_entry is None or "error" in station_entry:
+            # Prefer the snapshot's last known reading over the fixed fallback
+            snapshot = get_aqi_snapshot()
+            known = snapshot.get(station_key) if snapshot is not None else None
+            if known is not None and "error" not in known:
+                station_entry = known
         station_aqi = station_entry.get("aqi", 150.0) if station_entry else 150.0
         
-        # Override the weather bundle AQI with WAQI value
-        weather_bundle["aqi"] = station_aqi
-        
-        # Extract weather features
-        weather_features = extract_weather_features(weather_bundle["weather"], station_aqi)
-        
-        # Build feature row
-        feature_row = {
-            "month": request.month,
-            "day": request.day,
-            "police_station": request.police_station,
-            "gender": request.gender,
-            "family": request.family,
-            "Max Temperature": weather_features["temp_max"],
-            "Avg Temperature": weather_features["temp_avg"],
-            "Min Temperature": weather_features["temp_min"],
-            "Max Humidity": weather_features["humidity"],
-            "Avg Humidity": weather_features["humidity"],
-            "Min Humidity": weather_features["humidity"],
-            "Max Wind Speed": weather_features["wind_speed"],
-            "Avg Wind Speed": weather_features["wind_speed"],
-            "Min Wind Speed": weather_features["wind_speed"],
-            "Total Precipitation": weather_features["precipitation"],
-            "aqi": station_aqi,
-            "aqi_median": station_aqi,
-        }
+        # Extract weather features and build the feature row
+        with span("features"):
+            weather_features = extract_weather_features(weather_bundle["weather"], station_aqi)
+            feature_row = _station_feature_row(
+                request, request.police_station, station_aqi, weather_features, settings.aqi_median_window
+            )
         
-        labels, probabilities = predict_safety([feature_row], model, preprocessor, label_encoder)
-        label = labels[0]
-        probs = probabilities[0]
+        # Concurrent single predictions are scored together by the micro-batcher
+        with span("inference"):
+            label, probs = await predict_one(feature_row, model, preprocessor, label_encoder)
         
         prob_map = {cls: float(prob) for cls, prob in zip(label_encoder.classes_, probs)}
         weather_snapshot = {
@@ -168,7 +298,8 @@ async def predict_single(request: SingleLocationRequest):
             police_station=request.police_station,
             predicted_label=label,
             probabilities=prob_map,
-            weather_snapshot=weather_snapshot
+            weather_snapshot=weather_snapshot,
+            model_version=bundle.version
         )
     
     except Exception as e:
@@ -176,27 +307,39 @@ async def predict_single(request: SingleLocationRequest):
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 
-@router.post("/predict-all", response_model=PredictAllResponse)
-async def predict_all(request: PredictAllRequest):
+@router.post(
+    "/predict-all",
+    response_model=Union[PredictAllResponse, PredictAllColumnarResponse],
+    response_class=FastJSONResponse,
+)
+async def predict_all(
+    request: PredictAllRequest,
+    response_format: Literal["rows", "columnar"] = Query("rows", alias="format")
+):
+    """Predict safety at every police station.
+    
+    ``?format=columnar`` returns the compact ``PredictAllColumnarResponse``
+    layout instead of one object per station.
+    """
     settings = get_settings()
-    model, preprocessor, label_encoder = get_model_artifacts()
+    bundle = get_model_bundle()
+    model, preprocessor, label_encoder = bundle.artifacts
     
     try:
         # Fetch weather data for Delhi once
-        async with httpx.AsyncClient(timeout=20.0) as client:
+        with span("weather"):
             weather_bundle = await fetch_weather_and_aqi(
-                client,
+                get_openweather_client(),
                 "Delhi",
                 settings.openweather_api_key,
                 settings.weather_url,
                 settings.air_pollution_url
             )
         
-        # Get AQI from WAQI for all stations
-        aqi_dict = await fetch_aqi_from_waqi(
-            settings.waqi_api_token,
-            stations=DELHI_POLICE_STATIONS
-        )
+        # Get AQI for all stations from the background WAQI snapshot
+        with span("aqi_snapshot"):
+            snapshot = await get_current_aqi_snapshot(settings)
+        aqi_dict = snapshot.stations
         
         # Extract weather features
         weather_features = extract_weather_features(
@@ -204,68 +347,271 @@ async def predict_all(request: PredictAllRequest):
             weather_bundle["aqi"]
         )
         
+        snapshot_age = round(snapshot.age_seconds, 3)
+        cache_key = _predict_all_cache_key(
+            request, bundle.version, snapshot.version, weather_features, response_format
+        )
+        cached = _PREDICT_ALL_CACHE.get(cache_key)
+        if cached is not None:
+            return _cached_predict_all_response(cached, snapshot_age)
+        
         # Build feature rows for all police stations
-        feature_rows = []
-        for station in DELHI_POLICE_STATIONS:
-            station_key = station.lower()
-            station_entry = aqi_dict.get(station_key)
-            station_aqi = station_entry.get("aqi", 150.0) if station_entry else 150.0
-            
-            feature_row = {
-                "month": request.month,
-                "day": request.day,
-                "police_station": station,
-                "gender": request.gender,
-                "family": request.family,
-                "Max Temperature": weather_features["temp_max"],
-                "Avg Temperature": weather_features["temp_avg"],
-                "Min Temperature": weather_features["temp_min"],
-                "Max Humidity": weather_features["humidity"],
-                "Avg Humidity": weather_features["humidity"],
-                "Min Humidity": weather_features["humidity"],
-                "Max Wind Speed": weather_features["wind_speed"],
-                "Avg Wind Speed": weather_features["wind_speed"],
-                "Min Wind Speed": weather_features["wind_speed"],
-                "Total Precipitation": weather_features["precipitation"],
-                "aqi": station_aqi,
-                "aqi_median": station_aqi,
-            }
-            feature_rows.append(feature_row)
+        with span("features"):
+            station_aqi = []
+            feature_rows = []
+            for station in DELHI_POLICE_STATIONS:
+                station_entry = aqi_dict.get(station.lower())
+                station_aqi.append(station_entry.get("aqi", 150.0) if station_entry else 150.0)
+                feature_rows.append(
+                    _station_feature_row(request, station, station_aqi[-1], weather_features, settings.aqi_median_window)
+                )
         
         # Make predictions for all stations
-        labels, probabilities = predict_safety(feature_rows, model, preprocessor, label_encoder)
+        with span("inference"):
+            labels, probabilities = await run_inference(
+                predict_safety, feature_rows, model, preprocessor, label_encoder
+            )
         
         # Build response
-        predictions = []
-        for station, label, probs in zip(DELHI_POLICE_STATIONS, labels, probabilities):
-            station_entry = aqi_dict.get(station.lower())
-            station_aqi = station_entry.get("aqi", 150.0) if station_entry else 150.0
-            prob_map = {cls: float(prob) for cls, prob in zip(label_encoder.classes_, probs)}
-            weather_snapshot = {
-                "temp": weather_features["temp_avg"],
-                "humidity": weather_features["humidity"],
-                "wind_speed": weather_features["wind_speed"],
-                "aqi": station_aqi,
-            }
-            
-            predictions.append(
-                SinglePredictionResponse(
-                    police_station=station,
-                    predicted_label=label,
-                    probabilities=prob_map,
-                    weather_snapshot=weather_snapshot
-                )
+        with span("build_response"):
+            entry = _predict_all_payload(
+                request,
+                DELHI_POLICE_STATIONS,
+                station_aqi,
+                labels,
+                probabilities,
+                label_encoder.classes_,
+                weather_features,
+                bundle.version,
+                response_format,
             )
+            if settings.predict_all_cache_serialized:
+                entry = dumps(entry)
+        _PREDICT_ALL_CACHE.set(cache_key, entry)
         
-        return PredictAllResponse(
-            city="Delhi",
-            gender=request.gender,
-            family=request.family,
-            month=request.month,
-            day=request.day,
-            predictions=predictions
-        )
+        return _cached_predict_all_response(entry, snapshot_age)
     
+    except HTTPException:
+        raise
     except Exception as e:
         LOGGER.error(f"Predict-all failed: {e}")
         raise HTTPException(status_code=500, detail=f"Predict-all failed: {str(e)}")
+
+
+@router.post("/predict-all/stream")
+async def predict_all_stream(request: PredictAllRequest):
+    """Stream /predict-all as NDJSON, one station per line, scored in micro-batches.
+    
+    With a servable AQI snapshot, stations are scored and written in chunks
+    of ``predict_all_stream_batch_size``. Without one (refresher disabled and
+    the snapshot expired, or the first refresh still running) each station's
+    AQI is fetched live, and whichever stations have their reading are
+    scored and written together, so the first lines do not wait for the
+    slowest monitor. Lines come in the order stations are scored.
+    """
+    settings = get_settings()
+    bundle = get_model_bundle()
+    
+    with span("weather"):
+        weather_bundle = await fetch_weather_and_aqi(
+            get_openweather_client(),
+            "Delhi",
+            settings.openweather_api_key,
+            settings.weather_url,
+            settings.air_pollution_url
+        )
+    weather_features = extract_weather_features(weather_bundle["weather"], weather_bundle["aqi"])
+    
+    headers = {"X-Model-Version": str(bundle.version)}
+    snapshot = get_servable_aqi_snapshot(settings)
+    if snapshot is not None:
+        headers["X-AQI-Snapshot-Age-Seconds"] = f"{snapshot.age_seconds:.3f}"
+        batches = _snapshot_station_batches(snapshot.stations, settings.predict_all_stream_batch_size)
+    else:
+        batches = _live_station_batches(settings)
+    
+    return StreamingResponse(
+        _stream_predictions(batches, request, bundle, weather_features, settings.aqi_median_window),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
+
+async def _snapshot_station_batches(
+    aqi_dict: Dict[str, Dict],
+    batch_size: int
+) -> AsyncIterator[List[Tuple[str, float]]]:
+    batch_size = max(1, batch_size)
+    for start in range(0, len(DELHI_POLICE_STATIONS), batch_size):
+        batch = []
+        for station in DELHI_POLICE_STATIONS[start:start + batch_size]:
+            station_entry = aqi_dict.get(station.lower())
+            batch.append((station, station_entry.get("aqi", 150.0) if station_entry else 150.0))
+        yield batch
+
+
+async def _live_station_batches(settings) -> AsyncIterator[List[Tuple[str, float]]]:
+    """Yield (station, aqi) pairs in groups, as their WAQI lookups complete."""
+    async def station_aqi(station: str) -> Tuple[str, float]:
+        if get_station_coordinates(station) is None:
+            return station, 150.0
+        station_entry = await fetch_single_station_aqi(
+            settings.waqi_api_token,
+            station,
+            client=get_waqi_client(),
+            cache_ttl=settings.aqi_station_cache_ttl,
+            retry_delay=settings.aqi_retry_delay,
+            max_retries=settings.aqi_max_retries,
+            api_url=settings.waqi_api_url
+        )
+        return station, station_entry.get("aqi", 150.0)
+    
+    pending = {asyncio.ensure_future(station_aqi(station)) for station in DELHI_POLICE_STATIONS}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            yield [task.result() for task in done]
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _stream_predictions(
+    batches: AsyncIterator[List[Tuple[str, float]]],
+    request: PredictAllRequest,
+    bundle,
+    weather_features: Dict[str, float],
+    median_window: int
+) -> AsyncIterator[bytes]:
+    """Score each batch and yield its NDJSON lines; a failure ends the stream with an error line."""
+    model, preprocessor, label_encoder = bundle.artifacts
+    # Same record shape as a /predict-all row, serialized without a pydantic model per line
+    classes = [str(cls) for cls in label_encoder.classes_]
+    weather = {
+        "temp": float(weather_features["temp_avg"]),
+        "humidity": float(weather_features["humidity"]),
+        "wind_speed": float(weather_features["wind_speed"]),
+    }
+    extra = {"model_version": bundle.version} if bundle.version is not None else {}
+    try:
+        async for batch in batches:
+            feature_rows = [
+                _station_feature_row(request, station, station_aqi, weather_features, median_window)
+                for station, station_aqi in batch
+            ]
+            labels, probabilities = await run_inference(
+                predict_safety, feature_rows, model, preprocessor, label_encoder
+            )
+            lines = [
+                dumps({
+                    "police_station": station,
+                    "predicted_label": str(label),
+                    "probabilities": dict(zip(classes, probs.tolist())),
+                    "weather_snapshot": {**weather, "aqi": float(station_aqi)},
+                    **extra,
+                })
+                for (station, station_aqi), label, probs in zip(batch, labels, probabilities)
+            ]
+            yield b"\n".join(lines) + b"\n"
+    except Exception as e:
+        # Headers are already sent, so the failure is reported in-band
+        LOGGER.error(f"Predict-all stream failed: {e}")
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        yield (json.dumps({"error": f"Predict-all failed: {detail}"}) + "\n").encode()
+
+
+@router.post("/predict-nearest", response_model=NearestPredictResponse)
+async def predict_nearest(request: NearestPredictRequest):
+    """Predict safety at the police station nearest to each GPS fix.
+    
+    Fixes are resolved in one KD-tree query over the stations the model was
+    fitted on; each distinct station is scored once and its prediction
+    fanned back out to every fix it serves.
+    """
+    settings = get_settings()
+    if len(request.points) > settings.nearest_max_points:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.nearest_max_points} points are accepted per request"
+        )
+    bundle = get_model_bundle()
+    model, preprocessor, label_encoder = bundle.artifacts
+    
+    try:
+        with span("nearest"):
+            index = get_model_station_index(preprocessor)
+            indices, distances = index.query(
+                [point.latitude for point in request.points],
+                [point.longitude for point in request.points]
+            )
+            indices, distances = indices[:, 0], distances[:, 0]
+            station_positions = sorted(set(indices.tolist()))
+            stations = [index.names[position] for position in station_positions]
+        
+        with span("weather"):
+            weather_bundle = await fetch_weather_and_aqi(
+                get_openweather_client(),
+                "Delhi",
+                settings.openweather_api_key,
+                settings.weather_url,
+                settings.air_pollution_url
+            )
+        with span("aqi_snapshot"):
+            snapshot = await get_current_aqi_snapshot(settings)
+        weather_features = extract_weather_features(weather_bundle["weather"], weather_bundle["aqi"])
+        
+        with span("features"):
+            station_aqi = {}
+            feature_rows = []
+            for station in stations:
+                station_entry = snapshot.get(station)
+                station_aqi[station] = station_entry.get("aqi", 150.0) if station_entry else 150.0
+                feature_rows.append(_station_feature_row(
+                    request, station, station_aqi[station], weather_features, settings.aqi_median_window
+                ))
+        
+        with span("inference"):
+            labels, probabilities = await run_inference(
+                predict_safety, feature_rows, model, preprocessor, label_encoder
+            )
+        
+        with span("build_response"):
+            by_position = {}
+            for position, station, label, probs in zip(station_positions, stations, labels, probabilities):
+                by_position[position] = (
+                    station,
+                    label,
+                    {cls: float(prob) for cls, prob in zip(label_encoder.classes_, probs)},
+                    {
+                        "temp": weather_features["temp_avg"],
+                        "humidity": weather_features["humidity"],
+                        "wind_speed": weather_features["wind_speed"],
+                        "aqi": station_aqi[station],
+                    },
+                )
+            predictions = []
+            for point, position, distance in zip(request.points, indices.tolist(), distances.tolist()):
+                station, label, prob_map, weather_snapshot = by_position[position]
+                predictions.append(
+                    NearestStationPrediction(
+                        latitude=point.latitude,
+                        longitude=point.longitude,
+                        police_station=station,
+                        distance_km=round(distance, 3),
+                        predicted_label=label,
+                        probabilities=prob_map,
+                        weather_snapshot=weather_snapshot,
+                    )
+                )
+        
+        return NearestPredictResponse(
+            predictions=predictions,
+            model_version=bundle.version,
+            aqi_snapshot_age_seconds=round(snapshot.age_seconds, 3)
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        LOGGER.error(f"Predict-nearest failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Predict-nearest failed: {str(e)}")
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -11,3 +11,15 @@ class AQIData(BaseModel):
 class AQIResponse(BaseModel):
     timestamp: str
     data: List[AQIData]
+    snapshot_version: Optional[int] = None
+    snapshot_age_seconds: Optional[float] = None
+
+
+class AQIColumnarResponse(BaseModel):
+    timestamp: str
+    format: str = "columnar"
+    stations: List[str]
+    aqi: List[float]
+    aqi_category: List[str]
+    snapshot_version: Optional[int] = None
+    snapshot_age_seconds: Optional[float] = None
@@ -1,6 +1,6 @@
 """Schemas for prediction requests and responses."""
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -28,6 +28,7 @@ class PredictionResult(BaseModel):
 
 class BatchPredictResponse(BaseModel):
     predictions: List[PredictionResult]
+    model_version: Optional[str] = None
 
 
 class SingleLocationRequest(BaseModel):
@@ -43,6 +44,7 @@ class SinglePredictionResponse(BaseModel):
     predicted_label: str
     probabilities: Dict[str, float]
     weather_snapshot: Dict[str, float]
+    model_version: Optional[str] = None
 
 
 class PredictAllRequest(BaseModel):
@@ -59,3 +61,51 @@ class PredictAllResponse(BaseModel):
     month: int
     day: int
     predictions: List[SinglePredictionResponse]
+    model_version: Optional[str] = None
+    aqi_snapshot_age_seconds: Optional[float] = None
+
+
+class PredictAllColumnarResponse(BaseModel):
+    city: str
+    gender: str
+    family: str
+    month: int
+    day: int
+    format: str = "columnar"
+    classes: List[str]
+    stations: List[str]
+    predicted_label: List[str]
+    aqi: List[float]
+    probabilities: List[List[float]] = Field(..., description="One row per station, columns in `classes` order")
+    weather: Dict[str, float]
+    model_version: Optional[str] = None
+    aqi_snapshot_age_seconds: Optional[float] = None
+
+
+class GeoPoint(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+
+class NearestPredictRequest(BaseModel):
+    points: List[GeoPoint] = Field(..., min_length=1, description="GPS fixes; one or many")
+    gender: str = Field("female", description="Gender: male, female, or other")
+    family: str = Field("alone", description="Family status: with_family or alone")
+    month: int = Field(..., ge=1, le=12, description="Month (1-12)")
+    day: int = Field(..., ge=1, le=31, description="Day of month")
+
+
+class NearestStationPrediction(BaseModel):
+    latitude: float
+    longitude: float
+    police_station: str
+    distance_km: float
+    predicted_label: str
+    probabilities: Dict[str, float]
+    weather_snapshot: Dict[str, float]
+
+
+class NearestPredictResponse(BaseModel):
+    predictions: List[NearestStationPrediction]
+    model_version: Optional[str] = None
+    aqi_snapshot_age_seconds: Optional[float] = None
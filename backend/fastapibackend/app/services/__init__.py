@@ -1,12 +1,10 @@
 """Service layer for business logic."""
 
-from .gemini_service import fetch_aqi_from_gemini, categorize_aqi
-from .waqi_service import fetch_aqi_from_waqi, get_station_coordinates, get_all_station_names
+from .waqi_service import fetch_aqi_from_waqi, categorize_aqi, get_station_coordinates, get_all_station_names
 from .weather_service import fetch_weather_and_aqi
 from .prediction_service import predict_safety
 
 __all__ = [
-    "fetch_aqi_from_gemini",
     "categorize_aqi",
     "fetch_aqi_from_waqi",
     "get_station_coordinates", 
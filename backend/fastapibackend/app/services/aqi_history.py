@@ -0,0 +1,189 @@
+"""Per-station AQI history with incrementally maintained rolling statistics.
+
+Observations live in a stations x slots ring buffer (one column per
+snapshot refresh, with the refresh time per slot). For every configured
+window, in slots, each station's last ``window`` readings are also kept
+as a sorted row. An append removes the reading that leaves the window and
+inserts the new one, which is O(window) per station with no sorting. After
+that, median, min and max are single index lookups and the mean comes from
+a running sum. Missing readings (fallbacks, carried-forward stale values
+and monitors that answered without a value) are stored as NaN and left out
+of the statistics.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+STATISTICS = ("median", "min", "max", "mean")
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _is_placeholder(entry: Dict) -> bool:
+    return "error" in entry or "stale_seconds" in entry or entry.get("no_reading", False)
+
+
+class _RollingWindow:
+    """Sorted last-``size`` readings per station; empty positions hold +inf."""
+
+    def __init__(self, n_stations: int, size: int):
+        self.size = size
+        self.sorted = np.full((n_stations, size), np.inf)
+        self.counts = np.zeros(n_stations, dtype=np.int64)
+        self.sums = np.zeros(n_stations)
+        self.stats: Dict[str, np.ndarray] = {name: np.full(n_stations, np.nan) for name in STATISTICS}
+        self._columns = np.arange(size)
+
+    def update(self, leaving: Optional[np.ndarray], entering: np.ndarray) -> None:
+        """Drop ``leaving`` (None while the window is filling) and add ``entering``; NaN means no reading."""
+        if leaving is not None:
+            rows = np.flatnonzero(~np.isnan(leaving))
+            if rows.size:
+                self._remove(rows, leaving[rows])
+        rows = np.flatnonzero(~np.isnan(entering))
+        if rows.size:
+            self._insert(rows, entering[rows])
+        self._refresh_stats()
+
+    def _remove(self, rows: np.ndarray, values: np.ndarray) -> None:
+        block = self.sorted[rows]
+        position = np.argmax(block == values[:, None], axis=1)
+        # Shift everything after the removed value one place left
+        source = np.minimum(self._columns + (self._columns >= position[:, None]), self.size - 1)
+        block = np.take_along_axis(block, source, axis=1)
+        block[:, -1] = np.inf
+        self.sorted[rows] = block
+        self.counts[rows] -= 1
+        self.sums[rows] -= values
+
+    def _insert(self, rows: np.ndarray, values: np.ndarray) -> None:
+        block = self.sorted[rows]
+        position = (block < values[:, None]).sum(axis=1)[:, None]
+        # Shift everything from the insertion point one place right
+        shifted = block[:, np.maximum(self._columns - 1, 0)]
+        block = np.where(
+            self._columns < position, block, np.where(self._columns == position, values[:, None], shifted)
+        )
+        self.sorted[rows] = block
+        self.counts[rows] += 1
+        self.sums[rows] += values
+
+    def _refresh_stats(self) -> None:
+        counts = self.counts
+        has_data = counts > 0
+        rows = np.arange(len(counts))
+        last = np.maximum(counts - 1, 0)
+        lower = self.sorted[rows, last // 2]
+        upper = self.sorted[rows, (last + 1) // 2]
+        self.stats["median"] = np.where(has_data, (lower + upper) / 2, np.nan)
+        self.stats["min"] = np.where(has_data, self.sorted[:, 0], np.nan)
+        self.stats["max"] = np.where(has_data, self.sorted[rows, last], np.nan)
+        self.stats["mean"] = np.where(has_data, self.sums / np.maximum(counts, 1), np.nan)
+
+
+class AQIHistory:
+    """Ring buffer of AQI observations for a fixed set of stations."""
+
+    def __init__(self, stations: Sequence[str], capacity: int, windows: Sequence[int]):
+        """Create an empty history.
+
+        Args:
+            stations: Station names (lower case, as in snapshots)
+            capacity: Slots kept per station; the oldest is overwritten when full
+            windows: Rolling window sizes in slots (each at most ``capacity``)
+        """
+        self.stations: List[str] = list(stations)
+        self.capacity = max(1, capacity)
+        self._rows = {station: row for row, station in enumerate(self.stations)}
+        self.values = np.full((len(self.stations), self.capacity), np.nan)
+        self.timestamps = np.full(self.capacity, np.nan)
+        self.size = 0
+        self._head = 0  # next slot to write
+        self.windows: Dict[int, _RollingWindow] = {
+            size: _RollingWindow(len(self.stations), size)
+            for size in sorted({min(max(1, size), self.capacity) for size in windows})
+        }
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, stations: Dict[str, Dict], timestamp: float) -> None:
+        """Record one snapshot; stations that are missing, fallbacks, stale or without a reading get NaN."""
+        column = np.full(len(self.stations), np.nan)
+        for station, entry in stations.items():
+            row = self._rows.get(station)
+            if row is not None and not _is_placeholder(entry):
+                column[row] = entry.get("aqi", np.nan)
+
+        for size, window in self.windows.items():
+            leaving = self.values[:, (self._head - size) % self.capacity] if self.size >= size else None
+            window.update(leaving, column)
+
+        self.values[:, self._head] = column
+        self.timestamps[self._head] = timestamp
+        self._head = (self._head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def stat(self, station: str, name: str, window: int) -> Optional[float]:
+        """Return a rolling statistic for ``station``, or None without readings in the window."""
+        row = self._rows.get(station.lower())
+        rolling = self.windows.get(window)
+        if row is None or rolling is None:
+            return None
+        value = rolling.stats[name][row]
+        return None if np.isnan(value) else float(value)
+
+    def series(self, station: str, limit: Optional[int] = None) -> Optional[Dict]:
+        """Return ``station``'s observations (oldest first) and its rolling statistics."""
+        row = self._rows.get(station.lower())
+        if row is None:
+            return None
+        count = self.size if limit is None else max(0, min(limit, self.size))
+        slots = (self._head - count + np.arange(count)) % self.capacity
+        observations = [
+            {
+                "timestamp": _isoformat(self.timestamps[slot]),
+                "aqi": None if np.isnan(value) else float(value),
+            }
+            for slot, value in zip(slots.tolist(), self.values[row, slots].tolist())
+        ]
+        windows = {}
+        for size, rolling in self.windows.items():
+            stats = {name: rolling.stats[name][row] for name in STATISTICS}
+            windows[str(size)] = {
+                "readings": int(rolling.counts[row]),
+                **{name: None if np.isnan(value) else round(float(value), 2) for name, value in stats.items()},
+            }
+        return {"station": self.stations[row], "observations": observations, "windows": windows}
+
+
+_HISTORY: Optional[AQIHistory] = None
+
+
+def init_aqi_history(stations: Sequence[str], capacity: int, windows: Sequence[int]) -> AQIHistory:
+    """Create the process-wide history. Called when the AQI refresher starts."""
+    global _HISTORY
+    _HISTORY = AQIHistory(stations, capacity, windows)
+    LOGGER.info(
+        "AQI history: %d stations x %d slots, windows %s", len(_HISTORY.stations), capacity, list(_HISTORY.windows)
+    )
+    return _HISTORY
+
+
+def get_aqi_history() -> Optional[AQIHistory]:
+    return _HISTORY
+
+
+def rolling_aqi_median(station: str, window: int, default: float) -> float:
+    """Return ``station``'s rolling AQI median, or ``default`` before it has readings."""
+    if _HISTORY is None:
+        return default
+    value = _HISTORY.stat(station, "median", window)
+    return default if value is None else value
@@ -0,0 +1,125 @@
+"""Inverse-distance-weighted AQI at police stations from scattered monitors.
+
+Distances are a stations x monitors great-circle matrix, so interpolating
+every station is a handful of NumPy operations. Each station uses its
+``neighbors`` nearest monitors, weighted by ``1 / distance ** power``. A
+station within a few metres of a monitor takes that monitor's reading.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+# Closer than this, a station simply takes the monitor's reading
+COINCIDENT_KM = 0.005
+
+
+def distance_matrix_km(
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    other_latitudes: Sequence[float],
+    other_longitudes: Sequence[float]
+) -> np.ndarray:
+    """Haversine distances (km) between every pair of points, shaped (len(first), len(other))."""
+    lat1 = np.radians(np.asarray(latitudes, dtype=np.float64))[:, None]
+    lng1 = np.radians(np.asarray(longitudes, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(other_latitudes, dtype=np.float64))[None, :]
+    lng2 = np.radians(np.asarray(other_longitudes, dtype=np.float64))[None, :]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def idw_weights(distances: np.ndarray, power: float = 2.0, neighbors: int = 0) -> np.ndarray:
+    """Row-normalised IDW weights for a (points x monitors) distance matrix.
+
+    Args:
+        distances: Distances in km
+        power: Distance exponent; higher values favour the nearest monitors
+        neighbors: Monitors used per point (nearest first); 0 uses all
+
+    Returns:
+        Weights with the same shape as ``distances``; each row sums to 1
+    """
+    n_points, n_monitors = distances.shape
+    weights = 1.0 / np.maximum(distances, COINCIDENT_KM) ** power
+    if 0 < neighbors < n_monitors:
+        # Zero every monitor beyond each row's k-th nearest
+        far = np.argpartition(distances, neighbors, axis=1)[:, neighbors:]
+        np.put_along_axis(weights, far, 0.0, axis=1)
+    # Coincident monitors take all the weight
+    coincident = distances < COINCIDENT_KM
+    has_coincident = coincident.any(axis=1)
+    if has_coincident.any():
+        weights[has_coincident] = coincident[has_coincident].astype(np.float64)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+@dataclass(frozen=True)
+class Interpolation:
+    """One IDW run, kept so the weights behind each station's AQI can be inspected."""
+
+    stations: List[str]
+    monitors: List[Dict] = field(repr=False)
+    values: np.ndarray = field(repr=False)
+    distances: np.ndarray = field(repr=False)
+    weights: np.ndarray = field(repr=False)
+    estimates: np.ndarray = field(repr=False)
+
+    def explain(self, station: str) -> Dict:
+        """Return the monitors contributing to ``station``, heaviest first."""
+        row = self.stations.index(station)
+        contributions = [
+            {
+                **self.monitors[col],
+                "aqi": float(self.values[col]),
+                "distance_km": round(float(self.distances[row, col]), 3),
+                "weight": round(float(self.weights[row, col]), 6),
+            }
+            for col in np.flatnonzero(self.weights[row])
+        ]
+        contributions.sort(key=lambda item: item["weight"], reverse=True)
+        return {"station": station, "aqi": round(float(self.estimates[row]), 1), "monitors": contributions}
+
+
+def interpolate_idw(
+    stations: Dict[str, Sequence[float]],
+    monitors: List[Dict],
+    power: float = 2.0,
+    neighbors: int = 0
+) -> Interpolation:
+    """Estimate AQI at each station from monitor readings.
+
+    Args:
+        stations: Station name -> (lng, lat), as in POLICE_STATION_COORDINATES
+        monitors: Monitors with numeric ``aqi``, ``lat`` and ``lon`` (other keys are kept for ``explain``)
+        power: IDW distance exponent
+        neighbors: Monitors used per station; 0 uses all
+
+    Returns:
+        The interpolation, with one estimate per station in ``stations`` order
+    """
+    if not monitors:
+        raise ValueError("No monitors with readings to interpolate from")
+    names = list(stations)
+    station_lng_lat = np.asarray([stations[name] for name in names], dtype=np.float64)
+    values = np.asarray([monitor["aqi"] for monitor in monitors], dtype=np.float64)
+    distances = distance_matrix_km(
+        station_lng_lat[:, 1],
+        station_lng_lat[:, 0],
+        [monitor["lat"] for monitor in monitors],
+        [monitor["lon"] for monitor in monitors],
+    )
+    weights = idw_weights(distances, power, neighbors)
+    return Interpolation(
+        stations=names,
+        monitors=[{key: value for key, value in monitor.items() if key != "aqi"} for monitor in monitors],
+        values=values,
+        distances=distances,
+        weights=weights,
+        estimates=weights @ values,
+    )
@@ -0,0 +1,289 @@
+"""Background-refreshed, versioned station-to-AQI snapshot.
+
+Each published snapshot is also written to the snapshot store (SQLite under
+``data/``) and restored from it at startup, so a new worker serves the last
+known readings straight away. A station that comes back as the fixed
+fallback keeps its previous real reading (marked with ``stale_seconds``)
+for up to ``upstream_last_good_max_age`` seconds, including across restarts.
+Every snapshot is also appended to the per-station AQI history.
+
+While refreshes keep failing (an exception, or no station with a fresh
+reading) the refresher waits exponentially longer between attempts, with
+jitter, up to ``aqi_refresh_max_backoff`` seconds, so a WAQI outage is not
+polled at the full rate.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+from ..config import Settings
+from ..metrics import UPSTREAM_LAST_GOOD
+from .aqi_history import get_aqi_history, init_aqi_history
+from .http_client import get_waqi_client
+from .monitor_map import get_monitor_map
+from .snapshot_store import get_snapshot_store
+from .waqi_service import POLICE_STATION_COORDINATES, fetch_aqi_from_waqi, fetch_aqi_from_waqi_bounds
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AQISnapshot:
+    """Immutable AQI readings for every configured station."""
+
+    version: int
+    stations: Dict[str, Dict] = field(repr=False)
+    fetched_at: float
+    restored: bool = False  # loaded from the snapshot store rather than fetched by this process
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+    @property
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.fetched_at, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+    def get(self, station: str) -> Optional[Dict]:
+        return self.stations.get(station.lower())
+
+
+# Published snapshot; replaced wholesale so readers never see a partial refresh
+_SNAPSHOT: Optional[AQISnapshot] = None
+_REFRESH_TASK: Optional[asyncio.Task] = None
+_READY: Optional[asyncio.Event] = None
+_REFRESH_LOCK: Optional[asyncio.Lock] = None
+
+
+def get_aqi_snapshot() -> Optional[AQISnapshot]:
+    """Return the latest published snapshot, or None before the first refresh."""
+    return _SNAPSHOT
+
+
+def _publish(stations: Dict[str, Dict]) -> AQISnapshot:
+    global _SNAPSHOT
+    version = _SNAPSHOT.version + 1 if _SNAPSHOT is not None else 1
+    _SNAPSHOT = AQISnapshot(version=version, stations=stations, fetched_at=time.time())
+    if _READY is not None:
+        _READY.set()
+    return _SNAPSHOT
+
+
+def _carry_forward(stations: Dict[str, Dict], previous: Optional[AQISnapshot], max_age: float) -> Dict[str, Dict]:
+    """Replace fixed-fallback entries with the previous snapshot's reading, if it is recent enough."""
+    if previous is None:
+        return stations
+    carried = 0
+    for station_name, entry in stations.items():
+        if "error" not in entry:
+            continue
+        old = previous.stations.get(station_name)
+        if old is None or "error" in old:
+            continue
+        age = previous.age_seconds + old.get("stale_seconds", 0.0)
+        if age > max_age:
+            continue
+        stations[station_name] = {**old, "stale_seconds": round(age, 1)}
+        carried += 1
+    if carried:
+        UPSTREAM_LAST_GOOD.inc("waqi", amount=carried)
+        LOGGER.warning(f"Kept previous AQI readings for {carried} stations that fell back to the default")
+    return stations
+
+
+def _restore_snapshot() -> None:
+    """Publish the stored snapshot, if any, before the first refresh completes."""
+    global _SNAPSHOT
+    store = get_snapshot_store()
+    if store is None or _SNAPSHOT is not None:
+        return
+    try:
+        stored = store.load_aqi()
+    except Exception as exc:
+        LOGGER.warning(f"Ignoring unreadable AQI snapshot store {store.path}: {exc}")
+        return
+    if stored is None:
+        return
+    version, fetched_at, stations = stored
+    _SNAPSHOT = AQISnapshot(version=version, stations=stations, fetched_at=fetched_at, restored=True)
+    LOGGER.info(
+        "Restored AQI snapshot v%d for %d stations (%.0fs old) from %s",
+        version,
+        len(stations),
+        _SNAPSHOT.age_seconds,
+        store.path,
+    )
+
+
+def _record_history(snapshot: AQISnapshot) -> None:
+    history = get_aqi_history()
+    if history is not None:
+        history.append(snapshot.stations, snapshot.fetched_at)
+
+
+async def _persist(snapshot: AQISnapshot, source: str) -> None:
+    store = get_snapshot_store()
+    if store is None:
+        return
+    try:
+        await asyncio.to_thread(store.save_aqi, snapshot.version, source, snapshot.fetched_at, snapshot.stations)
+    except Exception as exc:
+        LOGGER.warning(f"Could not persist AQI snapshot: {exc}")
+
+
+async def refresh_aqi_snapshot(settings: Settings) -> AQISnapshot:
+    """Fetch AQI for every station and publish it as a new snapshot version."""
+    started = time.perf_counter()
+    if settings.aqi_source == "bounds":
+        stations = await fetch_aqi_from_waqi_bounds(
+            waqi_token=settings.waqi_api_token,
+            bounds=settings.aqi_bounds,
+            power=settings.aqi_idw_power,
+            neighbors=settings.aqi_idw_neighbors,
+            retry_delay=settings.aqi_retry_delay,
+            max_retries=settings.aqi_max_retries,
+            client=get_waqi_client(),
+            api_url=settings.waqi_api_url,
+        )
+    else:
+        stations = await _fetch_station_feeds(settings)
+    snapshot = _publish(_carry_forward(stations, _SNAPSHOT, settings.upstream_last_good_max_age))
+    _record_history(snapshot)
+    await _persist(snapshot, settings.aqi_source)
+    LOGGER.info(
+        "Published AQI snapshot v%d for %d stations in %.2fs",
+        snapshot.version,
+        len(stations),
+        time.perf_counter() - started,
+    )
+    return snapshot
+
+
+async def _fetch_station_feeds(settings: Settings) -> Dict[str, Dict]:
+    monitor_map = None
+    if settings.waqi_dedupe_monitors:
+        monitor_map = get_monitor_map(settings.waqi_monitor_map_path, settings.waqi_monitor_map_max_age)
+    stations = await fetch_aqi_from_waqi(
+        waqi_token=settings.waqi_api_token,
+        max_concurrent=settings.aqi_max_concurrent,
+        retry_delay=settings.aqi_retry_delay,
+        max_retries=settings.aqi_max_retries,
+        client=get_waqi_client(),
+        api_url=settings.waqi_api_url,
+        monitor_map=monitor_map,
+    )
+    if monitor_map is not None and monitor_map.dirty:
+        try:
+            await asyncio.to_thread(monitor_map.save)
+        except OSError as exc:
+            LOGGER.warning(f"Could not persist WAQI monitor map: {exc}")
+    return stations
+
+
+def _has_fresh_readings(snapshot: AQISnapshot) -> bool:
+    return any("error" not in entry and "stale_seconds" not in entry for entry in snapshot.stations.values())
+
+
+def _refresh_delay(interval: float, failures: int, max_backoff: float) -> float:
+    """Seconds to wait before the next refresh after ``failures`` consecutive failed ones."""
+    if failures <= 0:
+        return interval
+    delay = min(max(interval, max_backoff), interval * 2 ** min(failures, 32))
+    # Jitter keeps workers that failed together from retrying together
+    return random.uniform(delay / 2, delay)
+
+
+async def _refresh_loop(settings: Settings) -> None:
+    failures = 0
+    while True:
+        try:
+            snapshot = await refresh_aqi_snapshot(settings)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            LOGGER.error(f"AQI snapshot refresh failed: {exc}")
+            failures += 1
+        else:
+            failures = 0 if _has_fresh_readings(snapshot) else failures + 1
+        delay = _refresh_delay(settings.aqi_refresh_interval, failures, settings.aqi_refresh_max_backoff)
+        if failures:
+            LOGGER.warning(f"{failures} consecutive AQI refreshes without fresh readings; next in {delay:.0f}s")
+        await asyncio.sleep(delay)
+
+
+def start_aqi_refresher(settings: Settings) -> None:
+    """Start the background refresh task. Called from the app lifespan."""
+    global _REFRESH_TASK, _READY, _REFRESH_LOCK
+    _READY = asyncio.Event()
+    _REFRESH_LOCK = asyncio.Lock()
+    init_aqi_history(
+        list(POLICE_STATION_COORDINATES),
+        settings.aqi_history_slots,
+        (*settings.aqi_history_windows, settings.aqi_median_window),
+    )
+    _restore_snapshot()
+    if _SNAPSHOT is not None:
+        _record_history(_SNAPSHOT)
+        _READY.set()
+    if not settings.aqi_refresh_enabled:
+        LOGGER.info("AQI snapshot refresher disabled; snapshots are refreshed on demand")
+        return
+    _REFRESH_TASK = asyncio.create_task(_refresh_loop(settings), name="aqi-snapshot-refresher")
+
+
+async def stop_aqi_refresher() -> None:
+    """Cancel the background refresh task. Called from the app lifespan."""
+    global _REFRESH_TASK
+    task, _REFRESH_TASK = _REFRESH_TASK, None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def get_servable_aqi_snapshot(settings: Settings) -> Optional[AQISnapshot]:
+    """Return the snapshot ``get_current_aqi_snapshot`` would serve without waiting, or None."""
+    snapshot = _SNAPSHOT
+    if snapshot is None:
+        return None
+    if _REFRESH_TASK is not None or snapshot.age_seconds < settings.aqi_refresh_interval:
+        return snapshot
+    return None
+
+
+async def get_current_aqi_snapshot(settings: Settings) -> AQISnapshot:
+    """Return the snapshot to serve a request from.
+
+    With the background refresher running this is an O(1) read; only the very
+    first requests after startup wait (bounded) for the initial refresh. With
+    the refresher disabled, a missing or expired snapshot is refreshed once on
+    demand and shared by all concurrent callers.
+    """
+    snapshot = _SNAPSHOT
+    if _REFRESH_TASK is not None:
+        if snapshot is not None:
+            return snapshot
+        try:
+            await asyncio.wait_for(_READY.wait(), timeout=settings.aqi_snapshot_wait_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="AQI data not available yet, retry shortly")
+        return _SNAPSHOT
+
+    if snapshot is not None and snapshot.age_seconds < settings.aqi_refresh_interval:
+        return snapshot
+    if _REFRESH_LOCK is None:
+        return await refresh_aqi_snapshot(settings)
+    async with _REFRESH_LOCK:
+        if _SNAPSHOT is not None and _SNAPSHOT is not snapshot:
+            return _SNAPSHOT
+        return await refresh_aqi_snapshot(settings)
@@ -0,0 +1,177 @@
+"""Micro-batching of concurrent single-row predictions."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import Settings
+from ..metrics import INFERENCE_MICROBATCH_ROWS, INFERENCE_QUEUE_WAIT_SECONDS
+from .inference_executor import run_inference
+from .prediction_service import predict_safety
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class BatcherStats:
+    """Running totals for batch sizes and queue wait times."""
+
+    batches: int = 0
+    rows: int = 0
+    max_batch_size: int = 0
+    queue_wait_seconds_total: float = 0.0
+    queue_wait_seconds_max: float = 0.0
+
+    def record(self, size: int, waits: List[float]) -> None:
+        self.batches += 1
+        self.rows += size
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.queue_wait_seconds_total += sum(waits)
+        self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, max(waits, default=0.0))
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "mean_queue_wait_ms": 1000 * self.queue_wait_seconds_total / self.rows if self.rows else 0.0,
+            "max_queue_wait_ms": 1000 * self.queue_wait_seconds_max,
+        }
+
+
+@dataclass
+class _PendingRow:
+    row: Dict[str, float | str]
+    model: object
+    preprocessor: object
+    label_encoder: object
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class InferenceBatcher:
+    """Gather rows from concurrent callers and score them in one model call.
+
+    A batch is closed when it reaches ``max_batch_size`` rows or when
+    ``max_wait_ms`` has passed since its first row arrived, whichever comes
+    first. Each caller gets its own row's result (or the batch's exception).
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.stats = BatcherStats()
+        self._queue: "asyncio.Queue[_PendingRow]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="inference-batcher")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Inference batcher stopped"))
+
+    async def predict(self, row: Dict[str, float | str], model, preprocessor, label_encoder) -> Tuple[str, np.ndarray]:
+        """Queue one feature row and wait for its (label, probabilities)."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_PendingRow(row, model, preprocessor, label_encoder, future, time.perf_counter()))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._score(batch)
+
+    async def _score(self, batch: List[_PendingRow]) -> None:
+        started = time.perf_counter()
+        waits = [started - pending.enqueued_at for pending in batch]
+        self.stats.record(len(batch), waits)
+        INFERENCE_MICROBATCH_ROWS.observe(value=len(batch))
+        for wait in waits:
+            INFERENCE_QUEUE_WAIT_SECONDS.observe(value=wait)
+
+        # Rows queued across a model reload must be scored by their own artifacts
+        groups: Dict[int, List[_PendingRow]] = {}
+        for pending in batch:
+            groups.setdefault(id(pending.model), []).append(pending)
+
+        for group in groups.values():
+            first = group[0]
+            try:
+                labels, probabilities = await run_inference(
+                    predict_safety,
+                    [pending.row for pending in group],
+                    first.model,
+                    first.preprocessor,
+                    first.label_encoder,
+                )
+            except Exception as exc:
+                for pending in group:
+                    if not pending.future.done():
+                        pending.future.set_exception(exc)
+                continue
+            for pending, label, probs in zip(group, labels, probabilities):
+                if not pending.future.done():
+                    pending.future.set_result((label, probs))
+
+
+_BATCHER: Optional[InferenceBatcher] = None
+
+
+def start_inference_batcher(settings: Settings) -> None:
+    """Start the shared batcher. Called from the app lifespan."""
+    global _BATCHER
+    if not settings.inference_batching_enabled or _BATCHER is not None:
+        return
+    _BATCHER = InferenceBatcher(settings.inference_batch_max_size, settings.inference_batch_max_wait_ms)
+    _BATCHER.start()
+
+
+async def stop_inference_batcher() -> None:
+    """Stop the shared batcher. Called from the app lifespan."""
+    global _BATCHER
+    batcher, _BATCHER = _BATCHER, None
+    if batcher is not None:
+        LOGGER.info("Inference batcher stats: %s", batcher.stats.as_dict())
+        await batcher.stop()
+
+
+async def predict_one(row: Dict[str, float | str], model, preprocessor, label_encoder) -> Tuple[str, np.ndarray]:
+    """Predict a single row, through the micro-batcher when it is running."""
+    if _BATCHER is not None:
+        return await _BATCHER.predict(row, model, preprocessor, label_encoder)
+    labels, probabilities = await run_inference(predict_safety, [row], model, preprocessor, label_encoder)
+    return labels[0], probabilities[0]
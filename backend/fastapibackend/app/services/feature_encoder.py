@@ -0,0 +1,208 @@
+"""Pandas-free feature encoder compiled from the fitted preprocessor."""
+
+import logging
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+
+class UnsupportedPreprocessorError(ValueError):
+    """Raised when a preprocessor uses steps the compiled encoder cannot reproduce."""
+
+
+class CompiledFeatureEncoder:
+    """Reproduce ``preprocessor.transform`` on plain feature dicts.
+
+    Supports a ``ColumnTransformer`` whose transformers are pipelines of
+    ``SimpleImputer``, ``StandardScaler`` and ``OneHotEncoder`` (dense output,
+    ``handle_unknown='ignore'``, no dropped categories) with a dropped
+    remainder, which is what the training notebook produces. All fitted
+    statistics and the output column of every category value are extracted
+    once, so encoding a batch is a single pass into a float32 matrix.
+    """
+
+    def __init__(
+        self,
+        numeric_blocks: List[Tuple[List[str], int, np.ndarray, np.ndarray, np.ndarray]],
+        categorical_columns: List[Tuple[str, object, Dict[object, int]]],
+        n_outputs: int,
+    ):
+        self.numeric_blocks = numeric_blocks
+        self.categorical_columns = categorical_columns
+        self.n_outputs = n_outputs
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor) -> "CompiledFeatureEncoder":
+        """Compile an encoder from a fitted ``ColumnTransformer``."""
+        from sklearn.compose import ColumnTransformer
+        from sklearn.impute import SimpleImputer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise UnsupportedPreprocessorError(f"Expected ColumnTransformer, got {type(preprocessor).__name__}")
+        if getattr(preprocessor, "sparse_output_", False):
+            raise UnsupportedPreprocessorError("Sparse ColumnTransformer output is not supported")
+
+        numeric_blocks = []
+        categorical_columns = []
+        for name, transformer, columns in preprocessor.transformers_:
+            output = preprocessor.output_indices_[name]
+            if name == "remainder":
+                if transformer != "drop" and output.stop > output.start:
+                    raise UnsupportedPreprocessorError("Remainder columns must be dropped")
+                continue
+            if transformer == "drop":
+                continue
+
+            steps = [step for _, step in transformer.steps] if isinstance(transformer, Pipeline) else [transformer]
+            columns = list(columns)
+            n_cols = len(columns)
+            fill = np.full(n_cols, np.nan)
+            imputed = False
+            mean = np.zeros(n_cols)
+            scale = np.ones(n_cols)
+            encoder = None
+
+            for step in steps:
+                if isinstance(step, SimpleImputer):
+                    if step.add_indicator or not _is_nan(step.missing_values):
+                        raise UnsupportedPreprocessorError("Only NaN-based imputers without indicators are supported")
+                    fill = step.statistics_
+                    imputed = True
+                elif isinstance(step, StandardScaler):
+                    if step.mean_ is not None:
+                        mean = step.mean_
+                    if step.scale_ is not None:
+                        scale = step.scale_
+                elif isinstance(step, OneHotEncoder) and encoder is None:
+                    encoder = step
+                else:
+                    raise UnsupportedPreprocessorError(f"Unsupported step {type(step).__name__} in '{name}'")
+
+            if encoder is None:
+                numeric_blocks.append((
+                    columns,
+                    output.start,
+                    np.asarray(fill, dtype=np.float64),
+                    np.asarray(mean, dtype=np.float64),
+                    np.asarray(scale, dtype=np.float64),
+                ))
+                continue
+
+            if encoder.drop_idx_ is not None or encoder.handle_unknown != "ignore":
+                raise UnsupportedPreprocessorError("OneHotEncoder must keep all categories and ignore unknowns")
+            if getattr(encoder, "_infrequent_enabled", False):
+                raise UnsupportedPreprocessorError("Infrequent category grouping is not supported")
+            offset = output.start
+            for j, (column, categories) in enumerate(zip(columns, encoder.categories_)):
+                codes = {value: offset + i for i, value in enumerate(categories.tolist())}
+                categorical_columns.append((column, fill[j] if imputed else None, codes))
+                offset += len(categories)
+
+        n_outputs = max((s.stop for s in preprocessor.output_indices_.values()), default=0)
+        return cls(numeric_blocks, categorical_columns, n_outputs)
+
+    @property
+    def categories(self) -> Dict[str, List[object]]:
+        """Known category values per categorical input column."""
+        return {column: list(codes) for column, _, codes in self.categorical_columns}
+
+    def category_column(self, column: str, value: object) -> Optional[int]:
+        """Return the output column set by ``value`` of ``column`` (None if unknown)."""
+        for name, _, codes in self.categorical_columns:
+            if name == column:
+                return codes.get(value)
+        raise KeyError(column)
+
+    def encode(self, batch: Sequence[Dict[str, float | str]]) -> np.ndarray:
+        """Encode feature dicts into a ``(len(batch), n_outputs)`` float32 matrix."""
+        out = np.zeros((len(batch), self.n_outputs), dtype=np.float32)
+        if not batch:
+            return out
+
+        for columns, start, fill, mean, scale in self.numeric_blocks:
+            values = np.array([[row.get(column) for column in columns] for row in batch], dtype=np.float64)
+            missing = np.isnan(values)
+            if missing.any():
+                values = np.where(missing, fill, values)
+            out[:, start:start + len(columns)] = (values - mean) / scale
+
+        for column, fill_value, codes in self.categorical_columns:
+            for i, row in enumerate(batch):
+                value = row.get(column)
+                # Like SimpleImputer on object columns, only NaN counts as missing;
+                # None is an unknown category
+                if fill_value is not None and _is_nan(value):
+                    value = fill_value
+                index = codes.get(value)
+                if index is not None:
+                    out[i, index] = 1.0
+
+        return out
+
+
+def _is_nan(value: object) -> bool:
+    return isinstance(value, float) and math.isnan(value)
+
+
+def synthetic_feature_rows(
+    encoder: CompiledFeatureEncoder,
+    features: Sequence[str],
+    n_rows: int = 200,
+    seed: int = 0
+) -> List[Dict[str, float | str]]:
+    """Build rows that hit every known category plus unknown and missing values."""
+    rng = np.random.default_rng(seed)
+    categories = encoder.categories
+    n_rows = max(n_rows, max((len(v) for v in categories.values()), default=0) + 3)
+    rows = []
+    for i in range(n_rows):
+        row: Dict[str, float | str] = {}
+        for feature in features:
+            if feature in categories:
+                known = categories[feature]
+                if i == n_rows - 1:
+                    row[feature] = "__unknown__"
+                elif i == n_rows - 2:
+                    row[feature] = None
+                elif i == n_rows - 3:
+                    row[feature] = float("nan")
+                else:
+                    row[feature] = known[i % len(known)]
+            else:
+                row[feature] = None if i % 17 == 5 else float(rng.normal(50.0, 40.0))
+        rows.append(row)
+    return rows
+
+
+def verify_encoder(
+    encoder: CompiledFeatureEncoder,
+    preprocessor,
+    rows: Sequence[Dict[str, float | str]],
+    features: Sequence[str],
+    atol: float = 1e-4
+) -> float:
+    """Check the encoder against ``preprocessor.transform`` on ``rows``.
+
+    Returns:
+        Maximum absolute difference between the two outputs
+
+    Raises:
+        AssertionError: If the outputs differ in shape or by more than ``atol``
+    """
+    import pandas as pd
+
+    expected = np.asarray(preprocessor.transform(pd.DataFrame(list(rows), columns=list(features))), dtype=np.float64)
+    actual = encoder.encode(rows).astype(np.float64)
+    if expected.shape != actual.shape:
+        raise AssertionError(f"Encoder output shape {actual.shape} != preprocessor output shape {expected.shape}")
+    max_diff = float(np.max(np.abs(expected - actual))) if expected.size else 0.0
+    # Compare relative to magnitude; float32 keeps ~7 significant digits
+    tolerance = atol * np.maximum(1.0, np.abs(expected))
+    if np.any(np.abs(expected - actual) > tolerance):
+        raise AssertionError(f"Encoder output differs from preprocessor.transform (max abs diff {max_diff:.3g})")
+    return max_diff
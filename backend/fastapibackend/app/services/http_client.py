@@ -0,0 +1,79 @@
+"""Shared upstream HTTP clients owned by the application lifespan."""
+
+import logging
+from typing import Dict
+
+import httpx
+
+from ..config import Settings
+
+LOGGER = logging.getLogger(__name__)
+
+WAQI = "waqi"
+OPENWEATHER = "openweather"
+
+# One keep-alive, connection-limited client per upstream
+_CLIENTS: Dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    """Return True if the optional 'h2' package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client(settings: Settings, timeout: float) -> httpx.AsyncClient:
+    """Build a pooled client using the connection settings."""
+    http2 = settings.http_http2
+    if http2 and not _http2_available():
+        LOGGER.warning("HTTP/2 requested but 'h2' is not installed; falling back to HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    return httpx.AsyncClient(timeout=timeout, limits=limits, http2=http2)
+
+
+def init_http_clients(settings: Settings) -> None:
+    """Create the shared upstream clients. Called from the app lifespan."""
+    if _CLIENTS:
+        return
+
+    _CLIENTS[WAQI] = _build_client(settings, settings.waqi_timeout)
+    _CLIENTS[OPENWEATHER] = _build_client(settings, settings.openweather_timeout)
+    LOGGER.info(
+        "Upstream HTTP clients ready (max_connections=%d, keepalive=%d, http2=%s)",
+        settings.http_max_connections,
+        settings.http_max_keepalive_connections,
+        settings.http_http2,
+    )
+
+
+async def close_http_clients() -> None:
+    """Close the shared upstream clients. Called from the app lifespan."""
+    clients = list(_CLIENTS.values())
+    _CLIENTS.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def get_http_client(upstream: str) -> httpx.AsyncClient:
+    """Return the shared client for an upstream."""
+    client = _CLIENTS.get(upstream)
+    if client is None:
+        raise RuntimeError(f"HTTP client for '{upstream}' is not initialised; is the app lifespan running?")
+    return client
+
+
+def get_waqi_client() -> httpx.AsyncClient:
+    return get_http_client(WAQI)
+
+
+def get_openweather_client() -> httpx.AsyncClient:
+    return get_http_client(OPENWEATHER)
@@ -0,0 +1,127 @@
+"""Bounded thread pool that keeps model scoring off the event loop."""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from ..config import Settings
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_WORKERS = 0
+_BOOSTER_NTHREAD: Optional[int] = None
+
+# Jobs submitted but not yet picked up by a worker, and jobs being run
+_COUNTER_LOCK = threading.Lock()
+_QUEUED = 0
+_RUNNING = 0
+
+
+def available_cpus() -> int:
+    """Return the number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def inference_pool_size(settings: Settings) -> Tuple[int, int]:
+    """Return (workers, booster threads per call) for the configured pool.
+
+    Booster threads default to ``cpus // workers`` so that concurrent scoring
+    never oversubscribes the cores.
+    """
+    cpus = available_cpus()
+    workers = settings.inference_workers if settings.inference_workers > 0 else min(2, cpus)
+    return workers, settings.inference_nthread or max(1, cpus // workers)
+
+
+def start_inference_executor(settings: Settings) -> None:
+    """Create the inference pool. Called from the app lifespan."""
+    global _EXECUTOR, _WORKERS, _BOOSTER_NTHREAD
+    if _EXECUTOR is not None:
+        return
+    cpus = available_cpus()
+    _WORKERS, _BOOSTER_NTHREAD = inference_pool_size(settings)
+    if _WORKERS * _BOOSTER_NTHREAD > cpus:
+        LOGGER.warning(
+            "Inference pool oversubscribes CPUs: %d workers x %d booster threads > %d cores",
+            _WORKERS, _BOOSTER_NTHREAD, cpus,
+        )
+    _EXECUTOR = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="inference")
+    LOGGER.info("Inference pool ready (%d workers x %d booster threads)", _WORKERS, _BOOSTER_NTHREAD)
+
+
+def stop_inference_executor() -> None:
+    """Shut the inference pool down, waiting for running jobs. Called from the app lifespan."""
+    global _EXECUTOR, _BOOSTER_NTHREAD
+    executor, _EXECUTOR = _EXECUTOR, None
+    _BOOSTER_NTHREAD = None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def get_booster_nthread() -> Optional[int]:
+    """Booster threads per scoring call, or None when no pool is running."""
+    return _BOOSTER_NTHREAD
+
+
+def get_inference_executor_stats() -> Dict[str, int]:
+    """Report pool size and current queue depth."""
+    return {
+        "workers": _WORKERS if _EXECUTOR is not None else 0,
+        "booster_nthread": _BOOSTER_NTHREAD or 0,
+        "queued": _QUEUED,
+        "running": _RUNNING,
+    }
+
+
+def _run_tracked(fn: Callable[..., T]) -> T:
+    global _QUEUED, _RUNNING
+    with _COUNTER_LOCK:
+        _QUEUED -= 1
+        _RUNNING += 1
+    try:
+        return fn()
+    finally:
+        with _COUNTER_LOCK:
+            _RUNNING -= 1
+
+
+def _untrack_cancelled(future: Future) -> None:
+    # A job cancelled before a worker picked it up (shutdown with
+    # cancel_futures, or its caller went away) never reaches _run_tracked
+    global _QUEUED
+    if future.cancelled():
+        with _COUNTER_LOCK:
+            _QUEUED -= 1
+
+
+async def run_inference(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run a scoring function on the inference pool (inline if none is running)."""
+    global _QUEUED
+    call = functools.partial(fn, *args, **kwargs)
+    if _EXECUTOR is None:
+        return call()
+
+    # Carry context variables (e.g. request-scoped state) into the worker thread
+    context = contextvars.copy_context()
+    with _COUNTER_LOCK:
+        _QUEUED += 1
+    try:
+        future = _EXECUTOR.submit(_run_tracked, functools.partial(context.run, call))
+    except RuntimeError:
+        # Pool shut down between the check and the submit
+        with _COUNTER_LOCK:
+            _QUEUED -= 1
+        raise
+    future.add_done_callback(_untrack_cancelled)
+    return await asyncio.wrap_future(future)
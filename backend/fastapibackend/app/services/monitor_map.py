@@ -0,0 +1,90 @@
+"""Persistent police-station -> WAQI monitor mapping.
+
+``feed/geo:lat;lng`` answers with the nearest physical monitor, and Delhi's
+~170 police stations share a few dozen of them. Once a station's monitor
+uid is known, a refresh fetches each distinct monitor once (``feed/@uid``)
+and fans the reading back out. Each mapping entry is re-resolved through
+the geo feed after ``max_age`` seconds, so monitors that are added or moved
+are picked up eventually.
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+
+class MonitorMap:
+    """Station name -> (monitor uid, resolved-at timestamp), persisted as JSON."""
+
+    def __init__(self, path: Optional[str] = None, max_age: float = 7 * 86400.0):
+        self.path = Path(path) if path else None
+        self.max_age = max_age
+        self._entries: Dict[str, Dict] = {}
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, station: str) -> Optional[int]:
+        """Return the monitor uid for ``station``, or None if unknown or due for re-resolution."""
+        entry = self._entries.get(station)
+        if entry is None or time.time() - entry["resolved_at"] > self.max_age:
+            return None
+        return entry["uid"]
+
+    def set(self, station: str, uid: int) -> None:
+        """Record the monitor a geo lookup for ``station`` resolved to."""
+        self._entries[station] = {"uid": uid, "resolved_at": time.time()}
+        self.dirty = True
+
+    def forget(self, station: str) -> None:
+        if self._entries.pop(station, None) is not None:
+            self.dirty = True
+
+    def monitor_count(self) -> int:
+        return len({entry["uid"] for entry in self._entries.values()})
+
+    def load(self) -> None:
+        """Read the mapping from ``path``; a missing or unreadable file leaves it empty."""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            payload = json.loads(self.path.read_text())
+            self._entries = {
+                station: {"uid": int(entry["uid"]), "resolved_at": float(entry["resolved_at"])}
+                for station, entry in payload.get("stations", {}).items()
+            }
+        except Exception as exc:
+            LOGGER.warning(f"Ignoring unreadable WAQI monitor map {self.path}: {exc}")
+            self._entries = {}
+            return
+        LOGGER.info(
+            "Loaded WAQI monitor map: %d stations on %d monitors", len(self._entries), self.monitor_count()
+        )
+
+    def save(self) -> None:
+        """Write the mapping to ``path`` atomically if it changed."""
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps({"stations": self._entries}, indent=1, sort_keys=True))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+_MONITOR_MAP: Optional[MonitorMap] = None
+
+
+def get_monitor_map(path: Optional[str], max_age: float) -> MonitorMap:
+    """Return the process-wide monitor map, loading it from ``path`` on first use."""
+    global _MONITOR_MAP
+    if _MONITOR_MAP is None:
+        _MONITOR_MAP = MonitorMap(path, max_age)
+        _MONITOR_MAP.load()
+    return _MONITOR_MAP
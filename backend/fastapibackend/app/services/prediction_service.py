@@ -1,12 +1,18 @@
 """Prediction service for safety classification."""
 
 import logging
-from typing import Dict, List, Tuple
+import time
+import weakref
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
-import pandas as pd
 from fastapi import HTTPException
 
+from ..config import get_settings
+from ..metrics import INFERENCE_BATCH_ROWS, INFERENCE_STAGE_SECONDS
+from ..tracing import record_span
+from .feature_encoder import CompiledFeatureEncoder, synthetic_feature_rows, verify_encoder
+
 LOGGER = logging.getLogger(__name__)
 
 FEATURES = [
@@ -30,6 +36,65 @@ FEATURES = [
 ]
 
 
+# Compiled encoder per loaded preprocessor (None when it could not be verified)
+_ENCODERS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_feature_encoder(preprocessor) -> Optional[CompiledFeatureEncoder]:
+    """Return the compiled encoder for a preprocessor, building it on first use.
+    
+    The encoder is checked against ``preprocessor.transform`` on synthetic rows
+    covering every known category; if compilation or the check fails, None is
+    returned and predictions fall back to the pandas path.
+    """
+    if not get_settings().fast_feature_encoder:
+        return None
+    try:
+        return _ENCODERS[preprocessor]
+    except KeyError:
+        pass
+
+    encoder: Optional[CompiledFeatureEncoder] = None
+    try:
+        encoder = CompiledFeatureEncoder.from_preprocessor(preprocessor)
+        max_diff = verify_encoder(encoder, preprocessor, synthetic_feature_rows(encoder, FEATURES), FEATURES)
+        LOGGER.info("Compiled feature encoder verified (%d outputs, max diff %.2g)", encoder.n_outputs, max_diff)
+    except Exception as exc:
+        LOGGER.warning(f"Compiled feature encoder unavailable, using preprocessor.transform: {exc}")
+        encoder = None
+
+    _ENCODERS[preprocessor] = encoder
+    return encoder
+
+
+def known_categories(preprocessor, column: str) -> Optional[List[object]]:
+    """Return the categories a categorical input ``column`` was fitted on, or None if unreadable."""
+    encoder = get_feature_encoder(preprocessor)
+    if encoder is not None:
+        return encoder.categories.get(column)
+    # Without a compiled encoder, look for a OneHotEncoder over the column
+    for _, transformer, columns in getattr(preprocessor, "transformers_", []):
+        if not isinstance(columns, (list, tuple)) or column not in columns:
+            continue
+        steps = [step for _, step in getattr(transformer, "steps", [(None, transformer)])]
+        for step in steps:
+            categories = getattr(step, "categories_", None)
+            if categories is not None:
+                return categories[list(columns).index(column)].tolist()
+    return None
+
+
+def encode_features(batch: List[Dict[str, float | str]], preprocessor) -> np.ndarray:
+    """Transform feature rows into the model input matrix."""
+    encoder = get_feature_encoder(preprocessor)
+    if encoder is not None:
+        return encoder.encode(batch)
+
+    import pandas as pd
+
+    return preprocessor.transform(pd.DataFrame(batch, columns=FEATURES))
+
+
 def predict_safety(
     batch: List[Dict[str, float | str]],
     model,
@@ -50,14 +115,51 @@ def predict_safety(
     if model is None or preprocessor is None or label_encoder is None:
         raise HTTPException(status_code=500, detail="Model artifacts missing")
 
-    df = pd.DataFrame(batch, columns=FEATURES)
-    transformed = preprocessor.transform(df)
-    probabilities = model.predict_proba(transformed)
-    label_indices = model.predict(transformed)
+    started = time.perf_counter()
+    transformed = encode_features(batch, preprocessor)
+    encoded = time.perf_counter()
+    if hasattr(model, "predict_with_proba"):
+        label_indices, probabilities = model.predict_with_proba(transformed)
+    else:
+        probabilities = model.predict_proba(transformed)
+        label_indices = model.predict(transformed)
+    predicted = time.perf_counter()
     labels = label_encoder.inverse_transform(label_indices.astype(int))
+    decoded = time.perf_counter()
+
+    INFERENCE_BATCH_ROWS.observe(value=len(batch))
+    INFERENCE_STAGE_SECONDS.observe("encode", value=encoded - started)
+    INFERENCE_STAGE_SECONDS.observe("predict", value=predicted - encoded)
+    INFERENCE_STAGE_SECONDS.observe("decode", value=decoded - predicted)
+    record_span("transform", started, encoded - started)
+    record_span("score", encoded, predicted - encoded)
+    record_span("decode", predicted, decoded - predicted)
     return labels, probabilities
 
 
+def warm_up_model(model, preprocessor, label_encoder, batch_sizes: Tuple[int, ...] = (1, 170)) -> None:
+    """Score synthetic batches to trigger one-off allocations and lazy init.
+    
+    Args:
+        model: Trained ML model
+        preprocessor: Feature preprocessor
+        label_encoder: Label encoder
+        batch_sizes: Batch sizes to warm up (single requests and /predict-all)
+    """
+    row = {feature: 25.0 for feature in FEATURES}
+    row.update({
+        "month": 1,
+        "day": 1,
+        "police_station": "connaught place",
+        "gender": "female",
+        "family": "alone",
+        "aqi": 150.0,
+        "aqi_median": 150.0,
+    })
+    for size in batch_sizes:
+        predict_safety([row] * size, model, preprocessor, label_encoder)
+
+
 def extract_weather_features(weather_data: Dict, aqi: float) -> Dict[str, float]:
     """Extract weather features from OpenWeatherMap response.
     
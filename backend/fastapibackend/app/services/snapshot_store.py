@@ -0,0 +1,149 @@
+"""SQLite copy of the latest AQI snapshot and cached city weather.
+
+Each refresh overwrites the stored copy, so a restarted or newly spawned
+worker starts from the last known readings in milliseconds instead of
+waiting for the first WAQI/OpenWeather fan-out, and keeps serving them if
+upstream is down at that moment. Payloads are zlib-compressed JSON; the
+small metadata columns (when it was fetched and saved, how many stations
+were fallbacks or stale) can be inspected with the ``sqlite3`` shell.
+"""
+
+import json
+import logging
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..config import get_settings
+
+LOGGER = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS aqi_snapshot (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    saved_at REAL NOT NULL,
+    station_count INTEGER NOT NULL,
+    fallback_count INTEGER NOT NULL,
+    stale_count INTEGER NOT NULL,
+    stations BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS weather (
+    city TEXT NOT NULL,
+    weather_url TEXT NOT NULL,
+    air_pollution_url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    bundle BLOB NOT NULL,
+    PRIMARY KEY (city, weather_url, air_pollution_url)
+);
+"""
+
+
+def _pack(payload) -> bytes:
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class SnapshotStore:
+    """Latest AQI snapshot and weather bundles in one SQLite file.
+
+    Every call opens its own connection, so methods can run in worker
+    threads (``asyncio.to_thread``). Several workers may share the file;
+    WAL mode lets them read while one of them writes.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def save_aqi(self, version: int, source: str, fetched_at: float, stations: Dict[str, Dict]) -> None:
+        """Replace the stored AQI snapshot."""
+        fallback_count = sum("error" in entry for entry in stations.values())
+        stale_count = sum("stale_seconds" in entry for entry in stations.values())
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO aqi_snapshot VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        version,
+                        source,
+                        fetched_at,
+                        time.time(),
+                        len(stations),
+                        fallback_count,
+                        stale_count,
+                        _pack(stations),
+                    ),
+                )
+        finally:
+            conn.close()
+
+    def load_aqi(self) -> Optional[Tuple[int, float, Dict[str, Dict]]]:
+        """Return (version, fetched_at, stations) of the stored snapshot, or None."""
+        if not self.path.exists():
+            return None
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT version, fetched_at, stations FROM aqi_snapshot WHERE id = 1").fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        version, fetched_at, blob = row
+        return version, fetched_at, _unpack(blob)
+
+    def save_weather(self, key: Tuple[str, str, str], fetched_at: float, bundle: Dict) -> None:
+        """Replace the stored weather bundle for ``key`` (city, weather_url, air_pollution_url)."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO weather VALUES (?, ?, ?, ?, ?)",
+                    (*key, fetched_at, _pack(bundle)),
+                )
+        finally:
+            conn.close()
+
+    def load_weather(self) -> List[Tuple[Tuple[str, str, str], float, Dict]]:
+        """Return every stored (key, fetched_at, bundle)."""
+        if not self.path.exists():
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT city, weather_url, air_pollution_url, fetched_at, bundle FROM weather"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [
+            ((city, weather_url, air_pollution_url), fetched_at, _unpack(blob))
+            for city, weather_url, air_pollution_url, fetched_at, blob in rows
+        ]
+
+
+_STORE: Optional[SnapshotStore] = None
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Return the process-wide store, or None when persistence is disabled."""
+    global _STORE
+    if _STORE is None:
+        path = get_settings().snapshot_store_path
+        if not path:
+            return None
+        _STORE = SnapshotStore(path)
+    return _STORE
@@ -0,0 +1,125 @@
+"""Nearest-police-station lookup for raw GPS coordinates.
+
+Station coordinates are projected onto a local equirectangular plane (km)
+centred on Delhi and indexed with a KD-tree, so a batch of fixes resolves in
+one vectorized ``query``. Over the ~50 km extent of the city, distances are
+within about 0.5% of great-circle ones, so only near-ties (a few metres apart)
+can resolve to a different station than an exact haversine search.
+
+``get_station_index`` covers every station with coordinates (AQI lookups);
+``get_model_station_index`` covers only the stations a loaded model was
+fitted on, so a prediction never resolves to a station the model would
+encode as unknown.
+"""
+
+import logging
+import math
+import weakref
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .prediction_service import known_categories
+from .waqi_service import POLICE_STATION_COORDINATES
+
+LOGGER = logging.getLogger(__name__)
+
+KM_PER_DEGREE = 111.32
+
+
+class StationIndex:
+    """KD-tree over police station locations."""
+
+    def __init__(self, coordinates: Dict[str, Tuple[float, float]]):
+        """Build the index.
+
+        Args:
+            coordinates: Station name -> (lng, lat), as in POLICE_STATION_COORDINATES
+        """
+        if not coordinates:
+            raise ValueError("Cannot build a station index without coordinates")
+        self.names: List[str] = list(coordinates)
+        lng_lat = np.asarray([coordinates[name] for name in self.names], dtype=np.float64)
+        self.longitudes = lng_lat[:, 0]
+        self.latitudes = lng_lat[:, 1]
+        self._lng_scale = KM_PER_DEGREE * math.cos(math.radians(float(self.latitudes.mean())))
+        self._tree = cKDTree(self._project(self.latitudes, self.longitudes))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _project(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        return np.column_stack((longitudes * self._lng_scale, latitudes * KM_PER_DEGREE))
+
+    def query(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        k: int = 1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the ``k`` nearest stations for each point.
+
+        Args:
+            latitudes: Point latitudes
+            longitudes: Point longitudes (same length)
+            k: Stations per point
+
+        Returns:
+            (indices, distances_km), each shaped (n_points, k); indices refer to ``names``
+        """
+        k = max(1, min(k, len(self.names)))
+        points = self._project(
+            np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64)
+        )
+        distances, indices = self._tree.query(points, k=k)
+        if k == 1:
+            distances, indices = distances[:, None], indices[:, None]
+        return indices, distances
+
+
+_INDEX: Optional[StationIndex] = None
+
+# Index over the stations each loaded preprocessor knows, built on first use
+_MODEL_INDEXES: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def build_station_index() -> StationIndex:
+    """Build the station index from POLICE_STATION_COORDINATES. Called from the app lifespan."""
+    global _INDEX
+    _INDEX = StationIndex(POLICE_STATION_COORDINATES)
+    LOGGER.info("Station index built over %d police stations", len(_INDEX))
+    return _INDEX
+
+
+def get_station_index() -> StationIndex:
+    """Return the station index, building it on first use outside the app lifespan."""
+    if _INDEX is None:
+        return build_station_index()
+    return _INDEX
+
+
+def get_model_station_index(preprocessor) -> StationIndex:
+    """Return an index over the stations ``preprocessor`` has a ``police_station`` category for.
+
+    Falls back to the full index when the categories cannot be read.
+    """
+    try:
+        return _MODEL_INDEXES[preprocessor]
+    except KeyError:
+        pass
+
+    known = known_categories(preprocessor, "police_station")
+    if known is None:
+        LOGGER.warning("Model station categories unavailable; nearest-station predictions use every station")
+        index = get_station_index()
+    else:
+        known = {str(station).lower() for station in known}
+        coordinates = {name: lng_lat for name, lng_lat in POLICE_STATION_COORDINATES.items() if name in known}
+        unknown = sorted(set(POLICE_STATION_COORDINATES) - known)
+        if unknown:
+            LOGGER.info("Leaving %d stations the model does not know out of its index: %s", len(unknown), unknown)
+        index = StationIndex(coordinates)
+
+    _MODEL_INDEXES[preprocessor] = index
+    return index
@@ -0,0 +1,447 @@
+"""Resilient call layer shared by the WAQI and OpenWeather services.
+
+Every upstream gets four protections:
+
+- ``AdaptiveLimiter``: an AIMD concurrency limit. It grows by about one slot
+  per round trip while calls are healthy, and halves (at most once per round
+  trip) on failures or once most calls run much slower than the baseline.
+- ``CircuitBreaker``: opens once the recent failure ratio crosses a threshold.
+  Callers then fail fast (and serve last-known-good data) until a half-open
+  probe succeeds.
+- Hedging: if a call is still running past the observed p95 latency and the
+  limiter has a spare slot, a second identical request is raised and the
+  first response wins.
+- ``RetryBudget``: retries are capped at a fraction of recent traffic, and
+  each one waits a fully jittered backoff. A degraded upstream therefore
+  sees a bounded amount of extra load instead of a retry storm.
+
+``Upstream.get`` raises ``UpstreamUnavailable`` when it gives up; services
+catch it and fall back to the value kept by ``remember``.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from ..config import Settings, get_settings
+from ..metrics import (
+    UPSTREAM_CIRCUIT_STATE,
+    UPSTREAM_CONCURRENCY_LIMIT,
+    UPSTREAM_HEDGES,
+    UPSTREAM_REQUEST_SECONDS,
+    UPSTREAM_RESPONSES,
+    UPSTREAM_RETRIES,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when a call fails for good or the circuit is open."""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} unavailable: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+
+
+def _is_failure(response: httpx.Response) -> bool:
+    # Client errors other than rate limiting mean the upstream is healthy
+    return response.status_code >= 500 or response.status_code == 429
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by call latency and outcomes."""
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.5,
+        enabled: bool = True
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit)) if enabled else float(self.max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.enabled = enabled
+        self.in_flight = 0
+        self._baseline_latency: Optional[float] = None
+        self._slow_share = 0.0
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self) -> None:
+        if self.has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # The slot is counted by _wake before the waiter resumes
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                # _wake may already have discarded it
+                self._waiters.remove(waiter)
+            raise
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now (used for hedges)."""
+        if self.has_capacity():
+            self.in_flight += 1
+            return True
+        return False
+
+    def release(self, latency: float, ok: Optional[bool]) -> None:
+        """Free a slot; ``ok=None`` (the call was abandoned) leaves the limit unchanged."""
+        self.in_flight -= 1
+        if self.enabled and ok is not None:
+            self._adjust(latency, ok)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _adjust(self, latency: float, ok: bool) -> None:
+        baseline = self._baseline_latency
+        if ok:
+            self._baseline_latency = latency if baseline is None else baseline + 0.05 * (latency - baseline)
+        slow = ok and baseline is not None and latency > self.latency_tolerance * baseline
+        # A tail of slow calls is what hedging is for; back off only once
+        # most recent calls are slow, or on failures
+        self._slow_share += 0.1 * (float(slow) - self._slow_share)
+        if ok and self._slow_share <= 0.5:
+            # Additive increase: about one slot per limit's worth of healthy calls
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            return
+        now = time.monotonic()
+        # Multiplicative decrease at most once per round trip: calls that
+        # started before the last decrease already saw the old limit
+        if now - latency >= self._last_decrease:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._last_decrease = now
+
+
+class CircuitBreaker:
+    """Failure-ratio circuit breaker over a sliding window of calls."""
+
+    def __init__(self, failure_ratio: float, min_calls: int, window: int, reset_timeout: float):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Return True if a call may go ahead."""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            # One probe at a time decides whether the upstream is back
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record(self, ok: bool) -> None:
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if ok:
+                self.state = CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        self._outcomes.append(ok)
+        if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+            failures = len(self._outcomes) - sum(self._outcomes)
+            if failures / len(self._outcomes) >= self.failure_ratio:
+                self._open()
+
+    def abandon(self) -> None:
+        """Forget a call that was cancelled before it finished."""
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+
+class LatencyWindow:
+    """Recent successful call latencies with a cached quantile."""
+
+    def __init__(self, size: int = 512, refresh_every: int = 16):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._refresh_every = refresh_every
+        self._since_refresh = 0
+        self._quantiles: Dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, latency: float) -> None:
+        self._samples.append(latency)
+        self._since_refresh += 1
+        if self._since_refresh >= self._refresh_every:
+            self._quantiles.clear()
+            self._since_refresh = 0
+
+    def quantile(self, q: float) -> float:
+        value = self._quantiles.get(q)
+        if value is None:
+            value = float(np.quantile(np.fromiter(self._samples, dtype=np.float64), q))
+            self._quantiles[q] = value
+        return value
+
+
+class RetryBudget:
+    """Token bucket allowing retries as a fraction of recent requests."""
+
+    def __init__(self, ratio: float, minimum: float, maximum: float = 100.0):
+        self.ratio = ratio
+        self.maximum = max(minimum, maximum)
+        self.tokens = minimum
+
+    def deposit(self) -> None:
+        self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class Upstream:
+    """Limiter, breaker, hedging, retry budget and last-known-good values for one upstream."""
+
+    def __init__(
+        self,
+        name: str,
+        limiter: AdaptiveLimiter,
+        breaker: CircuitBreaker,
+        budget: RetryBudget,
+        hedge_enabled: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 50,
+        last_good_max_age: float = 3600.0
+    ):
+        self.name = name
+        self.limiter = limiter
+        self.breaker = breaker
+        self.budget = budget
+        self.latencies = LatencyWindow()
+        self.hedge_enabled = hedge_enabled
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.last_good_max_age = last_good_max_age
+        self._last_good: Dict[Hashable, Tuple[float, Any]] = {}
+        UPSTREAM_CONCURRENCY_LIMIT.set_function(name, fn=lambda: self.limiter.limit)
+        UPSTREAM_CIRCUIT_STATE.set_function(name, fn=lambda: _STATE_VALUES[self.breaker.state])
+
+    def remember(self, key: Hashable, value: Any) -> None:
+        """Keep ``value`` as the last good result for ``key``."""
+        self._last_good[key] = (time.time(), value)
+
+    def last_good(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Return (value, age in seconds) of the last good result, if recent enough."""
+        entry = self._last_good.get(key)
+        if entry is None:
+            return None
+        age = time.time() - entry[0]
+        if age > self.last_good_max_age:
+            return None
+        return entry[1], age
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict] = None,
+        endpoint: str = "",
+        label: str = "",
+        max_retries: int = 2,
+        retry_delay: float = 0.5
+    ) -> httpx.Response:
+        """GET ``url`` with adaptive concurrency, hedging and budgeted retries.
+
+        Args:
+            client: Shared HTTP client for this upstream
+            url: Request URL
+            params: Query parameters
+            endpoint: Metric label for the latency histogram
+            label: Metric label for outcomes (station or endpoint)
+            max_retries: Retries after the first attempt, if the budget allows
+            retry_delay: Base of the jittered exponential backoff in seconds
+
+        Returns:
+            The first non-failing response; 4xx responses other than 429 are returned as-is
+
+        Raises:
+            UpstreamUnavailable: The circuit is open or every attempt failed
+        """
+        self.budget.deposit()
+        reason = "no attempts made"
+        for attempt in range(1, max_retries + 2):
+            if not self.breaker.allow():
+                raise UpstreamUnavailable(self.name, "circuit open")
+            response, reason = await self._attempt(client, url, params, endpoint, label, attempt)
+            if response is not None:
+                return response
+            if attempt > max_retries or not self.budget.withdraw():
+                break
+            UPSTREAM_RETRIES.inc(self.name)
+            # Full jitter keeps retries from many callers from arriving together
+            await asyncio.sleep(random.uniform(0, retry_delay * (2 ** (attempt - 1))))
+        raise UpstreamUnavailable(self.name, reason)
+
+    async def _attempt(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict],
+        endpoint: str,
+        label: str,
+        attempt: int
+    ) -> Tuple[Optional[httpx.Response], str]:
+        primary = asyncio.ensure_future(self._send(client, url, params, endpoint, label, attempt))
+        tasks = {primary}
+        try:
+            if self.hedge_enabled and len(self.latencies) >= self.hedge_min_samples:
+                done, _ = await asyncio.wait(tasks, timeout=self.latencies.quantile(self.hedge_quantile))
+                if not done and self.limiter.has_capacity():
+                    tasks.add(asyncio.ensure_future(
+                        self._send(client, url, params, endpoint, label, "hedge", hedge=True)
+                    ))
+            reason = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    response, task_reason = task.result()
+                    if response is not None:
+                        if task is not primary:
+                            UPSTREAM_HEDGES.inc(self.name, "won")
+                        return response, task_reason
+                    if task is primary or reason is None:
+                        reason = task_reason
+            return None, reason or "no response"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict],
+        endpoint: str,
+        label: str,
+        attempt,
+        hedge: bool = False
+    ) -> Tuple[Optional[httpx.Response], str]:
+        """One request holding one limiter slot; returns (response or None, failure reason)."""
+        if hedge:
+            if not self.limiter.try_acquire():
+                return None, "no capacity to hedge"
+            UPSTREAM_HEDGES.inc(self.name, "sent")
+        else:
+            try:
+                await self.limiter.acquire()
+            except asyncio.CancelledError:
+                # No request was sent, but a half-open probe must give up its turn
+                self.breaker.abandon()
+                raise
+        started = time.perf_counter()
+        ok = False
+        status = "error"
+        try:
+            response = await client.get(url, params=params)
+            status = response.status_code
+            ok = not _is_failure(response)
+            return (response if ok else None), f"HTTP {status}"
+        except asyncio.CancelledError:
+            # The other request of a hedged pair won, or the caller went away
+            status = "cancelled"
+            raise
+        except Exception as exc:
+            status = type(exc).__name__
+            return None, str(exc) or status
+        finally:
+            elapsed = time.perf_counter() - started
+            if status == "cancelled":
+                self.breaker.abandon()
+                # A lost hedge or a departed caller says nothing about upstream health
+                self.limiter.release(elapsed, None)
+                if hedge:
+                    UPSTREAM_HEDGES.inc(self.name, "cancelled")
+            else:
+                self.breaker.record(ok)
+                if ok:
+                    self.latencies.observe(elapsed)
+                self.limiter.release(elapsed, ok)
+                UPSTREAM_REQUEST_SECONDS.observe(self.name, endpoint, attempt, value=elapsed)
+                UPSTREAM_RESPONSES.inc(self.name, label, attempt, status)
+
+
+_UPSTREAMS: Dict[str, Upstream] = {}
+
+
+def _build_upstream(name: str, settings: Settings) -> Upstream:
+    return Upstream(
+        name,
+        limiter=AdaptiveLimiter(
+            initial=settings.upstream_initial_concurrency,
+            min_limit=settings.upstream_min_concurrency,
+            max_limit=settings.upstream_max_concurrency,
+            latency_tolerance=settings.upstream_latency_tolerance,
+            enabled=settings.upstream_adaptive_concurrency,
+        ),
+        breaker=CircuitBreaker(
+            failure_ratio=settings.upstream_breaker_failure_ratio,
+            min_calls=settings.upstream_breaker_min_calls,
+            window=settings.upstream_breaker_window,
+            reset_timeout=settings.upstream_breaker_reset_timeout,
+        ),
+        budget=RetryBudget(settings.upstream_retry_budget_ratio, settings.upstream_retry_budget_min),
+        hedge_enabled=settings.upstream_hedge_enabled,
+        hedge_quantile=settings.upstream_hedge_quantile,
+        hedge_min_samples=settings.upstream_hedge_min_samples,
+        last_good_max_age=settings.upstream_last_good_max_age,
+    )
+
+
+def get_upstream(name: str) -> Upstream:
+    """Return the shared call layer for an upstream ("waqi" or "openweather")."""
+    upstream = _UPSTREAMS.get(name)
+    if upstream is None:
+        upstream = _UPSTREAMS[name] = _build_upstream(name, get_settings())
+    return upstream
@@ -3,13 +3,34 @@
 import asyncio
 import json
 import logging
+import time
 from typing import Dict, List, Tuple, Optional
 
 import httpx
+import numpy as np
 from fastapi import HTTPException
 
+from ..cache import TTLCache
+from ..metrics import AQI_FALLBACKS, UPSTREAM_LAST_GOOD, register_cache
+from ..singleflight import SingleFlight
+from .aqi_interpolation import Interpolation, interpolate_idw
+from .monitor_map import MonitorMap
+from .upstream import UpstreamUnavailable, get_upstream
+
 LOGGER = logging.getLogger(__name__)
 
+WAQI_API_URL = "http://api.waqi.info"
+# (lat1, lng1, lat2, lng2) box around Delhi's police stations for map/bounds
+DELHI_BOUNDS = (28.40, 76.84, 28.88, 77.35)
+
+# Short-lived per-station results and in-flight single-station fetches
+_STATION_CACHE = TTLCache(ttl=60.0, maxsize=512)
+_STATION_FLIGHTS = SingleFlight()
+register_cache("waqi_station", _STATION_CACHE)
+
+# Weights of the latest map/bounds interpolation, for debugging
+_LAST_INTERPOLATION: Optional[Interpolation] = None
+
 # Police station coordinates from GeoJSON mapped to names from constants.py
 POLICE_STATION_COORDINATES = {
     "adarsh nagar": (77.1752284, 28.709987),
@@ -181,23 +202,35 @@ async def fetch_aqi_from_waqi(
     stations: Optional[List[str]] = None,
     max_concurrent: int = 50,
     retry_delay: float = 0.5,
-    max_retries: int = 2
+    max_retries: int = 2,
+    client: Optional[httpx.AsyncClient] = None,
+    api_url: str = WAQI_API_URL,
+    monitor_map: Optional[MonitorMap] = None
 ) -> Dict[str, Dict]:
     """Fetch AQI data for all Delhi police stations from WAQI API.
     
     Args:
         waqi_token: WAQI API token
         stations: Subset of stations to query (defaults to all configured stations)
-        max_concurrent: Maximum concurrent requests; WAQI quota allows up to 1000 rps
-        retry_delay: Delay between retries in seconds
-        max_retries: Maximum number of retries per request
+        max_concurrent: Maximum concurrent requests for this call; the shared
+            adaptive WAQI limit applies on top
+        retry_delay: Base of the jittered retry backoff in seconds
+        max_retries: Maximum number of retries per request (within the retry budget)
+        client: Shared keep-alive HTTP client; a temporary pooled client is
+            created for the duration of the call when omitted
+        api_url: Base URL of the WAQI API
+        monitor_map: Station -> monitor uid mapping; when given, each known
+            monitor is fetched once and newly resolved stations are recorded
         
     Returns:
         Dictionary mapping station names to AQI data including:
         - aqi: Air Quality Index value
         - status: "Good", "Moderate", etc.
         - location: Station location info
-        - error: Error message if fetch failed
+        - monitor_uid: WAQI monitor the reading came from
+        - no_reading: Set when the monitor answered without a value (aqi is a placeholder)
+        - stale_seconds: Age of a last-known-good reading served after a failure
+        - error: Error message if fetch failed and no recent reading was available
     """
     if not waqi_token:
         raise HTTPException(status_code=500, detail="WAQI API token not configured")
@@ -217,92 +250,139 @@ async def fetch_aqi_from_waqi(
         if not station_coords:
             raise HTTPException(status_code=400, detail="No valid stations supplied for WAQI AQI fetch")
 
-    semaphore = asyncio.Semaphore(max(1, min(max_concurrent, len(station_coords))))
+    # With a monitor map, stations whose WAQI monitor is known share one
+    # feed/@uid fetch; the rest are resolved through the geo feed
+    stations_by_monitor: Dict[int, List[str]] = {}
+    unresolved: List[str] = []
+    for station_name in station_coords:
+        uid = monitor_map.get(station_name) if monitor_map is not None else None
+        if uid is None:
+            unresolved.append(station_name)
+        else:
+            stations_by_monitor.setdefault(uid, []).append(station_name)
+
+    semaphore = asyncio.Semaphore(max(1, min(max_concurrent, len(unresolved) + len(stations_by_monitor))))
     results = {}
     
-    async def fetch_station_aqi(station_name: str, lat: float, lng: float) -> Tuple[str, Dict]:
-        """Fetch AQI for a single station with retries."""
+    upstream = get_upstream("waqi")
+    
+    def fallback(target: str, reason: str, error) -> Dict:
+        """Serve the last good reading for ``target``, else the fixed fallback entry."""
+        last_good = upstream.last_good(target)
+        if last_good is not None:
+            reading, age = last_good
+            UPSTREAM_LAST_GOOD.inc("waqi")
+            return {**reading, "stale_seconds": round(age, 1)}
+        AQI_FALLBACKS.inc(reason)
+        return {
+            "error": error,
+            "aqi": 150.0,  # fallback value
+            "status": "Moderate"
+        }
+    
+    async def fetch_feed(label: str, target: str) -> Dict:
+        """Fetch one WAQI feed; returns the reading, the last good one, or a fallback entry with ``error``."""
         async with semaphore:
-            for attempt in range(max_retries + 1):
+            try:
+                response = await upstream.get(
+                    client,
+                    f"{api_url.rstrip('/')}/feed/{target}/",
+                    params={"token": waqi_token},
+                    endpoint="feed",
+                    label=label,
+                    max_retries=max_retries,
+                    retry_delay=retry_delay,
+                )
+            except UpstreamUnavailable as exc:
+                LOGGER.debug(f"WAQI feed for {label} failed: {exc.reason}")
+                return fallback(target, "circuit_open" if exc.reason == "circuit open" else "exception", exc.reason)
+            
+            if response.status_code != 200:
+                return fallback(target, "http_error", f"HTTP {response.status_code}")
+            
+            try:
+                data = response.json()
+            except ValueError as exc:
+                return fallback(target, "exception", str(exc))
+            
+            if data.get("status") != "ok":
+                return fallback(target, "api_error", data.get("data", "Unknown API error"))
+            
+            aqi_data = data.get("data", {})
+            aqi_value = aqi_data.get("aqi")
+            
+            no_reading = False
+            if aqi_value is None or aqi_value == "-":
+                # Some stations might not have AQI data
+                no_reading = True
+            else:
                 try:
-                    url = f"http://api.waqi.info/feed/geo:{lat};{lng}/"
-                    params = {"token": waqi_token}
-                    
-                    async with httpx.AsyncClient(timeout=10.0) as client:
-                        response = await client.get(url, params=params)
-                        
-                    if response.status_code != 200:
-                        if attempt < max_retries:
-                            await asyncio.sleep(retry_delay * (2 ** attempt))
-                            continue
-                        return station_name, {
-                            "error": f"HTTP {response.status_code}",
-                            "aqi": 150.0,  # fallback value
-                            "status": "Moderate"
-                        }
-                    
-                    data = response.json()
-                    
-                    if data.get("status") != "ok":
-                        if attempt < max_retries:
-                            await asyncio.sleep(retry_delay * (2 ** attempt))
-                            continue
-                        return station_name, {
-                            "error": data.get("data", "Unknown API error"),
-                            "aqi": 150.0,
-                            "status": "Moderate"
-                        }
-                    
-                    aqi_data = data.get("data", {})
-                    aqi_value = aqi_data.get("aqi")
-                    
-                    if aqi_value is None or aqi_value == "-":
-                        # Some stations might not have AQI data
-                        aqi_value = 150.0
-                    else:
-                        try:
-                            aqi_value = float(aqi_value)
-                        except (ValueError, TypeError):
-                            aqi_value = 150.0
-                    
-                    return station_name, {
-                        "aqi": aqi_value,
-                        "status": categorize_aqi(aqi_value),
-                        "location": aqi_data.get("city", {}).get("name", station_name),
-                        "coordinates": [lng, lat],
-                        "time": aqi_data.get("time", {}).get("s", ""),
-                        "attributions": aqi_data.get("attributions", [])
-                    }
-                    
-                except Exception as exc:
-                    LOGGER.warning(f"Attempt {attempt + 1} failed for {station_name}: {exc}")
-                    if attempt < max_retries:
-                        await asyncio.sleep(retry_delay * (2 ** attempt))
-                        continue
-                    
-                    return station_name, {
-                        "error": str(exc),
-                        "aqi": 150.0,
-                        "status": "Moderate"
-                    }
+                    aqi_value = float(aqi_value)
+                except (ValueError, TypeError):
+                    no_reading = True
+            if no_reading:
+                AQI_FALLBACKS.inc("no_reading")
+                aqi_value = 150.0
             
-            # This shouldn't be reached, but just in case
-            return station_name, {
-                "error": "Max retries exceeded",
-                "aqi": 150.0,
-                "status": "Moderate"
+            reading = {
+                "aqi": aqi_value,
+                "status": categorize_aqi(aqi_value),
+                "location": aqi_data.get("city", {}).get("name", label),
+                "time": aqi_data.get("time", {}).get("s", ""),
+                "attributions": aqi_data.get("attributions", []),
+                "monitor_uid": aqi_data.get("idx"),
             }
+            if no_reading:
+                # The monitor answered without a value; 150.0 is a placeholder, not a measurement
+                reading["no_reading"] = True
+            else:
+                upstream.remember(target, reading)
+            return reading
     
-    # Create tasks for all stations
-    tasks = []
-    for station_name, (lng, lat) in station_coords.items():
-        task = fetch_station_aqi(station_name, lat, lng)
-        tasks.append(task)
+    def station_entry(station_name: str, reading: Dict) -> Dict:
+        if "error" in reading:
+            return dict(reading)
+        lng, lat = station_coords[station_name]
+        return {**reading, "coordinates": [lng, lat]}
     
-    LOGGER.info(f"Fetching AQI data for {len(tasks)} police stations from WAQI API")
+    async def fetch_station_aqi(station_name: str) -> List[Tuple[str, Dict]]:
+        """Fetch AQI for a single station through the geo feed."""
+        lng, lat = station_coords[station_name]
+        reading = await fetch_feed(station_name, f"geo:{lat};{lng}")
+        if monitor_map is not None and reading.get("monitor_uid") is not None:
+            monitor_map.set(station_name, int(reading["monitor_uid"]))
+        return [(station_name, station_entry(station_name, reading))]
     
-    # Execute all requests concurrently with semaphore limiting
-    completed_tasks = await asyncio.gather(*tasks, return_exceptions=True)
+    async def fetch_monitor_aqi(uid: int, station_names: List[str]) -> List[Tuple[str, Dict]]:
+        """Fetch one monitor and fan its reading out to the stations it serves."""
+        reading = await fetch_feed(f"@{uid}", f"@{uid}")
+        if "error" in reading:
+            # Resolve these stations through the geo feed again next time
+            for station_name in station_names:
+                monitor_map.forget(station_name)
+        return [(station_name, station_entry(station_name, reading)) for station_name in station_names]
+    
+    # Create tasks for all stations and known monitors
+    tasks = [fetch_station_aqi(station_name) for station_name in unresolved]
+    tasks.extend(fetch_monitor_aqi(uid, names) for uid, names in stations_by_monitor.items())
+    
+    LOGGER.info(
+        f"Fetching AQI data for {len(station_coords)} police stations from WAQI API "
+        f"({len(stations_by_monitor)} known monitors, {len(unresolved)} geo lookups)"
+    )
+    
+    # Execute all requests concurrently with semaphore limiting, reusing pooled connections
+    owns_client = client is None
+    if owns_client:
+        client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=max(1, max_concurrent)),
+        )
+    try:
+        completed_tasks = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        if owns_client:
+            await client.aclose()
     
     # Process results
     success_count = 0
@@ -314,19 +394,220 @@ async def fetch_aqi_from_waqi(
             error_count += 1
             continue
             
-        station_name, station_data = result
-        results[station_name] = station_data
+        for station_name, station_data in result:
+            results[station_name] = station_data
+            
+            if "error" in station_data:
+                error_count += 1
+            else:
+                success_count += 1
+    
+    stale_count = sum("stale_seconds" in station_data for station_data in results.values())
+    if stale_count:
+        LOGGER.warning(f"WAQI unavailable for {stale_count} stations; served their last good readings")
+    LOGGER.info(f"AQI fetch completed: {success_count} successful, {error_count} errors")
+    
+    return results
+
+
+def _parse_bounds_monitors(entries: List[Dict]) -> List[Dict]:
+    """Keep map/bounds entries that carry a numeric reading and a location."""
+    monitors = []
+    for entry in entries:
+        try:
+            aqi_value = float(entry.get("aqi"))
+            lat, lon = float(entry["lat"]), float(entry["lon"])
+        except (KeyError, TypeError, ValueError):
+            # Offline monitors report "-"
+            continue
+        if aqi_value != aqi_value:
+            continue
+        station = entry.get("station") or {}
+        monitors.append({
+            "uid": entry.get("uid"),
+            "name": station.get("name", ""),
+            "time": station.get("time", ""),
+            "lat": lat,
+            "lon": lon,
+            "aqi": aqi_value,
+        })
+    return monitors
+
+
+async def fetch_aqi_from_waqi_bounds(
+    waqi_token: str,
+    stations: Optional[List[str]] = None,
+    bounds: Tuple[float, float, float, float] = DELHI_BOUNDS,
+    power: float = 2.0,
+    neighbors: int = 0,
+    retry_delay: float = 0.5,
+    max_retries: int = 2,
+    client: Optional[httpx.AsyncClient] = None,
+    api_url: str = WAQI_API_URL
+) -> Dict[str, Dict]:
+    """Estimate AQI for police stations from one WAQI map/bounds call.
+    
+    Every monitor inside ``bounds`` is fetched at once and each station's AQI
+    is interpolated from them by inverse distance weighting. The weights of
+    the latest run are kept for ``get_last_interpolation()``.
+    
+    Args:
+        waqi_token: WAQI API token
+        stations: Subset of stations to estimate (defaults to all configured stations)
+        bounds: (lat1, lng1, lat2, lng2) corners of the box to fetch
+        power: IDW distance exponent
+        neighbors: Nearest monitors used per station; 0 uses all
+        retry_delay: Delay between retries in seconds
+        max_retries: Maximum number of retries
+        client: Shared keep-alive HTTP client
+        api_url: Base URL of the WAQI API
         
-        if "error" in station_data:
-            error_count += 1
+    Returns:
+        Station name -> AQI data in the same shape as ``fetch_aqi_from_waqi``;
+        every station gets the fallback entry if no monitor reading is available
+    """
+    global _LAST_INTERPOLATION
+    if not waqi_token:
+        raise HTTPException(status_code=500, detail="WAQI API token not configured")
+    
+    if stations is None:
+        station_coords = POLICE_STATION_COORDINATES
+    else:
+        station_coords = {
+            station.lower(): POLICE_STATION_COORDINATES[station.lower()]
+            for station in stations
+            if station.lower() in POLICE_STATION_COORDINATES
+        }
+        if not station_coords:
+            raise HTTPException(status_code=400, detail="No valid stations supplied for WAQI AQI fetch")
+    
+    owns_client = client is None
+    if owns_client:
+        client = httpx.AsyncClient(timeout=10.0)
+    
+    upstream = get_upstream("waqi")
+    monitors: List[Dict] = []
+    try:
+        response = await upstream.get(
+            client,
+            f"{api_url.rstrip('/')}/map/bounds/",
+            params={"latlng": ",".join(str(value) for value in bounds), "token": waqi_token},
+            endpoint="map_bounds",
+            label="bounds",
+            max_retries=max_retries,
+            retry_delay=retry_delay,
+        )
+        if response.status_code != 200:
+            error = f"HTTP {response.status_code}"
         else:
-            success_count += 1
+            data = response.json()
+            if data.get("status") != "ok":
+                error = data.get("data", "Unknown API error")
+            else:
+                monitors = _parse_bounds_monitors(data.get("data") or [])
+                error = None if monitors else "No monitor readings inside bounds"
+    except UpstreamUnavailable as exc:
+        error = exc.reason
+    except ValueError as exc:
+        error = str(exc)
+    finally:
+        if owns_client:
+            await client.aclose()
     
-    LOGGER.info(f"AQI fetch completed: {success_count} successful, {error_count} errors")
+    if error is not None:
+        last_good = upstream.last_good(("bounds", tuple(station_coords)))
+        if last_good is not None:
+            results, age = last_good
+            UPSTREAM_LAST_GOOD.inc("waqi")
+            LOGGER.warning(f"WAQI map bounds fetch failed ({error}); serving estimates from {age:.0f}s ago")
+            return {station_name: {**entry, "stale_seconds": round(age, 1)} for station_name, entry in results.items()}
+    
+    if error is not None:
+        AQI_FALLBACKS.inc("bounds_error", amount=len(station_coords))
+        LOGGER.error(f"WAQI map bounds fetch failed: {error}")
+        return {
+            station_name: {"error": error, "aqi": 150.0, "status": "Moderate"}
+            for station_name in station_coords
+        }
     
+    interpolation = interpolate_idw(station_coords, monitors, power=power, neighbors=neighbors)
+    _LAST_INTERPOLATION = interpolation
+    nearest = interpolation.distances.argmin(axis=1)
+    results = {}
+    for row, station_name in enumerate(interpolation.stations):
+        aqi_value = round(float(interpolation.estimates[row]), 1)
+        monitor = monitors[nearest[row]]
+        lng, lat = station_coords[station_name]
+        results[station_name] = {
+            "aqi": aqi_value,
+            "status": categorize_aqi(aqi_value),
+            "location": monitor["name"] or station_name,
+            "coordinates": [lng, lat],
+            "time": monitor["time"],
+            "attributions": [],
+            "interpolated_from": int(np.count_nonzero(interpolation.weights[row])),
+        }
+    
+    upstream.remember(("bounds", tuple(station_coords)), results)
+    LOGGER.info(f"Interpolated AQI for {len(results)} police stations from {len(monitors)} WAQI monitors")
     return results
 
 
+def get_last_interpolation() -> Optional[Interpolation]:
+    """Return the weights behind the latest map/bounds AQI estimates, if any."""
+    return _LAST_INTERPOLATION
+
+
+async def fetch_single_station_aqi(
+    waqi_token: str,
+    station: str,
+    client: Optional[httpx.AsyncClient] = None,
+    cache_ttl: float = 60.0,
+    retry_delay: float = 0.5,
+    max_retries: int = 2,
+    api_url: str = WAQI_API_URL
+) -> Dict:
+    """Fetch AQI for one station, coalescing concurrent lookups.
+
+    Concurrent callers for the same station share a single upstream call, and
+    successful results are cached for ``cache_ttl`` seconds. Failed lookups
+    (fallback values) and monitors without a value are returned but not cached.
+    
+    Args:
+        waqi_token: WAQI API token
+        station: Police station name (case-insensitive)
+        client: Shared keep-alive HTTP client
+        cache_ttl: Seconds to cache a successful result
+        retry_delay: Delay between retries in seconds
+        max_retries: Maximum number of retries
+        api_url: Base URL of the WAQI API
+        
+    Returns:
+        AQI data for the station in the same shape as ``fetch_aqi_from_waqi``
+    """
+    key = station.lower()
+    cached = _STATION_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    async def fetch() -> Dict:
+        results = await fetch_aqi_from_waqi(
+            waqi_token,
+            stations=[key],
+            max_concurrent=1,
+            retry_delay=retry_delay,
+            max_retries=max_retries,
+            client=client,
+            api_url=api_url
+        )
+        station_data = results[key]
+        if "error" not in station_data and "no_reading" not in station_data:
+            _STATION_CACHE.set(key, station_data, ttl=cache_ttl)
+        return station_data
+
+    return await _STATION_FLIGHTS.do(key, fetch)
+
+
 def categorize_aqi(aqi_value: float) -> str:
     """Return a descriptive AQI category for a numeric AQI value."""
     try:
@@ -1,13 +1,51 @@
-"""Weather and AQI fetching service."""
+"""Weather and AQI fetching service.
 
+Bundles are cached per city with stale-while-revalidate: fresh entries are
+returned as-is, stale ones are returned immediately while one background
+refresh replaces them, and a failing refresh leaves the stale entry in
+place until it passes ``weather_cache_max_stale``. A city's coordinates are
+remembered permanently, so later lookups request the weather and the air
+pollution readings concurrently instead of one after the other. Bundles
+are also written to the snapshot store and reloaded at startup.
+"""
+
+import asyncio
+import contextvars
 import logging
-from typing import Dict
+import time
+from typing import Dict, Hashable, Set, Tuple
 
 import httpx
 from fastapi import HTTPException
 
+from ..cache import StaleCache
+from ..config import get_settings
+from ..metrics import UPSTREAM_LAST_GOOD, register_cache
+from ..singleflight import SingleFlight
+from ..tracing import record_span
+from .snapshot_store import get_snapshot_store
+from .upstream import UpstreamUnavailable, get_upstream
+
 LOGGER = logging.getLogger(__name__)
 
+# In-flight lookups shared by concurrent requests for the same city
+_WEATHER_FLIGHTS = SingleFlight()
+_WEATHER_CACHE = StaleCache(
+    ttl=get_settings().weather_cache_ttl, max_stale=get_settings().weather_cache_max_stale
+)
+register_cache("weather", _WEATHER_CACHE)
+# (city, weather_url) -> (lat, lon); a city does not move
+_COORDINATES: Dict[Tuple[str, str], Tuple[float, float]] = {}
+# Keys whose last refresh failed, so serving them counts as a last-good fallback
+_REFRESH_FAILED: Set[Hashable] = set()
+# Background revalidations, referenced until done so they are not garbage collected
+_REVALIDATIONS: Set[asyncio.Task] = set()
+
+
+def normalize_city(city: str) -> str:
+    """Return the key used to de-duplicate lookups for the same city."""
+    return city.strip().lower()
+
 
 async def fetch_weather_and_aqi(
     client: httpx.AsyncClient,
@@ -18,6 +56,11 @@ async def fetch_weather_and_aqi(
 ) -> Dict:
     """Fetch weather and AQI data from OpenWeatherMap API.
     
+    Answers from the per-city cache when it can (see the module docstring).
+    Concurrent calls for the same city share one pair of upstream requests,
+    and cached bundles are shared too, so the returned bundle must be
+    treated as read-only.
+    
     Args:
         client: HTTP client instance
         city: City name
@@ -31,29 +74,135 @@ async def fetch_weather_and_aqi(
     if not openweather_api_key:
         raise HTTPException(status_code=500, detail="OPENWEATHER_API_KEY not configured.")
 
-    weather_resp = await client.get(
-        weather_url,
-        params={"q": city, "appid": openweather_api_key, "units": "metric"},
-    )
-    if weather_resp.status_code != 200:
-        raise HTTPException(
-            status_code=weather_resp.status_code,
-            detail=f"Weather lookup failed for {city}: {weather_resp.text}"
-        )
+    key = (normalize_city(city), weather_url, air_pollution_url)
+    cached = _WEATHER_CACHE.get(key)
+    if cached is not None:
+        bundle, age = cached
+        if not _WEATHER_CACHE.is_fresh(age):
+            if key in _REFRESH_FAILED:
+                UPSTREAM_LAST_GOOD.inc("openweather")
+            _revalidate(key, client, city, openweather_api_key, weather_url, air_pollution_url)
+        return bundle
 
-    weather_data = weather_resp.json()
-    coord = weather_data.get("coord") or {}
-    lat, lon = coord.get("lat"), coord.get("lon")
-    if lat is None or lon is None:
-        raise HTTPException(
-            status_code=502,
-            detail=f"Weather data for {city} missing lat/lon"
+    try:
+        return await _refresh(key, client, city, openweather_api_key, weather_url, air_pollution_url)
+    except UpstreamUnavailable as exc:
+        raise HTTPException(status_code=503, detail=f"Weather lookup failed for {city}: {exc.reason}")
+
+
+async def _refresh(
+    key: Hashable,
+    client: httpx.AsyncClient,
+    city: str,
+    openweather_api_key: str,
+    weather_url: str,
+    air_pollution_url: str
+) -> Dict:
+    """Fetch a new bundle into the cache, joining a refresh already in flight for ``key``."""
+    async def fetch() -> Dict:
+        bundle = await _request_weather_and_aqi(client, city, openweather_api_key, weather_url, air_pollution_url)
+        _WEATHER_CACHE.set(key, bundle)
+        _REFRESH_FAILED.discard(key)
+        await _persist(key, bundle)
+        return bundle
+
+    return await _WEATHER_FLIGHTS.do(key, fetch)
+
+
+def _revalidate(
+    key: Hashable,
+    client: httpx.AsyncClient,
+    city: str,
+    openweather_api_key: str,
+    weather_url: str,
+    air_pollution_url: str
+) -> None:
+    """Refresh a stale entry in the background; at most one refresh runs per city."""
+    if key in _WEATHER_FLIGHTS:
+        return
+
+    async def run() -> None:
+        try:
+            await _refresh(key, client, city, openweather_api_key, weather_url, air_pollution_url)
+        except (UpstreamUnavailable, HTTPException) as exc:
+            # The stale entry stays in place until it passes weather_cache_max_stale
+            _REFRESH_FAILED.add(key)
+            reason = exc.reason if isinstance(exc, UpstreamUnavailable) else exc.detail
+            LOGGER.warning(f"Weather refresh failed for {city}; serving cached data: {reason}")
+        except Exception:
+            LOGGER.exception(f"Weather refresh failed for {city}")
+
+    # A fresh context keeps the refresh's spans out of the request that triggered it
+    task = asyncio.create_task(run(), name=f"weather-revalidate-{key[0]}", context=contextvars.Context())
+    _REVALIDATIONS.add(task)
+    task.add_done_callback(_REVALIDATIONS.discard)
+
+
+async def _persist(key: Tuple[str, str, str], bundle: Dict) -> None:
+    store = get_snapshot_store()
+    if store is None:
+        return
+    try:
+        await asyncio.to_thread(store.save_weather, key, time.time(), bundle)
+    except Exception as exc:
+        LOGGER.warning(f"Could not persist weather for {key[0]}: {exc}")
+
+
+def restore_weather_cache() -> None:
+    """Load stored bundles (and their cities' coordinates) into the cache. Called from the app lifespan."""
+    store = get_snapshot_store()
+    if store is None:
+        return
+    try:
+        stored = store.load_weather()
+    except Exception as exc:
+        LOGGER.warning(f"Ignoring unreadable weather snapshot store {store.path}: {exc}")
+        return
+    now = time.time()
+    restored = 0
+    for key, fetched_at, bundle in stored:
+        age = max(0.0, now - fetched_at)
+        if age > _WEATHER_CACHE.max_stale:
+            continue
+        _WEATHER_CACHE.set(key, bundle, age=age)
+        coord = bundle.get("weather", {}).get("coord") or {}
+        if coord.get("lat") is not None and coord.get("lon") is not None:
+            _COORDINATES.setdefault((key[0], key[1]), (coord["lat"], coord["lon"]))
+        restored += 1
+    if restored:
+        LOGGER.info("Restored cached weather for %d cities from %s", restored, store.path)
+
+
+async def _request_weather_and_aqi(
+    client: httpx.AsyncClient,
+    city: str,
+    openweather_api_key: str,
+    weather_url: str,
+    air_pollution_url: str
+) -> Dict:
+    coordinates_key = (normalize_city(city), weather_url)
+    weather_params = {"q": city, "appid": openweather_api_key, "units": "metric"}
+    coordinates = _COORDINATES.get(coordinates_key)
+    if coordinates is None:
+        weather_resp = await _timed_get(client, "weather", weather_url, params=weather_params)
+        weather_data = _weather_payload(weather_resp, city)
+        coordinates = _COORDINATES.setdefault(coordinates_key, _coordinates(weather_data, city))
+        aqi_resp = await _timed_get(
+            client, "air_pollution", air_pollution_url, params=_aqi_params(coordinates, openweather_api_key)
+        )
+    else:
+        weather_task = asyncio.ensure_future(_timed_get(client, "weather", weather_url, params=weather_params))
+        aqi_task = asyncio.ensure_future(
+            _timed_get(client, "air_pollution", air_pollution_url, params=_aqi_params(coordinates, openweather_api_key))
         )
+        try:
+            weather_resp, aqi_resp = await asyncio.gather(weather_task, aqi_task)
+        except BaseException:
+            weather_task.cancel()
+            aqi_task.cancel()
+            raise
+        weather_data = _weather_payload(weather_resp, city)
 
-    aqi_resp = await client.get(
-        air_pollution_url,
-        params={"lat": lat, "lon": lon, "appid": openweather_api_key},
-    )
     if aqi_resp.status_code != 200:
         raise HTTPException(
             status_code=aqi_resp.status_code,
@@ -67,3 +216,50 @@ async def fetch_weather_and_aqi(
 
     aqi_value = float(aqi_list[0].get("main", {}).get("aqi", 0))
     return {"weather": weather_data, "aqi": aqi_value}
+
+
+def _weather_payload(response: httpx.Response, city: str) -> Dict:
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Weather lookup failed for {city}: {response.text}"
+        )
+    return response.json()
+
+
+def _coordinates(weather_data: Dict, city: str) -> Tuple[float, float]:
+    coord = weather_data.get("coord") or {}
+    lat, lon = coord.get("lat"), coord.get("lon")
+    if lat is None or lon is None:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Weather data for {city} missing lat/lon"
+        )
+    return lat, lon
+
+
+def _aqi_params(coordinates: Tuple[float, float], openweather_api_key: str) -> Dict:
+    lat, lon = coordinates
+    return {"lat": lat, "lon": lon, "appid": openweather_api_key}
+
+
+async def _timed_get(client: httpx.AsyncClient, endpoint: str, url: str, params: Dict) -> httpx.Response:
+    """GET from OpenWeatherMap through the shared upstream call layer.
+
+    Outcomes are labelled by endpoint rather than city: cities come from
+    request bodies, and an unbounded label set would grow without limit.
+    """
+    settings = get_settings()
+    started = time.perf_counter()
+    try:
+        return await get_upstream("openweather").get(
+            client,
+            url,
+            params=params,
+            endpoint=endpoint,
+            label=endpoint,
+            max_retries=settings.openweather_max_retries,
+            retry_delay=settings.openweather_retry_delay,
+        )
+    finally:
+        record_span(f"openweather_{endpoint}", started, time.perf_counter() - started)
@@ -0,0 +1,189 @@
+"""Per-request stage timing, exposed as Server-Timing and optional JSON trace lines.
+
+``TracingMiddleware`` attaches a ``RequestTrace`` to the request's context;
+code on the request path wraps stages in ``span("name")``. Spans recorded in
+child tasks and on the inference pool land in the same trace because both
+inherit the request context. Without an active trace, ``span()`` returns a
+shared no-op object, so instrumented code costs one context variable lookup.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+LOGGER = logging.getLogger(__name__)
+TRACE_LOGGER = logging.getLogger("app.trace")
+
+_TRACE: contextvars.ContextVar[Optional["RequestTrace"]] = contextvars.ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """Spans recorded for one HTTP request."""
+
+    __slots__ = ("trace_id", "started", "spans", "handler_ended")
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+        self.handler_ended: Optional[float] = None
+
+    def add(self, name: str, start: float, duration: float) -> None:
+        # list.append is atomic, so inference threads can record safely
+        self.spans.append((name, start, duration))
+
+    def durations(self) -> Dict[str, float]:
+        """Total seconds per span name, in first-seen order."""
+        totals: Dict[str, float] = {}
+        for name, _, duration in self.spans:
+            totals[name] = totals.get(name, 0.0) + duration
+        return totals
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: RequestTrace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.trace.add(self.name, self.start, time.perf_counter() - self.start)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str):
+    """Time a ``with`` block as a stage of the current request (no-op outside one)."""
+    trace = _TRACE.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+def record_span(name: str, start: float, duration: float) -> None:
+    """Record an already measured stage (``time.perf_counter()`` based)."""
+    trace = _TRACE.get()
+    if trace is not None:
+        trace.add(name, start, duration)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _TRACE.get()
+
+
+def _mark_handler_end(endpoint: Callable) -> Callable:
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            trace = _TRACE.get()
+            if trace is not None:
+                trace.handler_ended = time.perf_counter()
+
+    return wrapper
+
+
+class TracedRoute(APIRoute):
+    """Route that marks when its endpoint returns.
+
+    FastAPI validates and serializes the response model after the endpoint
+    returns; the middleware reports the gap until the response starts as the
+    ``serialize`` stage.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _mark_handler_end(endpoint), **kwargs)
+
+
+def _server_timing(trace: RequestTrace, total: float) -> str:
+    entries = [f"{name};dur={duration * 1000:.2f}" for name, duration in trace.durations().items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class TracingMiddleware:
+    """ASGI middleware that owns the per-request trace.
+
+    Adds a ``Server-Timing`` header to every response when ``server_timing``
+    is set and, when ``log_traces`` is set, logs one JSON line per request
+    slower than ``log_min_ms`` to the ``app.trace`` logger.
+    """
+
+    def __init__(self, app, server_timing: bool = True, log_traces: bool = False, log_min_ms: float = 0.0):
+        self.app = app
+        self.server_timing = server_timing
+        self.log_traces = log_traces
+        self.log_min_ms = log_min_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _TRACE.set(trace)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = time.perf_counter()
+                if trace.handler_ended is not None:
+                    trace.add("serialize", trace.handler_ended, now - trace.handler_ended)
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(trace, now - trace.started).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _TRACE.reset(token)
+            if self.log_traces:
+                self._log(scope, status, trace)
+
+    def _log(self, scope, status: int, trace: RequestTrace) -> None:
+        total_ms = (time.perf_counter() - trace.started) * 1000
+        if total_ms < self.log_min_ms:
+            return
+        route = scope.get("route")
+        TRACE_LOGGER.info(json.dumps({
+            "trace_id": trace.trace_id,
+            "method": scope["method"],
+            "route": getattr(route, "path", None) or scope["path"],
+            "status": status,
+            "duration_ms": round(total_ms, 3),
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round((start - trace.started) * 1000, 3),
+                    "duration_ms": round(duration * 1000, 3),
+                }
+                for name, start, duration in trace.spans
+            ],
+        }))
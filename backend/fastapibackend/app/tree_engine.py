@@ -0,0 +1,260 @@
+"""Array-backed evaluator for XGBoost tree ensembles.
+
+This service scores small batches (1-170 rows), and for the smallest of them
+most of the time spent in XGBoost is fixed per-call overhead rather than tree
+evaluation. ``ArrayTreeEnsemble`` exports every tree into flat NumPy arrays
+once and evaluates all trees for a batch with vectorized, level-by-level
+traversal, followed by the multiclass softmax.
+"""
+
+import json
+import logging
+import time
+from typing import Dict, Sequence
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+SUPPORTED_OBJECTIVES = ("multi:softprob", "multi:softmax", "binary:logistic")
+
+
+class UnsupportedModelError(ValueError):
+    """Raised when a booster uses features the array evaluator cannot reproduce."""
+
+
+class ArrayTreeEnsemble:
+    """Flat-array copy of a booster's trees.
+
+    Node arrays are concatenated across trees; leaves point to themselves so
+    every row can take exactly ``max_depth`` steps without branching.
+    """
+
+    def __init__(
+        self,
+        split_feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        default_left: np.ndarray,
+        leaf_value: np.ndarray,
+        roots: np.ndarray,
+        tree_class: np.ndarray,
+        max_depth: int,
+        n_classes: int,
+        n_features: int,
+        objective: str,
+    ):
+        self.split_feature = split_feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        # children[2 * node + go_right] gives the next node in one gather
+        self.children = np.stack([left, right], axis=1).ravel()
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_classes = n_classes
+        self.n_features = n_features
+        self.objective = objective
+        # Sums leaf values per output group with one matrix product
+        self.class_matrix = np.zeros((len(roots), max(1, n_classes if objective.startswith("multi") else 1)), dtype=np.float32)
+        self.class_matrix[np.arange(len(roots)), tree_class] = 1.0
+        self.bias = np.zeros(self.class_matrix.shape[1], dtype=np.float32)
+
+    @classmethod
+    def from_booster(cls, booster) -> "ArrayTreeEnsemble":
+        """Export a trained ``xgboost.Booster`` into flat arrays."""
+        model = json.loads(booster.save_raw(raw_format="json"))
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise UnsupportedModelError(f"Unsupported objective '{objective}'")
+        gbtree = learner["gradient_booster"]
+        if gbtree.get("name") != "gbtree":
+            raise UnsupportedModelError(f"Unsupported booster '{gbtree.get('name')}'")
+        trees = gbtree["model"]["trees"]
+        tree_info = gbtree["model"]["tree_info"]
+        n_classes = int(learner["learner_model_param"].get("num_class", "0") or 0)
+        n_features = int(learner["learner_model_param"]["num_feature"])
+
+        split_feature, threshold, left, right, default_left, leaf_value, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for tree in trees:
+            if any(tree.get("split_type", [])) or tree.get("categories"):
+                raise UnsupportedModelError("Categorical splits are not supported")
+            if int(tree["tree_param"].get("size_leaf_vector", "1")) > 1:
+                raise UnsupportedModelError("Vector leaves are not supported")
+            lc = np.asarray(tree["left_children"], dtype=np.int32)
+            rc = np.asarray(tree["right_children"], dtype=np.int32)
+            n_nodes = len(lc)
+            local = np.arange(n_nodes, dtype=np.int32)
+            is_leaf = lc == -1
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+
+            split_feature.append(np.where(is_leaf, 0, np.asarray(tree["split_indices"], dtype=np.int32)))
+            threshold.append(np.where(is_leaf, np.float32(np.inf), conditions))
+            left.append(np.where(is_leaf, local, lc) + offset)
+            right.append(np.where(is_leaf, local, rc) + offset)
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            leaf_value.append(np.where(is_leaf, conditions, np.float32(0.0)))
+            roots.append(offset)
+            max_depth = max(max_depth, _tree_depth(lc, rc))
+            offset += n_nodes
+
+        return cls(
+            split_feature=np.concatenate(split_feature).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            left=np.concatenate(left).astype(np.intp),
+            right=np.concatenate(right).astype(np.intp),
+            default_left=np.concatenate(default_left),
+            leaf_value=np.concatenate(leaf_value).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.intp),
+            tree_class=np.asarray(tree_info, dtype=np.intp),
+            max_depth=max_depth,
+            n_classes=n_classes,
+            n_features=n_features,
+            objective=objective,
+        )
+
+    def calibrate(self, booster, X: np.ndarray) -> None:
+        """Take the base margin from the booster itself.
+
+        How ``base_score`` maps to a margin differs between XGBoost versions,
+        so the bias is measured as booster margin minus the summed leaves.
+        """
+        margin = np.asarray(booster.inplace_predict(X, predict_type="margin"), dtype=np.float64)
+        margin = margin.reshape(len(X), -1)
+        self.bias = np.zeros(self.class_matrix.shape[1], dtype=np.float32)
+        diff = margin - self.predict_margin(X)
+        if np.ptp(diff, axis=0).max() > 1e-3:
+            raise UnsupportedModelError("Booster margin is not a constant offset of the summed leaves")
+        self.bias = np.median(diff, axis=0).astype(np.float32)
+
+    def predict_margin(self, X: np.ndarray) -> np.ndarray:
+        """Return raw margins, shape ``(n_rows, n_outputs)``."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] < self.n_features:
+            raise ValueError(f"Expected a 2-D matrix with {self.n_features} features, got shape {X.shape}")
+        flat = X.ravel()
+        row_base = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            values = flat.take(row_base + self.split_feature.take(node))
+            go_right = ~(values < self.threshold.take(node))
+            missing = np.isnan(values)
+            if missing.any():
+                go_right = np.where(missing, ~self.default_left.take(node), go_right)
+            node = self.children.take(2 * node + go_right)
+        return self.leaf_value.take(node) @ self.class_matrix + self.bias
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Return class probabilities in the same layout as ``booster.predict``."""
+        margin = self.predict_margin(X)
+        if self.objective == "binary:logistic":
+            return 1.0 / (1.0 + np.exp(-margin[:, 0]))
+        margin = margin - margin.max(axis=1, keepdims=True)
+        exp = np.exp(margin)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth = np.zeros(len(left), dtype=np.int32)
+    max_depth = 0
+    # XGBoost numbers children after their parents, so one forward pass suffices
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+            max_depth = max(max_depth, depth[node] + 1)
+    return max_depth
+
+
+def verification_grid(engine: ArrayTreeEnsemble, n_rows: int = 512, seed: int = 0) -> np.ndarray:
+    """Build inputs that straddle every split threshold (plus some missing values)."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0.0, 2.0, size=(n_rows, engine.n_features)).astype(np.float32)
+    internal = np.isfinite(engine.threshold)
+    features = engine.split_feature[internal]
+    thresholds = engine.threshold[internal]
+    if len(features):
+        picks = rng.integers(0, len(features), size=n_rows * 4)
+        rows = rng.integers(0, n_rows, size=n_rows * 4)
+        # Exactly on, just below and just above the threshold
+        nudges = rng.choice(np.array([0.0, -1e-4, 1e-4], dtype=np.float32), size=n_rows * 4)
+        X[rows, features[picks]] = thresholds[picks] + nudges
+    X[rng.random(X.shape) < 0.01] = np.nan
+    return X
+
+
+def build_array_engine(booster, atol: float = 1e-5) -> ArrayTreeEnsemble:
+    """Export, calibrate and cross-check an engine against ``booster.predict``.
+
+    Raises:
+        UnsupportedModelError: If the model cannot be exported
+        AssertionError: If predictions differ from XGBoost by more than ``atol``
+    """
+    import xgboost as xgb
+
+    engine = ArrayTreeEnsemble.from_booster(booster)
+    grid = verification_grid(engine)
+    engine.calibrate(booster, np.nan_to_num(grid[:64], nan=0.0))
+    expected = booster.predict(xgb.DMatrix(grid, missing=np.nan))
+    actual = engine.predict_proba(grid)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    if max_diff > atol:
+        raise AssertionError(f"Array engine differs from booster.predict (max abs diff {max_diff:.3g})")
+    LOGGER.info(
+        "Array tree engine verified (%d trees, depth %d, max diff %.2g)",
+        len(engine.roots), engine.max_depth, max_diff,
+    )
+    return engine
+
+
+def benchmark_engines(
+    engine: ArrayTreeEnsemble,
+    booster,
+    X: np.ndarray,
+    batch_sizes: Sequence[int] = (1, 10, 170),
+    min_seconds: float = 0.2
+) -> Dict[int, Dict[str, float]]:
+    """Time the array engine against ``booster.inplace_predict`` per batch size.
+
+    Returns:
+        Mapping of batch size to mean microseconds per call for each engine
+    """
+    results: Dict[int, Dict[str, float]] = {}
+    for size in batch_sizes:
+        batch = np.ascontiguousarray(np.resize(X, (size, X.shape[1])), dtype=np.float32)
+        results[size] = {
+            "xgboost_us": _time_call(lambda: booster.inplace_predict(batch), min_seconds),
+            "arrays_us": _time_call(lambda: engine.predict_proba(batch), min_seconds),
+        }
+    return results
+
+
+def _time_call(fn, min_seconds: float) -> float:
+    fn()
+    calls = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - started
+    return elapsed / calls * 1e6
+
+
+def array_engine_cutoff(results: Dict[int, Dict[str, float]]) -> int:
+    """Return the largest batch size up to which the array engine wins throughout.
+
+    Returns:
+        Batch size limit for the array engine (0 if XGBoost wins even for the smallest batch)
+    """
+    cutoff = 0
+    for size in sorted(results):
+        if results[size]["arrays_us"] >= results[size]["xgboost_us"]:
+            break
+        cutoff = size
+    return cutoff
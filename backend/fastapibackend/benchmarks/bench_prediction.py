@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Offline micro-benchmarks for the prediction hot path.
+
+Builds a synthetic preprocessor, XGBoost model and label encoder with the
+production ``FEATURES`` schema (no artifacts or network needed), then times
+each stage of a prediction at several batch sizes:
+
+    feature_build   weather bundle -> feature rows (``_extract_feature_row``)
+    transform       feature rows -> model matrix (``encode_features``)
+    inference       model matrix -> label indices and probabilities
+    label_decode    label indices -> class names
+    serialize       response models -> JSON (the response-building loop)
+    serialize_all   /predict-all body -> JSON, as plain data (``FastJSONResponse``)
+    serialize_all_columnar   the same with ``?format=columnar``
+    end_to_end      ``predict_safety`` on the feature rows
+
+Results are written as JSON and compared against a stored baseline; any stage
+slower than the baseline by more than the tolerance fails the run.
+
+Usage (from backend/fastapibackend):
+    python benchmarks/bench_prediction.py
+    python benchmarks/bench_prediction.py --sizes 1 10 170 --tolerance 0.5
+    python benchmarks/bench_prediction.py --update-baseline
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+# Add the FastAPI app to the path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from app.config import get_settings
+from app.constants import DELHI_POLICE_STATIONS
+from app.models import _attach_array_engine
+from app.model_wrapper import XGBWrapper
+from app.responses import dumps
+from app.routes.prediction import _extract_feature_row, _predict_all_payload
+from app.schemas.prediction import BatchPredictResponse, LocationRequest, PredictAllRequest, PredictionResult
+from app.services.prediction_service import FEATURES, encode_features, predict_safety
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_SIZES = (1, 10, 170, 1000, 10000)
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results.json"
+
+CATEGORICAL = ["police_station", "gender", "family"]
+NUMERIC = [feature for feature in FEATURES if feature not in CATEGORICAL]
+CLASSES = ["danger", "risky", "safe"]
+
+
+def build_synthetic_artifacts(n_train: int = 4000, n_rounds: int = 100, seed: int = 0):
+    """Fit a preprocessor, model and label encoder shaped like the production ones."""
+    import pandas as pd
+    import xgboost as xgb
+    from sklearn.compose import ColumnTransformer
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import LabelEncoder, OneHotEncoder, StandardScaler
+
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "month": rng.integers(1, 13, n_train),
+        "day": rng.integers(1, 32, n_train),
+        "police_station": rng.choice(DELHI_POLICE_STATIONS, n_train),
+        "gender": rng.choice(["male", "female", "other"], n_train),
+        "family": rng.choice(["with_family", "alone"], n_train),
+        **{feature: rng.normal(25.0, 8.0, n_train) for feature in NUMERIC[2:-2]},
+        "aqi": rng.uniform(20.0, 400.0, n_train),
+        "aqi_median": rng.uniform(20.0, 400.0, n_train),
+    })[FEATURES]
+
+    preprocessor = ColumnTransformer([
+        ("num", Pipeline([("impute", SimpleImputer(strategy="median")), ("scale", StandardScaler())]), NUMERIC),
+        ("cat", Pipeline([
+            ("impute", SimpleImputer(strategy="most_frequent")),
+            ("onehot", OneHotEncoder(handle_unknown="ignore", sparse_output=False)),
+        ]), CATEGORICAL),
+    ])
+    X = preprocessor.fit_transform(frame)
+
+    label_encoder = LabelEncoder().fit(CLASSES)
+    score = (frame["aqi"] > 150).astype(int) + (frame["gender"] == "female").astype(int)
+    y = label_encoder.transform(np.asarray(CLASSES)[score.to_numpy()])
+    booster = xgb.train(
+        {"objective": "multi:softprob", "num_class": len(CLASSES), "max_depth": 6, "seed": seed},
+        xgb.DMatrix(X, label=y),
+        n_rounds,
+    )
+    model = XGBWrapper(booster, list(range(len(CLASSES))))
+    _attach_array_engine(model)
+    return model, preprocessor, label_encoder
+
+
+def build_requests(n_rows: int, seed: int = 0):
+    """Build location requests and weather bundles as the /predict route sees them."""
+    rng = np.random.default_rng(seed)
+    locations = [
+        LocationRequest(
+            city="Delhi",
+            police_station=DELHI_POLICE_STATIONS[i % len(DELHI_POLICE_STATIONS)],
+            gender=("male", "female", "other")[i % 3],
+            family=("with_family", "alone")[i % 2],
+            month=int(rng.integers(1, 13)),
+            day=int(rng.integers(1, 29)),
+            year=2025,
+        )
+        for i in range(n_rows)
+    ]
+    bundles = [
+        {
+            "weather": {
+                "main": {"temp": 30.0, "temp_max": 33.0, "temp_min": 26.0, "humidity": 55.0},
+                "wind": {"speed": 3.5},
+                "rain": {"1h": 0.2},
+            },
+            "aqi": float(rng.uniform(20.0, 400.0)),
+        }
+        for _ in range(n_rows)
+    ]
+    return locations, bundles
+
+
+def build_response(locations, bundles, labels, probabilities, classes) -> str:
+    """Mirror the response-building loop in the /predict route and serialize it."""
+    results = []
+    for loc, label, probs, bundle in zip(locations, labels, probabilities, bundles):
+        weather_main = bundle["weather"].get("main", {})
+        results.append(
+            PredictionResult(
+                city=loc.city,
+                police_station=loc.police_station,
+                predicted_label=label,
+                probabilities={cls: float(prob) for cls, prob in zip(classes, probs)},
+                weather_snapshot={
+                    "temp": float(weather_main.get("temp", 0.0)),
+                    "humidity": float(weather_main.get("humidity", 0.0)),
+                    "wind_speed": float(bundle["weather"].get("wind", {}).get("speed", 0.0)),
+                    "aqi": float(bundle.get("aqi", 0.0)),
+                },
+            )
+        )
+    return BatchPredictResponse(predictions=results, model_version="benchmark").model_dump_json()
+
+
+def build_predict_all(locations, bundles, labels, probabilities, classes, response_format: str) -> bytes:
+    """Mirror the /predict-all response building (one row per request row) and serialize it."""
+    weather_main = bundles[0]["weather"]["main"]
+    weather_features = {
+        "temp_avg": weather_main["temp"],
+        "humidity": weather_main["humidity"],
+        "wind_speed": bundles[0]["weather"]["wind"]["speed"],
+    }
+    payload = _predict_all_payload(
+        PredictAllRequest(month=7, day=15),
+        [loc.police_station for loc in locations],
+        [bundle["aqi"] for bundle in bundles],
+        labels,
+        probabilities,
+        classes,
+        weather_features,
+        "benchmark",
+        response_format,
+    )
+    return dumps(payload)
+
+
+def time_call(fn, min_time: float, repeats: int) -> float:
+    """Return the fastest microseconds per call over ``repeats`` timed runs.
+
+    The minimum is the least noisy estimate: slower runs are slowed by other
+    processes, not by the code being measured.
+    """
+    fn()
+    started = time.perf_counter()
+    fn()
+    single = max(time.perf_counter() - started, 1e-7)
+    number = max(1, int(min_time / single))
+
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return min(samples) * 1e6
+
+
+def run_benchmarks(artifacts, sizes, min_time: float, repeats: int) -> dict:
+    model, preprocessor, label_encoder = artifacts
+    classes = label_encoder.classes_
+    results = {}
+
+    for size in sizes:
+        locations, bundles = build_requests(size)
+        rows = [_extract_feature_row(loc, bundle) for loc, bundle in zip(locations, bundles)]
+        X = encode_features(rows, preprocessor)
+        label_indices, probabilities = model.predict_with_proba(X)
+        labels = label_encoder.inverse_transform(label_indices)
+
+        stages = {
+            "feature_build": lambda: [_extract_feature_row(loc, bundle) for loc, bundle in zip(locations, bundles)],
+            "transform": lambda: encode_features(rows, preprocessor),
+            "inference": lambda: model.predict_with_proba(X),
+            "label_decode": lambda: label_encoder.inverse_transform(label_indices),
+            "serialize": lambda: build_response(locations, bundles, labels, probabilities, classes),
+            "serialize_all": lambda: build_predict_all(locations, bundles, labels, probabilities, classes, "rows"),
+            "serialize_all_columnar": lambda: build_predict_all(
+                locations, bundles, labels, probabilities, classes, "columnar"
+            ),
+            "end_to_end": lambda: predict_safety(rows, model, preprocessor, label_encoder),
+        }
+        for stage, fn in stages.items():
+            per_call = time_call(fn, min_time, repeats)
+            results[f"{stage}/{size}"] = {
+                "stage": stage,
+                "batch_size": size,
+                "us_per_call": round(per_call, 2),
+                "us_per_row": round(per_call / size, 3),
+            }
+            print(f"  {stage:<22} {size:>6} rows  {per_call:>12.1f} us  ({per_call / size:.2f} us/row)")
+
+    return results
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float, min_delta_us: float) -> list:
+    """Return (name, baseline_us, current_us) for every stage that regressed."""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"  {name}: no baseline entry")
+            continue
+        before, after = reference["us_per_call"], current["us_per_call"]
+        # Tiny stages are dominated by timer noise, so also require an absolute slowdown
+        if after > before * (1.0 + tolerance) and after - before > min_delta_us:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per timed run")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per stage; the fastest is reported")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.30, help="allowed fractional slowdown vs baseline")
+    parser.add_argument("--min-delta-us", type=float, default=20.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--update-baseline", action="store_true", help="write results as the new baseline")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    import sklearn
+    import xgboost
+
+    print("Benchmarking prediction hot path...")
+    artifacts = build_synthetic_artifacts()
+    model = artifacts[0]
+    results = run_benchmarks(artifacts, args.sizes, args.min_time, args.repeats)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "xgboost": xgboost.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "inference_engine": get_settings().inference_engine,
+            "array_engine_max_batch": getattr(model, "array_engine_max_batch", 0),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())["results"]
+    regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_delta_us)
+    if regressions:
+        print(f"\n❌ PERFORMANCE REGRESSION ({len(regressions)} stages slower than baseline by > {args.tolerance:.0%}):")
+        for name, before, after in regressions:
+            print(f"  {name:<22} {before:>12.1f} us -> {after:>12.1f} us  ({after / before:.2f}x)")
+        return 1
+
+    print(f"\n✅ No stage is more than {args.tolerance:.0%} slower than the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
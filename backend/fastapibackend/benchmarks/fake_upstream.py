@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Local stand-in for the WAQI and OpenWeatherMap APIs.
+
+Serves the endpoints the service calls, with configurable latency, error rate
+and rate limiting, so load tests never touch production quotas:
+
+    GET /feed/geo:{lat};{lng}/     nearest synthetic WAQI monitor
+    GET /feed/@{uid}/              WAQI monitor by uid
+    GET /map/bounds/?latlng=...    WAQI monitors inside a bounding box
+    GET /data/2.5/weather          OpenWeatherMap current weather
+    GET /data/2.5/air_pollution    OpenWeatherMap air pollution
+    GET /__stats                   request counters of this server
+
+Modes:
+    fake    synthetic, deterministic responses (default)
+    record  proxy to the real APIs and save every response into a cassette
+    replay  serve responses from a cassette; unknown requests get 404
+
+Point the service at it with:
+    WAQI_API_URL=http://127.0.0.1:9000
+    WEATHER_URL=http://127.0.0.1:9000/data/2.5/weather
+    AIR_POLLUTION_URL=http://127.0.0.1:9000/data/2.5/air_pollution
+
+Usage (from backend/fastapibackend):
+    python benchmarks/fake_upstream.py --latency-ms 80 --error-rate 0.02 --rate-limit 200
+    python benchmarks/fake_upstream.py --mode record --cassette benchmarks/cassette.json
+    python benchmarks/fake_upstream.py --mode replay --cassette benchmarks/cassette.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+LOGGER = logging.getLogger("fake_upstream")
+
+WAQI_UPSTREAM = "http://api.waqi.info"
+OPENWEATHER_UPSTREAM = "https://api.openweathermap.org"
+
+# Delhi bounding box (lat_min, lng_min, lat_max, lng_max)
+DELHI_BOUNDS = (28.40, 76.84, 28.88, 77.35)
+
+# Query parameters that carry credentials; never part of a cassette key
+SECRET_PARAMS = {"token", "appid"}
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second with bursts of up to ``rate``."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class SyntheticWorld:
+    """Fixed set of WAQI monitors spread over Delhi with stable AQI values."""
+
+    def __init__(self, n_monitors: int = 40, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        lat_min, lng_min, lat_max, lng_max = DELHI_BOUNDS
+        self.lat = rng.uniform(lat_min, lat_max, n_monitors)
+        self.lng = rng.uniform(lng_min, lng_max, n_monitors)
+        self.aqi = rng.integers(30, 350, n_monitors)
+        self.uids = [10000 + i for i in range(n_monitors)]
+        # A few monitors report no reading, as real ones sometimes do
+        self.offline = set(rng.choice(n_monitors, size=max(1, n_monitors // 20), replace=False).tolist())
+
+    def nearest(self, lat: float, lng: float) -> int:
+        return int(np.argmin((self.lat - lat) ** 2 + (self.lng - lng) ** 2))
+
+    def reading(self, i: int) -> str | int:
+        return "-" if i in self.offline else int(self.aqi[i])
+
+    def feed(self, i: int) -> Dict:
+        return {
+            "status": "ok",
+            "data": {
+                "aqi": self.reading(i),
+                "idx": self.uids[i],
+                "city": {"name": f"Synthetic Monitor {i}, Delhi", "geo": [float(self.lat[i]), float(self.lng[i])]},
+                "time": {"s": time.strftime("%Y-%m-%d %H:00:00")},
+                "attributions": [{"name": "fake_upstream", "url": ""}],
+            },
+        }
+
+    def bounds(self, lat1: float, lng1: float, lat2: float, lng2: float) -> Dict:
+        lat_lo, lat_hi = sorted((lat1, lat2))
+        lng_lo, lng_hi = sorted((lng1, lng2))
+        inside = np.flatnonzero(
+            (self.lat >= lat_lo) & (self.lat <= lat_hi) & (self.lng >= lng_lo) & (self.lng <= lng_hi)
+        )
+        return {
+            "status": "ok",
+            "data": [
+                {
+                    "lat": float(self.lat[i]),
+                    "lon": float(self.lng[i]),
+                    "uid": self.uids[i],
+                    "aqi": str(self.reading(i)),
+                    "station": {"name": f"Synthetic Monitor {i}, Delhi", "time": time.strftime("%Y-%m-%dT%H:00:00+05:30")},
+                }
+                for i in inside.tolist()
+            ],
+        }
+
+
+def cassette_key(path: str, params: Dict[str, str]) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(params.items()) if k not in SECRET_PARAMS)
+    return f"{path}?{query}"
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    world = SyntheticWorld(args.monitors, args.seed)
+    bucket = TokenBucket(args.rate_limit) if args.rate_limit > 0 else None
+    rng = random.Random(args.seed)
+    stats: Counter = Counter()
+    cassette: Dict[str, Dict] = {}
+    if args.mode == "replay" or (args.mode == "record" and args.cassette.exists()):
+        cassette = json.loads(args.cassette.read_text())
+        LOGGER.info("Loaded %d cassette entries from %s", len(cassette), args.cassette)
+    proxy: Optional[httpx.AsyncClient] = None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        nonlocal proxy
+        if args.mode == "record":
+            proxy = httpx.AsyncClient(timeout=30.0)
+        yield
+        if proxy is not None:
+            await proxy.aclose()
+        if args.mode == "record":
+            args.cassette.write_text(json.dumps(cassette, indent=1, sort_keys=True))
+            LOGGER.info("Saved %d cassette entries to %s", len(cassette), args.cassette)
+
+    app = FastAPI(title="Fake WAQI/OpenWeather upstream", lifespan=lifespan)
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if request.url.path == "/__stats":
+            return await call_next(request)
+        stats["requests"] += 1
+        if args.latency_ms > 0:
+            # Log-normal delays give the long tail real upstreams have
+            await asyncio.sleep(args.latency_ms / 1000.0 * rng.lognormvariate(0.0, args.latency_sigma))
+        if bucket is not None and not bucket.take():
+            stats["rate_limited"] += 1
+            return JSONResponse({"status": "error", "data": "Over quota"}, status_code=429, headers={"Retry-After": "1"})
+        if rng.random() < args.error_rate:
+            stats["injected_errors"] += 1
+            return JSONResponse({"status": "error", "data": "Injected failure"}, status_code=500)
+        return await call_next(request)
+
+    async def serve(request: Request, upstream: str, fake: Tuple[int, Dict]) -> Response:
+        key = cassette_key(request.url.path, dict(request.query_params))
+        if args.mode == "fake":
+            status, body = fake
+            return JSONResponse(body, status_code=status)
+        if args.mode == "replay":
+            entry = cassette.get(key)
+            if entry is None:
+                stats["cassette_misses"] += 1
+                return JSONResponse({"status": "error", "data": f"Not in cassette: {key}"}, status_code=404)
+            return Response(entry["body"], status_code=entry["status"], media_type=entry["content_type"])
+
+        response = await proxy.get(upstream + request.url.path, params=dict(request.query_params))
+        cassette[key] = {
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "body": response.text,
+        }
+        stats["recorded"] += 1
+        return Response(response.content, status_code=response.status_code, media_type=cassette[key]["content_type"])
+
+    @app.get("/feed/{target}/")
+    async def waqi_feed(target: str, request: Request):
+        stats["waqi_feed"] += 1
+        fake = (200, {"status": "error", "data": "Unknown station"})
+        if target.startswith("geo:"):
+            lat, _, lng = target[4:].partition(";")
+            fake = (200, world.feed(world.nearest(float(lat), float(lng))))
+        elif target.startswith("@") and target[1:].isdigit() and int(target[1:]) in world.uids:
+            fake = (200, world.feed(world.uids.index(int(target[1:]))))
+        return await serve(request, args.waqi_upstream, fake)
+
+    @app.get("/map/bounds/")
+    async def waqi_bounds(request: Request, latlng: str = ",".join(map(str, DELHI_BOUNDS))):
+        stats["waqi_bounds"] += 1
+        lat1, lng1, lat2, lng2 = (float(v) for v in latlng.split(","))
+        return await serve(request, args.waqi_upstream, (200, world.bounds(lat1, lng1, lat2, lng2)))
+
+    @app.get("/data/2.5/weather")
+    async def weather(request: Request, q: str = "Delhi"):
+        stats["openweather_weather"] += 1
+        body = {
+            "coord": {"lon": 77.2167, "lat": 28.6667},
+            "weather": [{"id": 721, "main": "Haze", "description": "haze"}],
+            "main": {"temp": 31.0, "feels_like": 33.2, "temp_min": 29.0, "temp_max": 33.0, "humidity": 48},
+            "wind": {"speed": 3.1, "deg": 290},
+            "name": q,
+            "cod": 200,
+        }
+        return await serve(request, args.openweather_upstream, (200, body))
+
+    @app.get("/data/2.5/air_pollution")
+    async def air_pollution(request: Request, lat: float = 28.6667, lon: float = 77.2167):
+        stats["openweather_air_pollution"] += 1
+        i = world.nearest(lat, lon)
+        body = {
+            "coord": {"lon": lon, "lat": lat},
+            "list": [{"main": {"aqi": int(min(5, 1 + world.aqi[i] // 75))}, "components": {"pm2_5": float(world.aqi[i]) * 0.6}}],
+        }
+        return await serve(request, args.openweather_upstream, (200, body))
+
+    @app.get("/__stats")
+    async def get_stats():
+        return dict(stats)
+
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--mode", choices=("fake", "record", "replay"), default="fake")
+    parser.add_argument("--cassette", type=Path, default=Path(__file__).resolve().parent / "cassette.json")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="median added latency per request")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread of the added latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests per second before HTTP 429; 0 = unlimited")
+    parser.add_argument("--monitors", type=int, default=40, help="synthetic WAQI monitors in fake mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--waqi-upstream", default=WAQI_UPSTREAM, help="real WAQI API used in record mode")
+    parser.add_argument("--openweather-upstream", default=OPENWEATHER_UPSTREAM, help="real OpenWeatherMap API used in record mode")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    import uvicorn
+
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Async load generator for the safety prediction API.
+
+Replays a weighted mix of ``/aqi``, ``/predict-single`` and ``/predict-all``
+requests against a running server and reports p50/p95/p99 latency, error
+counts and throughput per endpoint. Run the server against
+``benchmarks/fake_upstream.py`` so no production quota is used.
+
+Traffic is either closed-loop (``--concurrency`` workers, each sending its
+next request as soon as the previous one finishes) or open-loop
+(``--rate`` requests per second regardless of how fast the server answers,
+which exposes queueing that closed-loop tests hide).
+
+Usage (from backend/fastapibackend):
+    python benchmarks/fake_upstream.py --latency-ms 80 &
+    WAQI_API_URL=http://127.0.0.1:9000 \\
+    WEATHER_URL=http://127.0.0.1:9000/data/2.5/weather \\
+    AIR_POLLUTION_URL=http://127.0.0.1:9000/data/2.5/air_pollution \\
+    OPENWEATHER_API_KEY=fake uvicorn app.main:app --port 8000 &
+    python benchmarks/load_generator.py --duration 30 --concurrency 32
+    python benchmarks/load_generator.py --rate 200 --mix aqi=1,predict-single=8,predict-all=1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+# Add the FastAPI app to the path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.constants import DELHI_POLICE_STATIONS
+
+DEFAULT_MIX = "aqi=2,predict-single=6,predict-all=2"
+GENDERS = ("male", "female", "other")
+FAMILIES = ("with_family", "alone")
+
+RequestSpec = Tuple[str, str, Optional[Dict]]
+
+
+def _predict_single(rng: random.Random) -> RequestSpec:
+    body = {
+        "police_station": rng.choice(DELHI_POLICE_STATIONS),
+        "gender": rng.choice(GENDERS),
+        "family": rng.choice(FAMILIES),
+        "month": rng.randint(1, 12),
+        "day": rng.randint(1, 28),
+    }
+    return "POST", "/predict-single", body
+
+
+def _predict_all(rng: random.Random) -> RequestSpec:
+    body = {
+        "gender": rng.choice(GENDERS),
+        "family": rng.choice(FAMILIES),
+        "month": rng.randint(1, 12),
+        "day": rng.randint(1, 28),
+    }
+    return "POST", "/predict-all", body
+
+
+SCENARIOS: Dict[str, Callable[[random.Random], RequestSpec]] = {
+    "aqi": lambda rng: ("GET", "/aqi", None),
+    "aqi-station": lambda rng: ("GET", f"/aqi/station/{rng.choice(DELHI_POLICE_STATIONS)}", None),
+    "predict-single": _predict_single,
+    "predict-all": _predict_all,
+}
+
+
+def parse_mix(mix: str) -> Tuple[List[str], List[float]]:
+    names, weights = [], []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'; choose from {', '.join(SCENARIOS)}")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+class Recorder:
+    """Collect latency samples and status codes per scenario."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, seconds: float, status: str) -> None:
+        self.latencies[name].append(seconds)
+        self.statuses[name][status] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict]:
+        report = {}
+        names = sorted(self.latencies)
+        all_latencies = [value for name in names for value in self.latencies[name]]
+        for name, latencies in [(name, self.latencies[name]) for name in names] + [("total", all_latencies)]:
+            if not latencies:
+                continue
+            ms = np.asarray(latencies) * 1000.0
+            statuses = (
+                self.statuses[name] if name != "total"
+                else {s: sum(self.statuses[n].get(s, 0) for n in names) for s in {s for n in names for s in self.statuses[n]}}
+            )
+            report[name] = {
+                "requests": len(latencies),
+                "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+                "statuses": dict(sorted(statuses.items())),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "mean_ms": round(float(ms.mean()), 2),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "p99_ms": round(float(np.percentile(ms, 99)), 2),
+                "max_ms": round(float(ms.max()), 2),
+            }
+        return report
+
+
+async def send(client: httpx.AsyncClient, recorder: Recorder, name: str, spec: RequestSpec) -> None:
+    method, path, body = spec
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, path, json=body)
+        status = str(response.status_code)
+    except httpx.HTTPError as exc:
+        status = type(exc).__name__
+    recorder.record(name, time.perf_counter() - started, status)
+
+
+async def closed_loop(client, recorder, names, weights, rng, duration: float, concurrency: int) -> None:
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            await send(client, recorder, name, SCENARIOS[name](rng))
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+
+async def open_loop(client, recorder, names, weights, rng, duration: float, rate: float) -> None:
+    # Poisson arrivals at the target rate, independent of response times
+    pending = set()
+    deadline = time.perf_counter() + duration
+    next_at = time.perf_counter()
+    while next_at < deadline:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = rng.choices(names, weights)[0]
+        task = asyncio.create_task(send(client, recorder, name, SCENARIOS[name](rng)))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        next_at += rng.expovariate(rate)
+    if pending:
+        await asyncio.gather(*pending)
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    names, weights = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=max(args.concurrency, 100))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.warmup > 0:
+            await closed_loop(client, Recorder(), names, weights, rng, args.warmup, args.concurrency)
+
+        started = time.perf_counter()
+        if args.rate > 0:
+            await open_loop(client, recorder, names, weights, rng, args.duration, args.rate)
+        else:
+            await closed_loop(client, recorder, names, weights, rng, args.duration, args.concurrency)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "config": {
+            "base_url": args.base_url,
+            "mix": args.mix,
+            "mode": f"open-loop {args.rate} rps" if args.rate > 0 else f"closed-loop x{args.concurrency}",
+            "duration_s": round(elapsed, 2),
+        },
+        "results": recorder.summary(elapsed),
+    }
+
+
+def print_report(report: Dict) -> None:
+    config = report["config"]
+    print(f"\n{config['mode']} against {config['base_url']} for {config['duration_s']}s (mix {config['mix']})\n")
+    header = f"{'scenario':<16}{'reqs':>8}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, row in report["results"].items():
+        print(
+            f"{name:<16}{row['requests']:>8}{row['errors']:>8}{row['throughput_rps']:>9.1f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted scenarios from {', '.join(SCENARIOS)}")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unmeasured load first")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed-loop workers")
+    parser.add_argument("--rate", type=float, default=0.0, help="open-loop requests per second (overrides --concurrency)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Unit tests for the per-station AQI history and its sorted rolling windows."""
+
+import asyncio
+
+import httpx
+import numpy as np
+import pytest
+
+from app.services import aqi_history, aqi_snapshot, snapshot_store
+from app.services.aqi_history import AQIHistory
+from app.services.snapshot_store import SnapshotStore
+from app.services.waqi_service import fetch_aqi_from_waqi
+
+
+def _append(history: AQIHistory, *readings, station: str = "saket") -> None:
+    for timestamp, aqi in enumerate(readings):
+        entry = {"aqi": 150.0, "error": "fallback"} if aqi is None else {"aqi": aqi}
+        history.append({station: entry}, float(timestamp))
+
+
+def _window(history: AQIHistory, size: int, station: str = "saket") -> list:
+    rolling = history.windows[size]
+    row = history.stations.index(station)
+    return rolling.sorted[row, :rolling.counts[row]].tolist()
+
+
+def test_insert_keeps_the_window_sorted():
+    history = AQIHistory(["saket"], capacity=8, windows=[5])
+    _append(history, 120.0, 80.0, 200.0, 80.0, 150.0)
+    assert _window(history, 5) == [80.0, 80.0, 120.0, 150.0, 200.0]
+    assert np.isinf(history.windows[5].sorted[0, 5:]).all()
+
+
+def test_oldest_reading_is_evicted_first():
+    history = AQIHistory(["saket"], capacity=8, windows=[3])
+    _append(history, 50.0, 10.0, 30.0, 20.0)
+    assert _window(history, 3) == [10.0, 20.0, 30.0]
+    _append(history, 40.0)
+    assert _window(history, 3) == [20.0, 30.0, 40.0]
+
+
+def test_evicting_a_duplicate_removes_one_copy():
+    history = AQIHistory(["saket"], capacity=8, windows=[3])
+    _append(history, 70.0, 70.0, 90.0, 10.0)
+    assert _window(history, 3) == [10.0, 70.0, 90.0]
+
+
+def test_odd_and_even_medians():
+    history = AQIHistory(["saket"], capacity=8, windows=[4])
+    _append(history, 40.0)
+    assert history.stat("saket", "median", 4) == 40.0
+    _append(history, 10.0)
+    assert history.stat("saket", "median", 4) == 25.0
+    _append(history, 30.0)
+    assert history.stat("saket", "median", 4) == 30.0
+    _append(history, 20.0)
+    assert history.stat("saket", "median", 4) == 25.0
+    assert history.stat("saket", "min", 4) == 10.0
+    assert history.stat("saket", "max", 4) == 40.0
+    assert history.stat("saket", "mean", 4) == 25.0
+
+
+def test_missing_readings_are_left_out():
+    history = AQIHistory(["saket", "rohini"], capacity=8, windows=[3])
+    _append(history, 100.0, None, 300.0)
+    assert _window(history, 3) == [100.0, 300.0]
+    assert history.stat("saket", "median", 3) == 200.0
+    # A NaN leaving the window must not remove a real reading
+    _append(history, 200.0)
+    assert _window(history, 3) == [200.0, 300.0]
+    _append(history, 400.0)
+    assert _window(history, 3) == [200.0, 300.0, 400.0]
+    assert history.stat("rohini", "median", 3) is None
+
+
+def test_stale_readings_are_left_out():
+    history = AQIHistory(["saket"], capacity=4, windows=[4])
+    history.append({"saket": {"aqi": 90.0, "stale_seconds": 300.0}}, 0.0)
+    assert history.stat("saket", "median", 4) is None
+
+
+def test_placeholder_readings_are_left_out():
+    history = AQIHistory(["saket"], capacity=4, windows=[4])
+    history.append({"saket": {"aqi": 150.0, "no_reading": True}}, 0.0)
+    assert np.isnan(history.values[0, 0])
+    assert history.stat("saket", "median", 4) is None
+
+
+def test_window_sizes_are_clamped_to_capacity():
+    history = AQIHistory(["saket"], capacity=5, windows=[3, 12, 0])
+    assert list(history.windows) == [1, 3, 5]
+    _append(history, *[float(value) for value in range(1, 8)])
+    assert _window(history, 5) == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert history.stat("saket", "median", 12) is None
+
+
+@pytest.mark.parametrize("capacity,windows", [(6, [1, 2, 5, 6]), (10, [3, 4, 10])])
+def test_windows_match_a_full_recompute(capacity, windows):
+    rng = np.random.default_rng(0)
+    stations = ["a", "b", "c"]
+    history = AQIHistory(stations, capacity=capacity, windows=windows)
+    readings = np.round(rng.uniform(20, 400, size=(40, len(stations))))
+    readings[rng.random(readings.shape) < 0.2] = np.nan
+    for step, column in enumerate(readings):
+        history.append(
+            {station: {"aqi": value} for station, value in zip(stations, column.tolist()) if not np.isnan(value)},
+            float(step),
+        )
+        for size in windows:
+            recent = readings[max(0, step + 1 - size):step + 1]
+            for row, station in enumerate(stations):
+                values = recent[:, row][~np.isnan(recent[:, row])]
+                expected = float(np.median(values)) if values.size else None
+                assert history.stat(station, "median", size) == expected
+
+
+def test_series_lists_observations_oldest_first():
+    history = AQIHistory(["saket"], capacity=3, windows=[3])
+    _append(history, 10.0, 20.0, None, 40.0)
+    series = history.series("Saket")
+    assert [obs["aqi"] for obs in series["observations"]] == [20.0, None, 40.0]
+    assert series["windows"]["3"]["readings"] == 2
+    assert [obs["aqi"] for obs in history.series("saket", limit=1)["observations"]] == [40.0]
+
+
+def test_rolling_median_defaults_before_readings(monkeypatch):
+    monkeypatch.setattr(aqi_history, "_HISTORY", None)
+    assert aqi_history.rolling_aqi_median("saket", 3, 4.0) == 4.0
+    aqi_history.init_aqi_history(["saket"], capacity=4, windows=[3])
+    assert aqi_history.rolling_aqi_median("saket", 3, 4.0) == 4.0
+    _append(aqi_history.get_aqi_history(), 120.0)
+    assert aqi_history.rolling_aqi_median("Saket", 3, 4.0) == 120.0
+
+
+def test_restored_snapshot_seeds_the_history(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path / "snapshot.sqlite3"))
+    stations = {
+        "saket": {"aqi": 180.0},
+        "rohini": {"aqi": 150.0, "error": "fallback"},
+        "dwarka": {"aqi": 95.0, "stale_seconds": 600.0},
+    }
+    store.save_aqi(7, "stations", 1700000000.0, stations)
+    assert store.load_aqi() == (7, 1700000000.0, stations)
+
+    monkeypatch.setattr(snapshot_store, "_STORE", store)
+    monkeypatch.setattr(aqi_snapshot, "_SNAPSHOT", None)
+    monkeypatch.setattr(aqi_history, "_HISTORY", None)
+    history = aqi_history.init_aqi_history(list(stations), capacity=4, windows=[2])
+    aqi_snapshot._restore_snapshot()
+    snapshot = aqi_snapshot.get_aqi_snapshot()
+    assert snapshot.restored and snapshot.version == 7
+    aqi_snapshot._record_history(snapshot)
+
+    assert len(history) == 1
+    assert history.stat("saket", "median", 2) == 180.0
+    assert history.stat("rohini", "median", 2) is None
+    assert history.stat("dwarka", "median", 2) is None
+    history.append({"saket": {"aqi": 200.0}}, 1700000300.0)
+    assert history.stat("saket", "median", 2) == 190.0
+
+
+def test_feed_without_a_value_is_stored_as_nan():
+    feeds = {"-": {"aqi": "-", "idx": 1}, "n/a": {"aqi": "n/a", "idx": 2}, "ok": {"aqi": 160, "idx": 3}}
+
+    async def fetch(value: str) -> dict:
+        def handler(request):
+            return httpx.Response(200, json={"status": "ok", "data": feeds[value]})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fetch_aqi_from_waqi("token", stations=["saket"], client=client, max_retries=0)
+
+    history = AQIHistory(["saket"], capacity=4, windows=[4])
+    for timestamp, value in enumerate(("ok", "-", "n/a")):
+        stations = asyncio.run(fetch(value))
+        assert stations["saket"].get("no_reading", False) == (value != "ok")
+        history.append(stations, float(timestamp))
+
+    assert np.isnan(history.values[0, 1:3]).all()
+    assert history.stat("saket", "median", 4) == 160.0
+    assert history.stat("saket", "min", 4) == 160.0
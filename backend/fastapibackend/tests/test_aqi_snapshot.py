@@ -0,0 +1,51 @@
+"""Unit tests for the AQI snapshot refresher's failure backoff."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import aqi_snapshot
+from app.services.aqi_snapshot import AQISnapshot, _refresh_delay
+
+
+def test_healthy_refreshes_use_the_interval():
+    assert _refresh_delay(300.0, 0, 3600.0) == 300.0
+
+
+@pytest.mark.parametrize("failures,upper", [(1, 600.0), (2, 1200.0), (3, 2400.0), (4, 3600.0), (50, 3600.0)])
+def test_failures_back_off_exponentially_up_to_the_cap(failures, upper):
+    delays = [_refresh_delay(300.0, failures, 3600.0) for _ in range(200)]
+    assert all(upper / 2 <= delay <= upper for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_cap_below_the_interval_keeps_the_interval():
+    assert 150.0 <= _refresh_delay(300.0, 3, 60.0) <= 300.0
+
+
+def test_refresh_loop_backs_off_until_fresh_readings_return(monkeypatch):
+    fallback = {"saket": {"aqi": 150.0, "error": "HTTP 503"}}
+    fresh = {"saket": {"aqi": 120.0}}
+    outcomes = [RuntimeError("down"), fallback, fallback, fresh, fallback]
+    sleeps = []
+
+    async def refresh(settings):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return AQISnapshot(version=1, stations=outcome, fetched_at=0.0)
+
+    async def sleep(delay):
+        sleeps.append(delay)
+        if not outcomes:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(aqi_snapshot, "refresh_aqi_snapshot", refresh)
+    monkeypatch.setattr(aqi_snapshot.asyncio, "sleep", sleep)
+    monkeypatch.setattr(aqi_snapshot.random, "uniform", lambda low, high: high)
+    settings = SimpleNamespace(aqi_refresh_interval=10.0, aqi_refresh_max_backoff=35.0)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(aqi_snapshot._refresh_loop(settings))
+    assert sleeps == [20.0, 35.0, 35.0, 10.0, 20.0]
@@ -0,0 +1,75 @@
+"""Unit tests for choosing the array tree engine cutoff at model load."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import config, models, tree_engine
+
+
+class FakeModel:
+    booster = object()
+
+    def __init__(self):
+        self.max_batch = None
+
+    def set_array_engine(self, engine, max_batch):
+        self.max_batch = max_batch
+
+
+@pytest.fixture
+def benchmarks(monkeypatch, tmp_path):
+    runs = []
+    cutoffs = iter([32, 16, 64])
+
+    def benchmark(*args, **kwargs):
+        runs.append(args)
+        return {}
+
+    settings = SimpleNamespace(
+        inference_engine="auto",
+        array_engine_max_batch=0,
+        array_engine_cutoff_path=str(tmp_path / "cutoffs.json"),
+    )
+    monkeypatch.setattr(config, "get_settings", lambda: settings)
+    monkeypatch.setattr(tree_engine, "build_array_engine", lambda booster: object())
+    monkeypatch.setattr(tree_engine, "verification_grid", lambda engine, n: [[0.0]])
+    monkeypatch.setattr(tree_engine, "benchmark_engines", benchmark)
+    monkeypatch.setattr(tree_engine, "array_engine_cutoff", lambda results: next(cutoffs))
+    monkeypatch.setattr(models, "_ENGINE_CUTOFFS", None)
+    return SimpleNamespace(runs=runs, settings=settings)
+
+
+def test_cutoff_is_benchmarked_once_per_version(benchmarks):
+    first, reload, other = FakeModel(), FakeModel(), FakeModel()
+
+    models._attach_array_engine(first, "v1")
+    models._attach_array_engine(reload, "v1")
+    models._attach_array_engine(other, "v2")
+
+    assert len(benchmarks.runs) == 2
+    assert (first.max_batch, reload.max_batch, other.max_batch) == (32, 32, 16)
+
+
+def test_cached_cutoff_survives_restart(benchmarks, monkeypatch):
+    models._attach_array_engine(FakeModel(), "v1")
+    path = benchmarks.settings.array_engine_cutoff_path
+    assert json.loads(open(path).read()) == {"v1": 32}
+
+    monkeypatch.setattr(models, "_ENGINE_CUTOFFS", None)
+    model = FakeModel()
+    models._attach_array_engine(model, "v1")
+
+    assert len(benchmarks.runs) == 1
+    assert model.max_batch == 32
+
+
+def test_configured_cutoff_skips_benchmark(benchmarks):
+    benchmarks.settings.array_engine_max_batch = 8
+    model = FakeModel()
+
+    models._attach_array_engine(model, "v1")
+
+    assert benchmarks.runs == []
+    assert model.max_batch == 8
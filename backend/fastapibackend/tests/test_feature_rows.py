@@ -0,0 +1,40 @@
+"""Unit tests for the model feature rows built by the prediction routes."""
+
+import pytest
+
+from app.routes import prediction
+from app.schemas.prediction import LocationRequest, PredictAllRequest
+from app.services import aqi_history
+
+
+@pytest.fixture
+def history(monkeypatch):
+    monkeypatch.setattr(aqi_history, "_HISTORY", None)
+    history = aqi_history.init_aqi_history(["saket"], capacity=4, windows=[4])
+    for timestamp, aqi in enumerate((180.0, 220.0, 200.0)):
+        history.append({"saket": {"aqi": aqi}}, float(timestamp))
+    return history
+
+
+def _bundle(aqi: float) -> dict:
+    weather = {"main": {"temp": 30.0, "temp_max": 32.0, "temp_min": 28.0, "humidity": 50.0}, "wind": {"speed": 3.0}}
+    return {"weather": weather, "aqi": aqi}
+
+
+def test_predict_rows_keep_the_openweather_index(history):
+    location = LocationRequest(
+        city="Delhi", police_station="saket", gender="female", family="alone", month=7, day=15, year=2024
+    )
+    row = prediction._extract_feature_row(location, _bundle(3))
+    # OpenWeather's 1-5 index for both; the WAQI-scale history is not mixed in
+    assert row["aqi"] == 3
+    assert row["aqi_median"] == 3
+
+
+def test_station_rows_use_the_waqi_rolling_median(history):
+    request = PredictAllRequest(month=7, day=15)
+    weather_features = prediction.extract_weather_features(_bundle(3)["weather"], 150.0)
+    row = prediction._station_feature_row(request, "Saket", 150.0, weather_features, 4)
+    assert row["aqi"] == 150.0
+    assert row["aqi_median"] == 200.0
+    assert prediction._station_feature_row(request, "Saket", 150.0, weather_features, None)["aqi_median"] == 150.0
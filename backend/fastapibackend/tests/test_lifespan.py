@@ -0,0 +1,66 @@
+"""Unit tests for app startup and shutdown ordering."""
+
+import asyncio
+
+import pytest
+
+from app import main
+
+COMPONENTS = [
+    ("init_http_clients", "close_http_clients"),
+    ("start_aqi_refresher", "stop_aqi_refresher"),
+    ("start_inference_executor", "stop_inference_executor"),
+    ("start_inference_batcher", "stop_inference_batcher"),
+    ("start_artifact_watcher", "stop_artifact_watcher"),
+    ("start_loop_lag_monitor", "stop_loop_lag_monitor"),
+]
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def recorder(name, is_async):
+        async def record_async(*args, **kwargs):
+            calls.append(name)
+
+        def record(*args, **kwargs):
+            calls.append(name)
+
+        return record_async if is_async else record
+
+    for start, stop in COMPONENTS:
+        monkeypatch.setattr(main, start, recorder(start, False))
+        monkeypatch.setattr(main, stop, recorder(stop, stop != "stop_inference_executor"))
+    for name in ("restore_weather_cache", "build_station_index", "load_model_artifacts"):
+        monkeypatch.setattr(main, name, recorder(name, False))
+    monkeypatch.setattr(main, "run_inference", recorder("warm_up", True))
+    return calls
+
+
+def _stops(calls):
+    return [name for name in calls if name.startswith(("stop_", "close_"))]
+
+
+def test_shutdown_runs_in_reverse_startup_order(calls):
+    async def scenario():
+        async with main.lifespan(main.app):
+            assert not _stops(calls)
+
+    asyncio.run(scenario())
+    assert _stops(calls) == [stop for _, stop in reversed(COMPONENTS)]
+
+
+def test_failed_startup_stops_what_already_started(calls, monkeypatch):
+    def fail():
+        raise RuntimeError("artifacts missing")
+
+    monkeypatch.setattr(main, "load_model_artifacts", fail)
+
+    async def scenario():
+        async with main.lifespan(main.app):
+            pass
+
+    with pytest.raises(RuntimeError, match="artifacts missing"):
+        asyncio.run(scenario())
+    assert _stops(calls) == ["stop_aqi_refresher", "close_http_clients"]
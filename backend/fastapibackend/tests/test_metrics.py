@@ -0,0 +1,41 @@
+"""Unit tests for the cache metrics exposition."""
+
+from app.cache import StaleCache, TTLCache
+from app.metrics import CACHE_HIT_RATIO, CACHE_LOOKUPS, register_cache
+
+
+def _samples(metric, cache_name: str) -> dict:
+    prefix = f'{metric.name}{{cache="{cache_name}"'
+    return {
+        line[len(prefix):line.rindex(" ")]: float(line.rsplit(" ", 1)[1])
+        for line in metric.collect()
+        if line.startswith(prefix)
+    }
+
+
+def test_cache_lookups_are_a_counter():
+    assert CACHE_LOOKUPS.name == "sentry_cache_lookups_total"
+    assert "# TYPE sentry_cache_lookups_total counter" in CACHE_LOOKUPS.collect()
+
+
+def test_register_cache_reads_counts_at_scrape_time():
+    cache = TTLCache(ttl=60.0)
+    register_cache("test_ttl", cache)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    assert _samples(CACHE_LOOKUPS, "test_ttl") == {',result="hit"}': 2.0, ',result="miss"}': 1.0}
+    assert _samples(CACHE_HIT_RATIO, "test_ttl") == {"}": 2 / 3}
+
+
+def test_stale_hits_are_exported_and_count_as_hits():
+    cache = StaleCache(ttl=0.0, max_stale=60.0)
+    register_cache("test_stale", cache)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    lookups = _samples(CACHE_LOOKUPS, "test_stale")
+    assert lookups[',result="stale"}'] == 1.0
+    assert lookups[',result="miss"}'] == 1.0
+    assert _samples(CACHE_HIT_RATIO, "test_stale") == {"}": 0.5}
@@ -0,0 +1,42 @@
+"""Unit tests for the booster wrapper's thread configuration."""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from app import config, models
+from app.model_wrapper import XGBWrapper
+from app.services import inference_executor
+
+
+class FakeBooster:
+    def __init__(self):
+        self.params = []
+
+    def set_param(self, params):
+        self.params.append(params)
+
+    def inplace_predict(self, X):
+        return np.tile([0.25, 0.75], (len(X), 1))
+
+
+def test_prediction_leaves_booster_params_alone():
+    booster = FakeBooster()
+    model = XGBWrapper(booster, [0, 1])
+
+    labels, probs = model.predict_with_proba(np.zeros((3, 2), dtype=np.float32))
+
+    assert booster.params == []
+    assert labels.tolist() == [1, 1, 1]
+    assert probs.shape == (3, 2)
+
+
+def test_booster_threads_are_set_once_at_load(monkeypatch):
+    settings = SimpleNamespace(inference_workers=2, inference_nthread=0)
+    monkeypatch.setattr(config, "get_settings", lambda: settings)
+    monkeypatch.setattr(inference_executor, "available_cpus", lambda: 8)
+    booster = FakeBooster()
+
+    models._set_booster_threads(XGBWrapper(booster, [0, 1]))
+
+    assert booster.params == [{"nthread": 4}]
@@ -0,0 +1,52 @@
+"""Unit tests for the nearest-station indexes."""
+
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from app.services import prediction_service, station_index
+from app.services.waqi_service import POLICE_STATION_COORDINATES
+
+UNKNOWN = ["jaitpur", "kotwali"]
+
+
+def _preprocessor(stations):
+    frame = pd.DataFrame({"police_station": stations, "gender": "female", "month": 1})
+    encoder = Pipeline([
+        ("imputer", SimpleImputer(strategy="constant", fill_value="missing")),
+        ("encoder", OneHotEncoder(handle_unknown="ignore", sparse_output=False)),
+    ])
+    return ColumnTransformer([("num", "passthrough", ["month"]), ("cat", encoder, ["police_station", "gender"])]).fit(frame)
+
+
+@pytest.fixture
+def preprocessor():
+    return _preprocessor([name for name in POLICE_STATION_COORDINATES if name not in UNKNOWN])
+
+
+@pytest.mark.parametrize("compiled", [True, False])
+def test_model_index_leaves_out_unknown_stations(preprocessor, monkeypatch, compiled):
+    if not compiled:
+        monkeypatch.setattr(prediction_service, "get_feature_encoder", lambda preprocessor: None)
+    index = station_index.get_model_station_index(preprocessor)
+    assert set(index.names) == set(POLICE_STATION_COORDINATES) - set(UNKNOWN)
+
+    lng, lat = POLICE_STATION_COORDINATES["jaitpur"]
+    indices, distances = index.query([lat], [lng])
+    assert index.names[indices[0, 0]] not in UNKNOWN
+    assert distances[0, 0] > 0
+
+
+def test_model_index_is_cached_per_preprocessor(preprocessor):
+    index = station_index.get_model_station_index(preprocessor)
+    assert station_index.get_model_station_index(preprocessor) is index
+    other = station_index.get_model_station_index(_preprocessor(list(POLICE_STATION_COORDINATES)))
+    assert other is not index
+    assert len(other) == len(POLICE_STATION_COORDINATES)
+
+
+def test_full_index_keeps_every_station():
+    assert len(station_index.get_station_index()) == len(POLICE_STATION_COORDINATES)
@@ -0,0 +1,281 @@
+"""Unit tests for the upstream limiter, circuit breaker and retry budget."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.upstream import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    AdaptiveLimiter,
+    CircuitBreaker,
+    RetryBudget,
+    Upstream,
+    UpstreamUnavailable,
+)
+
+
+def _breaker(reset_timeout: float = 0.0) -> CircuitBreaker:
+    return CircuitBreaker(failure_ratio=0.5, min_calls=4, window=10, reset_timeout=reset_timeout)
+
+
+def _trip(breaker: CircuitBreaker) -> None:
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record(False)
+
+
+def _upstream(breaker: CircuitBreaker, limit: int = 1) -> Upstream:
+    return Upstream(
+        "test",
+        limiter=AdaptiveLimiter(initial=limit, min_limit=limit, max_limit=limit, enabled=False),
+        breaker=breaker,
+        budget=RetryBudget(ratio=0.0, minimum=0.0),
+        hedge_enabled=False,
+    )
+
+
+# Circuit breaker
+
+
+def test_breaker_opens_at_failure_ratio():
+    breaker = _breaker(reset_timeout=60.0)
+    for ok in (True, False, True):
+        breaker.allow()
+        breaker.record(ok)
+    assert breaker.state == CLOSED  # below min_calls
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_stays_closed_below_failure_ratio():
+    breaker = _breaker()
+    for ok in (True, True, True, False, True, False):
+        breaker.record(ok)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = _breaker()
+    _trip(breaker)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes_the_circuit():
+    breaker = _breaker()
+    _trip(breaker)
+    breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = _breaker(reset_timeout=60.0)
+    _trip(breaker)
+    breaker._opened_at -= 60.0
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_abandoned_probe_frees_the_slot():
+    breaker = _breaker()
+    _trip(breaker)
+    assert breaker.allow()
+    breaker.abandon()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_probe_cancelled_waiting_for_a_slot_is_abandoned():
+    async def scenario():
+        breaker = _breaker()
+        _trip(breaker)
+        upstream = _upstream(breaker)
+        assert upstream.limiter.try_acquire()  # hold the only slot
+        async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200))) as client:
+            probe = asyncio.ensure_future(upstream.get(client, "http://upstream.test/", max_retries=0))
+            await asyncio.sleep(0)
+            assert breaker.state == HALF_OPEN and breaker._probing
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+        assert not breaker._probing
+        assert upstream.limiter.in_flight == 1
+        assert breaker.allow()
+
+    asyncio.run(scenario())
+
+
+def test_probe_through_upstream_closes_or_reopens():
+    async def scenario(status: int) -> str:
+        breaker = _breaker()
+        _trip(breaker)
+        upstream = _upstream(breaker)
+        transport = httpx.MockTransport(lambda request: httpx.Response(status))
+        async with httpx.AsyncClient(transport=transport) as client:
+            try:
+                await upstream.get(client, "http://upstream.test/", max_retries=0)
+            except UpstreamUnavailable:
+                pass
+        assert upstream.limiter.in_flight == 0
+        return breaker.state
+
+    assert asyncio.run(scenario(200)) == CLOSED
+    assert asyncio.run(scenario(503)) == OPEN
+
+
+# Adaptive limiter
+
+
+def test_limiter_grows_additively_on_healthy_calls():
+    limiter = AdaptiveLimiter(initial=4, min_limit=1, max_limit=10)
+    limiter.in_flight = 1
+    limiter.release(0.1, True)
+    assert limiter.limit == pytest.approx(4.25)
+
+
+def test_limiter_is_capped_at_max_limit():
+    limiter = AdaptiveLimiter(initial=10, min_limit=1, max_limit=10)
+    limiter.in_flight = 1
+    limiter.release(0.1, True)
+    assert limiter.limit == 10
+
+
+def test_limiter_halves_once_per_round_trip_on_failures():
+    limiter = AdaptiveLimiter(initial=8, min_limit=1, max_limit=10)
+    limiter.in_flight = 2
+    limiter.release(0.1, False)
+    assert limiter.limit == 4
+    # This call started before the decrease, so it already saw the old limit
+    limiter.release(60.0, False)
+    assert limiter.limit == 4
+
+
+def test_limiter_does_not_drop_below_min_limit():
+    limiter = AdaptiveLimiter(initial=2, min_limit=2, max_limit=10)
+    limiter.in_flight = 1
+    limiter.release(0.1, False)
+    assert limiter.limit == 2
+
+
+def test_limiter_tolerates_a_slow_tail():
+    limiter = AdaptiveLimiter(initial=4, min_limit=1, max_limit=10, latency_tolerance=2.0)
+    limiter.in_flight = 2
+    limiter.release(0.1, True)
+    before = limiter.limit
+    limiter.release(1.0, True)
+    assert limiter.limit > before
+
+
+def test_disabled_limiter_stays_at_max_limit():
+    limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=10, enabled=False)
+    assert limiter.limit == 10
+    limiter.in_flight = 1
+    limiter.release(0.1, False)
+    assert limiter.limit == 10
+
+
+def test_abandoned_call_frees_its_slot_without_changing_the_limit():
+    limiter = AdaptiveLimiter(initial=4, min_limit=1, max_limit=10)
+    limiter.in_flight = 4
+    limiter.release(0.1, None)
+    assert limiter.limit == 4
+    assert limiter.in_flight == 3
+
+
+def test_cancelled_attempts_leave_the_limit_unchanged():
+    async def scenario():
+        upstream = Upstream(
+            "test",
+            limiter=AdaptiveLimiter(initial=4, min_limit=1, max_limit=10),
+            breaker=_breaker(),
+            budget=RetryBudget(ratio=0.0, minimum=0.0),
+            hedge_enabled=False,
+        )
+        started = asyncio.Event()
+
+        async def handler(request):
+            started.set()
+            await asyncio.sleep(10)
+            return httpx.Response(200)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            for _ in range(5):
+                started.clear()
+                call = asyncio.ensure_future(upstream.get(client, "http://upstream.test/", max_retries=0))
+                await started.wait()
+                call.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await call
+        assert upstream.limiter.limit == 4
+        assert upstream.limiter.in_flight == 0
+        assert upstream.breaker.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_limiter_queues_callers_until_a_slot_is_released():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        limiter.release(0.1, True)
+        await waiter
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        # Cancelled after _wake handed it the slot but before it resumed
+        limiter.release(0.1, True)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.in_flight == 0
+        assert not limiter._waiters
+
+    asyncio.run(scenario())
+
+
+# Retry budget
+
+
+def test_retry_budget_starts_at_minimum():
+    budget = RetryBudget(ratio=0.2, minimum=2.0)
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+def test_retry_budget_earns_a_fraction_per_request():
+    budget = RetryBudget(ratio=0.2, minimum=0.0)
+    for _ in range(4):
+        budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+def test_retry_budget_is_capped():
+    budget = RetryBudget(ratio=1.0, minimum=0.0, maximum=3.0)
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 3.0